@@ -0,0 +1,81 @@
+"""Per-day log counts for the month calendar.
+
+A month is one range scan over ``idx_logs_student_date``: the query bounds
+``logs.date`` (a YYYY-MM-DD string since migration 7) with ``>= first day``
+and ``< first day of next month`` instead of wrapping the column in
+``date()``, which would make SQLite read every log the student has.
+
+For a supervisor it is one range scan over ``idx_logs_supervisor_date``
+(``logs.supervisor_id`` is kept up to date by the roster triggers of
+migration 8), however many students are assigned.
+"""
+import calendar
+from datetime import date, timedelta
+
+from log_status import NAMES
+
+
+def parse_month(value):
+    """``"YYYY-MM"`` -> date of the first of that month; ValueError if malformed."""
+    if not value or len(value) != 7 or value[4] != "-":
+        raise ValueError(f"month must look like YYYY-MM, got {value!r}")
+    return date.fromisoformat(f"{value}-01")
+
+
+def _next_month(first):
+    return (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_bounds(first):
+    """(first day, first day of the next month) as ISO strings, for ``date >= ? AND date < ?``."""
+    return first.isoformat(), _next_month(first).isoformat()
+
+
+def month_summary(conn, first, student_id=None, supervisor_id=None):
+    """{"YYYY-MM-DD": {"total": n, "pending": n, ...}} for the days of the month that have logs.
+
+    Pass ``student_id`` for one student's logs, ``supervisor_id`` for all of
+    that supervisor's students, or both to narrow a supervisor to one student.
+    """
+    start, end = month_bounds(first)
+    # the (student_id, date) and (supervisor_id, date) indexes have no status, so
+    # each log in the month is still read from the table, but only the logs in the month
+    if supervisor_id is not None:
+        query = """
+            SELECT date AS day, status, COUNT(*) AS n
+            FROM logs
+            WHERE supervisor_id = ? AND date >= ? AND date < ?
+        """
+        params = [supervisor_id, start, end]
+        if student_id is not None:
+            query += " AND student_id = ?"
+            params.append(student_id)
+    else:
+        query = """
+            SELECT date AS day, status, COUNT(*) AS n
+            FROM logs
+            WHERE student_id = ? AND date >= ? AND date < ?
+        """
+        params = [student_id, start, end]
+    query += " GROUP BY day, status"
+
+    days = {}
+    for row in conn.execute(query, params):
+        counts = days.setdefault(row["day"], dict.fromkeys(("total",) + NAMES, 0))
+        counts[NAMES[row["status"]]] += row["n"]
+        counts["total"] += row["n"]
+    return days
+
+
+def month_weeks(first):
+    """Weeks of the month (Monday first) as lists of ISO dates, None for days outside it."""
+    return [
+        [date(first.year, first.month, d).isoformat() if d else None for d in week]
+        for week in calendar.Calendar().monthdayscalendar(first.year, first.month)
+    ]
+
+
+def adjacent_months(first):
+    """("YYYY-MM" of the previous month, "YYYY-MM" of the next one)."""
+    previous = (first - timedelta(days=1)).replace(day=1)
+    return previous.strftime("%Y-%m"), _next_month(first).strftime("%Y-%m")
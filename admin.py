@@ -1,27 +1,42 @@
+import hmac
+import io
 import os
-from flask import Blueprint, render_template, redirect, url_for, flash, send_file, current_app, request
+from flask import (Blueprint, render_template, redirect, url_for, flash, send_file, current_app, request,
+                   Response, stream_with_context, jsonify)
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from datetime import datetime
-from flask_bcrypt import generate_password_hash, check_password_hash
 import sqlite3
 
-from db_utils import get_db_connection
+from db_utils import get_db_connection, execute_write, run_write
+from user_cache import invalidate_user
+from page_cache import SITE, bump_all, bump_site, cached_page
+from passwords import HasherBusy, hash_password, check_password
+from counters import read_counters
+from log_status import CODES
+from pagination import decode_cursor, split_page
+from search import search_logs, username_filter
+from backup import get_backup_runner, list_backups
+from bulk import FORMATS, EXPORTS, IMPORTS, export, import_records, read_records
+from jobs import LOG_ACTIONS, enqueue, cancel, get_job, recent_jobs, is_active, get_job_runner
+from metrics import collect, prometheus_text
+from profiling import get_profiler
 
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
-def get_db_connection():
-    db_path = current_app.config.get('DATABASE', 'instance/siwes.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
+
+@admin_bp.before_request
+def start_job_runner():
+    """Make sure queued jobs (including ones left over from a restart) get picked up."""
+    get_job_runner()
 
 # ------------------------
 # ADMIN DASHBOARD
 # ------------------------
 @admin_bp.route('/dashboard')
 @login_required
+@cached_page(SITE)
 def dashboard():
     # only admins allowed
     if current_user.role != 'admin':
@@ -31,30 +46,24 @@ def dashboard():
     conn = get_db_connection()
     cur = conn.cursor()
 
-    # counts
-    total_students = cur.execute("SELECT COUNT(*) FROM users WHERE role = 'student'").fetchone()[0]
-    total_supervisors = cur.execute("SELECT COUNT(*) FROM users WHERE role = 'supervisor'").fetchone()[0]
-    total_logs = cur.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
-    pending_logs = cur.execute("SELECT COUNT(*) FROM logs WHERE lower(status) = 'pending'").fetchone()[0]
-    approved_logs = cur.execute("SELECT COUNT(*) FROM logs WHERE lower(status) = 'approved'").fetchone()[0]
+    # counts (maintained by triggers, see counters.py)
+    counts = read_counters(conn)
 
     # recent activities - latest 6 logs
     activities = cur.execute("""
         SELECT logs.id, users.username AS student, logs.date, logs.status
         FROM logs
         JOIN users ON logs.student_id = users.id
-        ORDER BY datetime(logs.date) DESC
+        ORDER BY logs.date DESC, logs.id DESC
         LIMIT 6
     """).fetchall()
 
-    conn.close()
-
     stats = {
-        "total_students": total_students,
-        "total_supervisors": total_supervisors,
-        "total_logs": total_logs,
-        "pending_logs": pending_logs,
-        "approved_logs": approved_logs
+        "total_students": counts.get("users.student", 0),
+        "total_supervisors": counts.get("users.supervisor", 0),
+        "total_logs": counts.get("logs.total", 0),
+        "pending_logs": counts.get("logs.pending", 0),
+        "approved_logs": counts.get("logs.approved", 0)
     }
 
     return render_template('admin/dashboard.html', stats=stats, activities=activities)
@@ -78,53 +87,55 @@ def students():
         action = request.form.get("action")
 
         if action == "assign":
-            student_id = request.form.get("student_id")
-            supervisor_id = request.form.get("supervisor_id")
-            cur.execute("UPDATE users SET supervisor_id = ? WHERE id = ?", (supervisor_id, student_id))
-            conn.commit()
+            # integers (or NULL to unassign): the roster triggers copy supervisor_id into logs
+            student_id = request.form.get("student_id", type=int)
+            supervisor_id = request.form.get("supervisor_id", type=int)
+            execute_write("UPDATE users SET supervisor_id = ? WHERE id = ?", (supervisor_id, student_id))
+            invalidate_user(student_id)
+            bump_all()
             flash("Supervisor assigned successfully!", "success")
 
         elif action == "delete":
-            student_id = request.form.get("student_id")
-            cur.execute("DELETE FROM users WHERE id = ? AND role = 'student'", (student_id,))
-            cur.execute("DELETE FROM logs WHERE student_id = ?", (student_id,))
-            conn.commit()
-            flash("Student record deleted!", "danger")
+            # deleting a student's logs can take a while; runs as a background job (see jobs.py)
+            student_id = request.form.get("student_id", type=int)
+            job_id = enqueue("delete_student", {"student_id": student_id}, created_by=current_user.id)
+            flash(f"Student deletion queued as job #{job_id}.", "danger")
 
         return redirect(url_for('admin.students'))
 
-    # Search and pagination
+    # Search and keyset pagination (continue after the last username shown)
     q = request.args.get('q', '').strip()
-    page = int(request.args.get('page', 1))
+    page = request.args.get('page', 1, type=int)  # only used for display
     per_page = 10
-    offset = (page - 1) * per_page
+    cursor = decode_cursor(request.args.get('after'), 1)
 
+    query = """
+        SELECT s.id, s.username AS student_name, u.username AS supervisor_name
+        FROM users s
+        LEFT JOIN users u ON s.supervisor_id = u.id
+        WHERE s.role='student'
+    """
+    params = []
     if q:
-        students = cur.execute("""
-            SELECT s.id, s.username AS student_name, u.username AS supervisor_name
-            FROM users s
-            LEFT JOIN users u ON s.supervisor_id = u.id
-            WHERE s.role='student' AND s.username LIKE ?
-            ORDER BY s.username LIMIT ? OFFSET ?;
-        """, (f'%{q}%', per_page, offset)).fetchall()
-
-        total = cur.execute("SELECT COUNT(*) FROM users WHERE role='student' AND username LIKE ?", (f'%{q}%',)).fetchone()[0]
-    else:
-        students = cur.execute("""
-            SELECT s.id, s.username AS student_name, u.username AS supervisor_name
-            FROM users s
-            LEFT JOIN users u ON s.supervisor_id = u.id
-            WHERE s.role='student'
-            ORDER BY s.username LIMIT ? OFFSET ?;
-        """, (per_page, offset)).fetchall()
+        condition, q_params = username_filter(q)
+        query += " AND " + condition
+        params.extend(q_params)
+    if cursor:
+        query += " AND s.username > ?"
+        params.extend(cursor)
+    query += " ORDER BY s.username LIMIT ?;"
+    params.append(per_page + 1)
+
+    rows = cur.execute(query, tuple(params)).fetchall()
+    students, next_cursor = split_page(rows, per_page, key=lambda row: (row["student_name"],))
 
-        total = cur.execute("SELECT COUNT(*) FROM users WHERE role='student'").fetchone()[0]
+    # Page count from the cached counters; a search has no cheap total
+    total = None if q else read_counters(conn).get("users.student", 0)
 
     # Get all supervisors for dropdown
     supervisors = cur.execute("SELECT id, username FROM users WHERE role='supervisor' ORDER BY username;").fetchall()
 
-    conn.close()
-    total_pages = (total + per_page - 1) // per_page
+    total_pages = None if total is None else max(1, (total + per_page - 1) // per_page)
 
     return render_template(
         'admin/students.html',
@@ -132,7 +143,8 @@ def students():
         supervisors=supervisors,
         q=q,
         page=page,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_cursor
     )
 
 # ------------------------
@@ -159,40 +171,38 @@ def supervisors():
             if not username or not password:
                 flash("Both username and password are required.", "warning")
             else:
-                from flask_bcrypt import generate_password_hash
-                password_hash = generate_password_hash(password).decode("utf-8")
                 try:
-                    cur.execute(
+                    password_hash = hash_password(password)
+                except HasherBusy:
+                    flash("The server is busy right now. Please try again in a moment.", "warning")
+                    return redirect(url_for('admin.supervisors'))
+                try:
+                    execute_write(
                         "INSERT INTO users (username, password_hash, role) VALUES (?, ?, 'supervisor')",
                         (username, password_hash)
                     )
-                    conn.commit()
+                    bump_site()
                     flash(f"Supervisor '{username}' added successfully!", "success")
-                except Exception as e:
+                except sqlite3.IntegrityError:
                     flash("Error: Supervisor username already exists!", "danger")
 
         elif action == "delete":
-            supervisor_id = request.form.get("supervisor_id")
-            # Unassign all students under this supervisor
-            cur.execute("UPDATE users SET supervisor_id = NULL WHERE supervisor_id = ?", (supervisor_id,))
-            # Delete supervisor
-            cur.execute("DELETE FROM users WHERE id = ? AND role='supervisor'", (supervisor_id,))
-            conn.commit()
-            flash("Supervisor deleted and students unassigned.", "danger")
+            # unassigns the supervisor's students, then deletes the supervisor (see jobs.py)
+            supervisor_id = request.form.get("supervisor_id", type=int)
+            job_id = enqueue("delete_supervisor", {"supervisor_id": supervisor_id}, created_by=current_user.id)
+            flash(f"Supervisor deletion queued as job #{job_id}.", "danger")
 
         return redirect(url_for('admin.supervisors'))
 
-    # FETCH SUPERVISORS AND STUDENT COUNT
+    # FETCH SUPERVISORS AND STUDENT COUNT (roster counters, see counters.py)
     supervisors = cur.execute("""
-        SELECT u.id, u.username, COUNT(s.id) AS total_students
+        SELECT u.id, u.username, COALESCE(c.value, 0) AS total_students
         FROM users u
-        LEFT JOIN users s ON u.id = s.supervisor_id AND s.role='student'
+        LEFT JOIN counters c ON c.name = 'roster.' || u.id
         WHERE u.role='supervisor'
-        GROUP BY u.id
         ORDER BY u.username;
     """).fetchall()
 
-    conn.close()
     return render_template('admin/supervisors.html', supervisors=supervisors)
 
 # ------------------------
@@ -205,40 +215,73 @@ def logs():
         flash("Access Denied! Admins only.", "danger")
         return redirect(url_for("login"))
 
-    status = request.args.get('status', 'all')  # 'all', 'pending', 'approved', 'disapproved'
-    page = int(request.args.get('page', 1))
+    status = request.args.get('status', 'all').lower()  # 'all', 'pending', 'approved', 'disapproved'
+    page = request.args.get('page', 1, type=int)  # only used for display
     per_page = 25
-    offset = (page - 1) * per_page
+    cursor = decode_cursor(request.args.get('after'), 2)
 
     conn = get_db_connection()
     cur = conn.cursor()
 
-    base_q = """
+    query, params = logs_page_query(status, cursor, per_page + 1)
+    rows = cur.execute(query, params).fetchall()
+    rows, next_cursor = split_page(rows, per_page, key=lambda row: (row["date"], row["id"]))
+
+    # approximate total for the page count, from the trigger-maintained counters
+    counts = read_counters(conn)
+    total = counts.get(f"logs.{status}" if status in CODES else "logs.total", 0)
+
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    return render_template('admin/logs.html', logs=rows, status=status, page=page, total_pages=total_pages,
+                           next_cursor=next_cursor)
+
+
+def logs_page_query(status, cursor, limit):
+    """SQL + params for one page of the admin logs list, newest first.
+
+    Ordered by (date, id) so that both the status filter and the cursor are
+    a range seek on idx_logs_status_date / idx_logs_date, at any depth.
+    """
+    query = """
         SELECT logs.id, logs.date, logs.activity, logs.status, users.username AS student
         FROM logs JOIN users ON logs.student_id = users.id
     """
+    conditions = []
     params = []
-    if status and status != 'all':
-        base_q += " WHERE lower(logs.status) = ? "
-        params.append(status.lower())
+    if status in CODES:
+        conditions.append("logs.status = ?")
+        params.append(CODES[status])
+    if cursor:
+        conditions.append("(logs.date, logs.id) < (?, ?)")
+        params.extend(cursor)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY logs.date DESC, logs.id DESC LIMIT ?"
+    params.append(limit)
+    return query, tuple(params)
 
-    base_q += " ORDER BY datetime(logs.date) DESC LIMIT ? OFFSET ?"
-    params.extend([per_page, offset])
-
-    rows = cur.execute(base_q, tuple(params)).fetchall()
+# ------------------------
+# FULL-TEXT LOG SEARCH
+# ------------------------
+@admin_bp.route('/search')
+@login_required
+def search():
+    """Admin searches all logs by activity and feedback text."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
 
-    # total count for pagination
-    count_q = "SELECT COUNT(*) FROM logs"
-    if status and status != 'all':
-        count_q += " WHERE lower(status) = ?"
-        total = cur.execute(count_q, (status.lower(),)).fetchone()[0]
-    else:
-        total = cur.execute(count_q).fetchone()[0]
+    q = request.args.get('q', '').strip()
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = 20
 
-    conn.close()
+    results = []
+    if q:
+        conn = get_db_connection()
+        results = search_logs(conn, q, limit=per_page + 1, offset=(page - 1) * per_page)
+    has_next = len(results) > per_page
 
-    total_pages = (total + per_page - 1) // per_page
-    return render_template('admin/logs.html', logs=rows, status=status, page=page, total_pages=total_pages)
+    return render_template('admin/search.html', results=results[:per_page], q=q, page=page, has_next=has_next)
 
 # ------------------------
 # BULK ACTION ON LOGS
@@ -258,27 +301,15 @@ def logs_action():
         flash("No logs selected.", "warning")
         return redirect(url_for('admin.logs'))
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    if action == "approve":
-        cur.executemany("UPDATE logs SET status = 'approved' WHERE id = ?", [(lid,) for lid in selected_logs])
-        flash(f"{len(selected_logs)} log(s) approved!", "success")
-
-    elif action == "disapprove":
-        cur.executemany("UPDATE logs SET status = 'disapproved' WHERE id = ?", [(lid,) for lid in selected_logs])
-        flash(f"{len(selected_logs)} log(s) disapproved!", "warning")
-
-    elif action == "delete":
-        cur.executemany("DELETE FROM logs WHERE id = ?", [(lid,) for lid in selected_logs])
-        flash(f"{len(selected_logs)} log(s) deleted!", "danger")
+    if action in LOG_ACTIONS:
+        # large selections take a while, so the work runs as a background job (see jobs.py)
+        ids = [int(lid) for lid in selected_logs if lid.isdigit()]
+        job_id = enqueue("logs_action", {"action": action, "ids": ids}, created_by=current_user.id)
+        flash(f"{action.capitalize()} of {len(ids)} log(s) queued as job #{job_id}.", "info")
 
     else:
         flash("Invalid action.", "danger")
 
-    conn.commit()
-    conn.close()
-
     return redirect(url_for('admin.logs'))
 
 # --------------------------
@@ -293,14 +324,9 @@ def settings():
         return redirect(url_for("login"))
 
     conn = get_db_connection()
-    cur = conn.cursor()
 
     # Get quick system stats
-    total_students = cur.execute("SELECT COUNT(*) FROM users WHERE role='student'").fetchone()[0]
-    total_supervisors = cur.execute("SELECT COUNT(*) FROM users WHERE role='supervisor'").fetchone()[0]
-    total_logs = cur.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
-
-    conn.close()
+    counts = read_counters(conn)
 
     # Handle password change
     if request.method == "POST":
@@ -311,39 +337,207 @@ def settings():
 
             conn = get_db_connection()
             admin_user = conn.execute("SELECT * FROM users WHERE id = ?", (current_user.id,)).fetchone()
-            conn.close()
 
-            if not check_password_hash(admin_user["password_hash"], old_password):
+            try:
+                old_ok = check_password(admin_user["password_hash"], old_password)
+                hashed = hash_password(new_password) if old_ok and new_password == confirm_password else None
+            except HasherBusy:
+                flash("The server is busy right now. Please try again in a moment.", "warning")
+                return redirect(url_for('admin.settings'))
+
+            if not old_ok:
                 flash("Old password is incorrect!", "danger")
             elif new_password != confirm_password:
                 flash("New passwords do not match!", "warning")
             else:
-                hashed = generate_password_hash(new_password).decode("utf-8")
-                conn = get_db_connection()
-                conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (hashed, current_user.id))
-                conn.commit()
-                conn.close()
+                execute_write("UPDATE users SET password_hash = ? WHERE id = ?", (hashed, current_user.id))
+                invalidate_user(current_user.id)
                 flash("Password changed successfully!", "success")
                 return redirect(url_for('admin.settings'))
 
         elif request.form.get("action") == "backup":
-            # Generate a database backup copy
-            backup_filename = f"siwes_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-            db_path = os.path.join("instance", "siwes.db")
-            backup_path = os.path.join("backups", backup_filename)
-            os.makedirs("backups", exist_ok=True)
-            with open(db_path, "rb") as src, open(backup_path, "wb") as dst:
-                dst.write(src.read())
-            flash("Database backup created successfully!", "success")
-            return send_file(backup_path, as_attachment=True)
+            # Online backup runs as a background job (see backup.py); download it from the list below
+            job_id = enqueue("backup", created_by=current_user.id, unique=True)
+            if job_id:
+                flash(f"Database backup queued as job #{job_id}. It will appear below when finished.", "info")
+            else:
+                flash("A backup is already running.", "warning")
+            return redirect(url_for('admin.settings'))
 
     # Get DB size for display
-    db_size = os.path.getsize("instance/siwes.db") / 1024  # in KB
+    db_size = os.path.getsize(current_app.config['DATABASE']) / 1024  # in KB
+    runner = get_backup_runner()
 
     return render_template(
         'admin/settings.html',
-        total_students=total_students,
-        total_supervisors=total_supervisors,
-        total_logs=total_logs,
-        db_size=round(db_size, 2)
-    )
\ No newline at end of file
+        total_students=counts.get("users.student", 0),
+        total_supervisors=counts.get("users.supervisor", 0),
+        total_logs=counts.get("logs.total", 0),
+        db_size=round(db_size, 2),
+        backups=list_backups(runner.dest_dir, runner.mode),
+        backup_mode=runner.mode,
+        backup_dir=runner.dest_dir,
+        backup_running=runner.running or is_active(conn, "backup"),
+        last_backup=runner.last
+    )
+
+# --------------------------
+# DOWNLOAD A BACKUP
+# --------------------------
+@admin_bp.route('/backups/<name>')
+@login_required
+def download_backup(name):
+    """Stream a backup file from the backup directory."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    dest_dir = get_backup_runner().dest_dir
+    if name not in {b[0] for b in list_backups(dest_dir)}:
+        flash("Backup not found.", "danger")
+        return redirect(url_for('admin.settings'))
+
+    # send_file with a path streams the file in blocks instead of reading it into memory
+    return send_file(os.path.abspath(os.path.join(dest_dir, name)), as_attachment=True, conditional=True)
+
+# --------------------------
+# BULK EXPORT / IMPORT
+# --------------------------
+@admin_bp.route('/export/<table>.<fmt>')
+@login_required
+def export_table(table, fmt):
+    """Stream logs or users as CSV / JSON Lines (see bulk.py)."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    if table not in EXPORTS or fmt not in FORMATS:
+        flash("Unknown export.", "danger")
+        return redirect(url_for('admin.settings'))
+
+    # the generator keeps reading from the request's connection while the response is sent
+    rows = export(get_db_connection(), table, fmt)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return Response(
+        stream_with_context(rows),
+        mimetype=FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=siwes_{table}_{stamp}.{fmt}"},
+    )
+
+
+@admin_bp.route('/import', methods=['POST'])
+@login_required
+def import_table():
+    """Import logs or users from an uploaded CSV / JSON Lines file."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    table = request.form.get('table')
+    upload = request.files.get('file')
+    if table not in IMPORTS or not upload or not upload.filename:
+        flash("Choose what to import and a file.", "warning")
+        return redirect(url_for('admin.settings'))
+
+    fmt = "jsonl" if upload.filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    try:
+        result = import_records(get_db_connection(), table, read_records(stream, fmt), run_write,
+                                hash_password=hash_password)
+    except (sqlite3.Error, UnicodeDecodeError, ValueError, HasherBusy) as e:
+        bump_all()  # the chunks before the error are committed
+        flash(f"Import stopped: {e}", "danger")
+        return redirect(url_for('admin.settings'))
+
+    bump_all()
+    flash(f"Imported {result['inserted']} {table} ({result['rows_per_sec']:.0f} rows/s).", "success")
+    if result["rejected"]:
+        details = "; ".join(f"line {line}: {message}" for line, message in result["errors"][:5])
+        flash(f"{result['rejected']} row(s) rejected. {details}", "warning")
+    return redirect(url_for('admin.settings'))
+
+# --------------------------
+# BACKGROUND JOBS
+# --------------------------
+@admin_bp.route('/jobs')
+@login_required
+def jobs():
+    """Recent background jobs with live progress."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    return render_template('admin/jobs.html', jobs=recent_jobs(get_db_connection()))
+
+
+@admin_bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """Status and progress of one job as JSON, for polling."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    job = get_job(get_db_connection(), job_id)
+    if job is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify(job)
+
+
+@admin_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    """Cancel a queued job, or ask a running one to stop after its current chunk."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    status = cancel(job_id)
+    if status == "cancelled":
+        flash(f"Job #{job_id} cancelled.", "warning")
+    elif status == "running":
+        flash(f"Job #{job_id} will stop after its current step.", "warning")
+    else:
+        flash(f"Job #{job_id} has already finished.", "info")
+    return redirect(url_for('admin.jobs'))
+
+# --------------------------
+# METRICS
+# --------------------------
+@admin_bp.route('/metrics')
+@login_required
+def metrics():
+    """Request, SQL and component metrics (see metrics.py and profiling.py)."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    snapshot = collect(current_app, get_db_connection())
+    return render_template('admin/metrics.html', snapshot=snapshot, slow_ms=current_app.config.get("SQL_SLOW_MS"))
+
+
+@admin_bp.route('/metrics/prometheus')
+def metrics_prometheus():
+    """The same metrics in Prometheus text format, for admins or a scraper holding METRICS_TOKEN."""
+    token = current_app.config.get("METRICS_TOKEN")
+    scraper = token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not scraper and not (current_user.is_authenticated and current_user.role == 'admin'):
+        return Response("Forbidden\n", status=403, mimetype="text/plain")
+
+    text = prometheus_text(collect(current_app, get_db_connection()))
+    return Response(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@admin_bp.route('/metrics/reset', methods=['POST'])
+@login_required
+def reset_metrics():
+    """Start the request and SQL totals over, e.g. before trying a change."""
+    if current_user.role != 'admin':
+        flash("Access Denied! Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    profiler = get_profiler()
+    if profiler is not None:
+        profiler.reset()
+        flash("Request and SQL metrics reset.", "success")
+    return redirect(url_for('admin.metrics'))
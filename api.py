@@ -0,0 +1,277 @@
+"""Read-only JSON API (``/api/v1``) for dashboards and mobile clients.
+
+Every endpoint answers for the signed-in user (the same session cookie as
+the HTML pages): students see their own logs, supervisors their students',
+admins everything. Lists are paginated with keyset cursors and shaped for
+small payloads:
+
+* rows are sent as arrays in the order of ``fields`` (no repeated keys), and
+  are taken straight from the database as tuples;
+* ``?fields=id,date,status`` picks the columns; the default is all of them;
+* ``?limit=`` sets the page size, ``?after=`` continues from ``next``.
+
+Responses are compressed (brotli when the client accepts it and the
+optional ``brotli`` package is installed, otherwise gzip), and are cached
+and revalidated like the dashboards (see page_cache): a request with the
+last ETag in ``If-None-Match`` gets a 304 until the user's data changes.
+
+    GET /api/v1/logs      ?status= &student_id= &start_date= &end_date=
+    GET /api/v1/students  (supervisors and admins)
+    GET /api/v1/stats
+"""
+import gzip
+from datetime import date
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user
+
+from counters import read_counters
+from db_utils import get_db_connection
+from log_status import NAMES, SQL_NAME, status_code
+from page_cache import cached_page
+from pagination import decode_cursor, split_page
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# field name -> SQL expression; status goes out by name
+LOG_FIELDS = {
+    "id": "logs.id",
+    "date": "logs.date",
+    "status": SQL_NAME.format("logs.status"),
+    "student_id": "logs.student_id",
+    "student": "users.username",
+    "activity": "logs.activity",
+    "feedback": "logs.feedback",
+}
+STUDENT_FIELDS = {
+    "id": "s.id",
+    "username": "s.username",
+    "supervisor_id": "s.supervisor_id",
+    "supervisor": "sup.username",
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@api_bp.errorhandler(ApiError)
+def _api_error(e):
+    return jsonify({"error": str(e)}), e.status
+
+
+def api_login_required(view):
+    """Like ``login_required``, but answers 401 JSON instead of redirecting to the login page."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify({"error": "Not signed in."}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# --------------------------
+# HELPERS
+# --------------------------
+def _fields(available):
+    """Requested field names (``?fields=a,b``) in request order; all of ``available`` by default."""
+    requested = request.args.get("fields")
+    if not requested:
+        return list(available)
+    names = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown) or requested}. "
+                       f"Choose from: {', '.join(available)}.")
+    return list(dict.fromkeys(names))
+
+
+def _limit():
+    limit = request.args.get("limit", current_app.config["API_PAGE_SIZE"], type=int)
+    return max(1, min(limit, current_app.config["API_MAX_PAGE_SIZE"]))
+
+
+def _date_arg(name):
+    value = request.args.get(name) or None
+    if value is not None:
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            raise ApiError(f"{name} must be a date (YYYY-MM-DD).") from None
+    return value
+
+
+def _int_arg(name):
+    value = request.args.get(name) or None
+    if value is not None:
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError(f"{name} must be a number.") from None
+    return None
+
+
+def _tuples(sql, params):
+    """Rows as plain tuples: the JSON encoder handles them directly, no sqlite3.Row in between."""
+    cur = get_db_connection().cursor()
+    cur.row_factory = None
+    return cur.execute(sql, params).fetchall()
+
+
+def _page(fields, rows, limit, key_size):
+    """The list response; each row ends with ``key_size`` sort-key columns, dropped after paging."""
+    rows, next_cursor = split_page(rows, limit, key=lambda row: row[-key_size:])
+    return jsonify(fields=fields, rows=[row[:-key_size] for row in rows], next=next_cursor)
+
+
+@api_bp.after_request
+def _compress(response):
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.direct_passthrough or "Content-Encoding" in response.headers
+            or request.method == "HEAD"):
+        return response
+    data = response.get_data()
+    if len(data) < current_app.config["API_COMPRESS_MIN_SIZE"]:
+        return response
+    if brotli is not None and request.accept_encodings["br"]:
+        response.set_data(brotli.compress(data, quality=5))
+        response.headers["Content-Encoding"] = "br"
+    elif request.accept_encodings["gzip"]:
+        response.set_data(gzip.compress(data, compresslevel=current_app.config["API_GZIP_LEVEL"], mtime=0))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+# --------------------------
+# LOGS
+# --------------------------
+@api_bp.route("/logs")
+@api_login_required
+@cached_page()
+def logs():
+    """Logs visible to the user, newest first."""
+    fields = _fields(LOG_FIELDS)
+    limit = _limit()
+
+    sql = f"""
+        SELECT {', '.join(LOG_FIELDS[name] for name in fields)}, logs.date, logs.id
+        FROM logs
+        JOIN users ON logs.student_id = users.id
+        WHERE 1 = 1
+    """
+    params = []
+    if current_user.role == "student":
+        sql += " AND logs.student_id = ?"
+        params.append(current_user.id)
+    elif current_user.role == "supervisor":
+        sql += " AND logs.supervisor_id = ?"
+        params.append(current_user.id)
+
+    student_id = _int_arg("student_id")
+    if student_id is not None and current_user.role != "student":
+        sql += " AND logs.student_id = ?"
+        params.append(student_id)
+
+    status = request.args.get("status")
+    if status:
+        try:
+            params.append(status_code(status))
+        except ValueError:
+            raise ApiError(f"status must be one of: {', '.join(NAMES)}.") from None
+        sql += " AND logs.status = ?"
+
+    start_date, end_date = _date_arg("start_date"), _date_arg("end_date")
+    if start_date:
+        sql += " AND logs.date >= ?"
+        params.append(start_date)
+    if end_date:
+        sql += " AND logs.date <= ?"
+        params.append(end_date)
+
+    after = request.args.get("after")
+    cursor = decode_cursor(after, 2)
+    if after and cursor is None:
+        raise ApiError("Invalid cursor.")
+    if cursor:
+        sql += " AND (logs.date, logs.id) < (?, ?)"
+        params.extend(cursor)
+
+    sql += " ORDER BY logs.date DESC, logs.id DESC LIMIT ?"
+    params.append(limit + 1)
+    return _page(fields, _tuples(sql, params), limit, 2)
+
+
+# --------------------------
+# STUDENTS
+# --------------------------
+@api_bp.route("/students")
+@api_login_required
+@cached_page()
+def students():
+    """A supervisor's students, or every student for admins, by id."""
+    if current_user.role not in ("supervisor", "admin"):
+        raise ApiError("Supervisors and admins only.", 403)
+    fields = _fields(STUDENT_FIELDS)
+    limit = _limit()
+
+    sql = f"""
+        SELECT {', '.join(STUDENT_FIELDS[name] for name in fields)}, s.id
+        FROM users s
+        LEFT JOIN users sup ON s.supervisor_id = sup.id
+        WHERE s.role = 'student'
+    """
+    params = []
+    if current_user.role == "supervisor":
+        sql += " AND s.supervisor_id = ?"
+        params.append(current_user.id)
+
+    after = request.args.get("after")
+    cursor = decode_cursor(after, 1)
+    if after and cursor is None:
+        raise ApiError("Invalid cursor.")
+    if cursor:
+        sql += " AND s.id > ?"
+        params.extend(cursor)
+
+    sql += " ORDER BY s.id LIMIT ?"
+    params.append(limit + 1)
+    return _page(fields, _tuples(sql, params), limit, 1)
+
+
+# --------------------------
+# STATS
+# --------------------------
+@api_bp.route("/stats")
+@api_login_required
+@cached_page()
+def stats():
+    """Log counts by status (and student/supervisor counts) for what the user can see."""
+    conn = get_db_connection()
+    result = {}
+    if current_user.role == "admin":
+        counts = read_counters(conn)
+        logs = {name: counts.get(f"logs.{name}", 0) for name in NAMES}
+        result["students"] = counts.get("users.student", 0)
+        result["supervisors"] = counts.get("users.supervisor", 0)
+    else:
+        if current_user.role == "student":
+            rows = conn.execute("SELECT status, COUNT(*) FROM logs WHERE student_id = ? GROUP BY status",
+                                (current_user.id,))
+        else:
+            rows = conn.execute("SELECT status, COUNT(*) FROM logs WHERE supervisor_id = ? GROUP BY status",
+                                (current_user.id,))
+            result["students"] = conn.execute(
+                "SELECT COUNT(*) FROM users WHERE supervisor_id = ? AND role = 'student'", (current_user.id,)
+            ).fetchone()[0]
+        by_code = dict(rows.fetchall())
+        logs = {name: by_code.get(code, 0) for code, name in enumerate(NAMES)}
+    result["logs"] = dict(logs, total=sum(logs.values()))
+    return jsonify(result)
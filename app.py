@@ -1,11 +1,25 @@
 import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from math import ceil
+from flask import Flask, render_template, stream_template, request, redirect, url_for, flash, session, get_flashed_messages, jsonify
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from flask_bcrypt import Bcrypt
-from datetime import timedelta
+from datetime import date, timedelta
 from admin import admin_bp
-
-from db_utils import get_db_connection
+from api import api_bp
+
+import db_utils
+import profiling
+import assets
+import warmup
+from db_utils import get_db_connection, execute_write, run_write
+from user_cache import get_user_cache, invalidate_user
+from page_cache import cached_page, bump_site, bump_students, bump_supervisor
+from passwords import HasherBusy, hash_password, check_password, needs_rehash
+from rate_limit import ALLOWED, get_login_limiter
+from pagination import decode_cursor, split_page
+from search import search_logs
+from approvals import STATUSES, set_status
+from log_status import PENDING, APPROVED, DISAPPROVED, status_label, status_name
+from activity_calendar import adjacent_months, month_summary, month_weeks, parse_month
 
 # --------------------------
 # FLASK APP CONFIG
@@ -21,8 +35,96 @@ app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(minutes=10)
 app.config["SESSION_REFRESH_EACH_REQUEST"] = True
 app.config['DATABASE'] = Database
 
+# Connection pool (see db_utils); connections are returned on app context teardown
+app.config["DB_POOL_SIZE"] = 5
+app.config["DB_POOL_TIMEOUT"] = 10.0
+
+# Concurrency: WAL lets readers run alongside the writer, and all writes go
+# through one background writer that group-commits whatever is queued.
+app.config["SQLITE_WAL"] = True
+app.config["SQLITE_BUSY_TIMEOUT"] = 5000  # ms
+app.config["SQLITE_SYNCHRONOUS"] = "NORMAL"
+app.config["DB_WRITE_QUEUE"] = True
+
+# SQL profiling (see profiling.py): per-request query counts and times in a
+# Server-Timing header and on /admin/metrics; statements over SQL_SLOW_MS are logged
+app.config["SQL_PROFILE"] = False
+app.config["SQL_SLOW_MS"] = 100
+app.config["SQL_PROFILE_KEEP"] = 20
+# Lets a Prometheus scraper read /admin/metrics/prometheus with "Authorization: Bearer <token>"
+app.config["METRICS_TOKEN"] = None
+
+# Apply pending schema migrations (see migrations.py) when the pool is first created
+app.config["DB_AUTO_MIGRATE"] = True
+db_utils.init_app(app)
+profiling.init_app(app)
+
+# Cache of User objects for the login manager (see user_cache). Set
+# USER_CACHE_SHARED to a file path to share invalidations between workers.
+app.config["USER_CACHE_SIZE"] = 1024
+app.config["USER_CACHE_TTL"] = 300  # seconds
+app.config["USER_CACHE_SHARED"] = None
+
+# Rendered dashboards kept per user and answered with 304 while their data is
+# unchanged (see page_cache); 0 pages turns it off. Set PAGE_CACHE_SHARED to
+# a file path to share data-version bumps between workers.
+app.config["PAGE_CACHE_SIZE"] = 512
+app.config["PAGE_CACHE_TTL"] = 300  # seconds
+app.config["PAGE_CACHE_SHARED"] = None
+
+# Online backups (see backup.py): compression is "gzip", "zstd" or "none".
+# BACKUP_MODE "incremental" stores deduplicated page chunks (incremental_backup.py); the settings
+# page lists those snapshots, which are restored from the command line.
+app.config["BACKUP_DIR"] = "backups"
+app.config["BACKUP_MODE"] = "full"
+app.config["BACKUP_COMPRESSION"] = "gzip"
+app.config["BACKUP_KEEP"] = 10
+app.config["BACKUP_PAGES_PER_STEP"] = 256
+
+# Background jobs (see jobs.py): worker threads, retries and housekeeping
+app.config["JOB_WORKERS"] = 2
+app.config["JOB_MAX_ATTEMPTS"] = 3
+app.config["JOB_RETRY_DELAY"] = 5  # seconds, doubled on every retry
+app.config["JOB_POLL_INTERVAL"] = 1.0
+app.config["JOB_STALE_AFTER"] = 300  # requeue 'running' jobs silent this long (dead process)
+app.config["JOB_KEEP_DAYS"] = 30
+
+# Logs per page on the supervisor dashboard
+app.config["SUPERVISOR_PAGE_SIZE"] = 50
+
+# JSON API (see api.py): rows per page (?limit= up to the max), and responses
+# at least API_COMPRESS_MIN_SIZE bytes are sent brotli- or gzip-compressed
+app.config["API_PAGE_SIZE"] = 50
+app.config["API_MAX_PAGE_SIZE"] = 500
+app.config["API_COMPRESS_MIN_SIZE"] = 512
+app.config["API_GZIP_LEVEL"] = 6
+
+# Password hashing (see passwords.py): bcrypt cost for new hashes, worker
+# processes (None = one per core, 0 = hash inline) and queue backpressure
+app.config["BCRYPT_LOG_ROUNDS"] = 12
+app.config["PASSWORD_WORKERS"] = None
+app.config["PASSWORD_QUEUE_SIZE"] = 64
+app.config["PASSWORD_QUEUE_TIMEOUT"] = 5.0  # seconds before answering 503
+
+# Login rate limiting (see rate_limit.py): (attempts, seconds to refill them).
+# Set LOGIN_LIMIT_SHARED to a file path to share the buckets between workers.
+app.config["LOGIN_RATE_LIMIT"] = True
+app.config["LOGIN_LIMIT_USER"] = (5, 300)
+app.config["LOGIN_LIMIT_IP"] = (100, 60)
+app.config["LOGIN_LIMIT_SHARED"] = None
+
+# Static assets (see assets.py): files built into static/dist have hashed names
+# and are cached by browsers for this long
+app.config["ASSETS_MAX_AGE"] = 365 * 24 * 3600  # seconds
+assets.init_app(app)
+
+# Startup (see warmup.py): compiled templates are kept in TEMPLATE_CACHE_DIR
+# across restarts (python warmup.py fills it at deploy time). WARMUP_ON_START
+# loads templates, pooled connections and password workers before serving.
+app.config["TEMPLATE_CACHE_DIR"] = "instance/template_cache"
+app.config["WARMUP_ON_START"] = False
+
 # Flask extensions
-bcrypt = Bcrypt(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "login"
@@ -31,6 +133,7 @@ login_manager.login_view = "login"
 # REGISTER BLUEPRINTS
 # --------------------------
 app.register_blueprint(admin_bp)
+app.register_blueprint(api_bp)
 
 
 # --------------------------
@@ -50,16 +153,31 @@ class User(UserMixin):
 @login_manager.user_loader
 def load_user(user_id):
     """Load user object from DB using user_id (needed for Flask-Login)."""
-    conn = sqlite3.connect(Database)
-    conn.row_factory = sqlite3.Row
-    user = conn.execute("SELECT * FROM users WHERE id = ?;", (user_id,)).fetchone()
-    conn.close()
+    cache = get_user_cache()
+    if cache is not None:
+        cached = cache.get(user_id)
+        if cached is not None:
+            return cached
+
+    conn = get_db_connection()
+    user = conn.execute("SELECT id, username, password_hash, role FROM users WHERE id = ?;", (user_id,)).fetchone()
 
     if user:
-        return User(user["id"], user["username"], user["password_hash"], user["role"])
+        user_obj = User(user["id"], user["username"], user["password_hash"], user["role"])
+        if cache is not None:
+            cache.put(user_id, user_obj)
+        return user_obj
     return None
 
 
+# --------------------------
+# TEMPLATE FILTERS
+# --------------------------
+# logs.status holds a code (see log_status.py); templates show its name
+app.add_template_filter(status_name, "status_name")
+app.add_template_filter(status_label, "status_label")
+
+
 # --------------------------
 # ROUTES
 # --------------------------
@@ -80,22 +198,23 @@ def register():
         password = request.form["password"]
         role = request.form["role"]
 
-        password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        try:
+            password_hash = hash_password(password)
+        except HasherBusy:
+            flash("The server is busy right now. Please try again in a moment.", "warning")
+            return render_template("register.html", Page ='register'), 503
 
-        conn = get_db_connection()
         try:
-            conn.execute(
+            execute_write(
                 "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
                 (username, password_hash, role),
             )
-            conn.commit()
+            bump_site()
 
             flash("User registered successfully! Please log in.", "success")
             return redirect(url_for("login"))
         except sqlite3.IntegrityError:
             flash("Username already exists!", "danger")
-        finally:
-            conn.close()
 
     return render_template("register.html", Page ='register')
 
@@ -110,11 +229,35 @@ def login():
         username = request.form["username"]
         password = request.form["password"]
 
+        # refuse bursts before spending a query and a bcrypt check on them
+        limiter = get_login_limiter()
+        if limiter is not None:
+            verdict, retry_after = limiter.check(username, request.remote_addr)
+            if verdict != ALLOWED:
+                flash("Too many login attempts. Please wait a few minutes and try again.", "danger")
+                return render_template("login.html", Page ='login'), 429, {"Retry-After": str(ceil(retry_after))}
+
         conn = get_db_connection()
         user = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
-        conn.close()
 
-        if user and bcrypt.check_password_hash(user["password_hash"], password):
+        try:
+            valid = user is not None and check_password(user["password_hash"], password)
+        except HasherBusy:
+            flash("The server is busy right now. Please try again in a moment.", "warning")
+            return render_template("login.html", Page ='login'), 503
+
+        # upgrade hashes made with a different cost factor while we have the password
+        if valid and needs_rehash(user["password_hash"]):
+            try:
+                execute_write("UPDATE users SET password_hash = ? WHERE id = ?",
+                              (hash_password(password), user["id"]))
+                invalidate_user(user["id"])
+            except HasherBusy:
+                pass  # optional; a later login upgrades it
+
+        if valid:
+            if limiter is not None:
+                limiter.succeeded(username)
             user_obj = User(user["id"], user["username"], user["password_hash"], user["role"])
             login_user(user_obj)
             session.permanent = True
@@ -152,6 +295,7 @@ def logout():
 # --------------------------
 @app.route("/student")
 @login_required
+@cached_page("student")
 def student():
     """Student dashboard showing their own logs."""
     if current_user.role != "student":
@@ -160,21 +304,20 @@ def student():
 
     conn = get_db_connection()
 
-    # Fetch all logs for this student
-    logs = conn.execute(
-        "SELECT * FROM logs WHERE student_id = ? ORDER BY date DESC", 
+    # Stats: one grouped count instead of fetching every log
+    status_counts = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM logs WHERE student_id = ? GROUP BY status",
         (current_user.id,)
-    ).fetchall()
-
-    # Stats
-    total_logs = len(logs)
-    pending_logs = len([log for log in logs if log["status"].lower() == "pending"])
-    approved_logs = len([log for log in logs if log["status"].lower() == "approved"])
+    ).fetchall())
+    total_logs = sum(status_counts.values())
+    pending_logs = status_counts.get(PENDING, 0)
+    approved_logs = status_counts.get(APPROVED, 0)
 
     # Recent 5 logs for table display
-    recent_logs = logs[:5]
-
-    conn.close()
+    recent_logs = conn.execute(
+        "SELECT id, date, activity, status, feedback FROM logs WHERE student_id = ? ORDER BY date DESC LIMIT 5",
+        (current_user.id,)
+    ).fetchall()
 
     return render_template(
         "student.html",
@@ -188,6 +331,14 @@ def student():
 # --------------------------
 # STUDENT LOG SUBMISSION
 # --------------------------
+def _form_date():
+    """The form's date as YYYY-MM-DD (what logs.date holds), or None if it is not a date."""
+    try:
+        return date.fromisoformat(request.form.get("date", "").strip()).isoformat()
+    except ValueError:
+        return None
+
+
 @app.route("/log", methods=["GET", "POST"])
 @login_required
 def log():
@@ -197,16 +348,17 @@ def log():
         return redirect(url_for("student"))
 
     if request.method == "POST":
-        date = request.form["date"]
+        log_date = _form_date()
+        if log_date is None:
+            flash("Please pick a valid date.", "danger")
+            return render_template("log.html", Page ='log')
         activity = request.form["activity"]
 
-        conn = get_db_connection()
-        conn.execute(
+        execute_write(
             "INSERT INTO logs (date, activity, status, feedback, student_id) VALUES (?, ?, ?, ?, ?)",
-            (date, activity, "pending", "", current_user.id),
+            (log_date, activity, PENDING, "", current_user.id),
         )
-        conn.commit()
-        conn.close()
+        bump_students([current_user.id])
 
         flash("Log submitted successfully!", "success")
         return redirect(url_for("student"))
@@ -229,25 +381,25 @@ def edit_log(log_id):
     log = conn.execute("SELECT * FROM logs WHERE id = ? AND student_id = ?", (log_id, current_user.id)).fetchone()
 
     if not log:
-        conn.close()
         flash("Log not found or access denied.", "danger")
         return redirect(url_for("student"))
 
     if request.method == "POST":
-        new_date = request.form["date"]
+        new_date = _form_date()
+        if new_date is None:
+            flash("Please pick a valid date.", "danger")
+            return render_template("edit_log.html", log=log, Page ='edit_log')
         new_activity = request.form["activity"]
 
-        conn.execute(
-            "UPDATE logs SET date = ?, activity = ?, status = 'pending', feedback = NULL WHERE id = ?",
-            (new_date, new_activity, log_id),
+        execute_write(
+            "UPDATE logs SET date = ?, activity = ?, status = ?, feedback = NULL WHERE id = ?",
+            (new_date, new_activity, PENDING, log_id),
         )
-        conn.commit()
-        conn.close()
+        bump_students([current_user.id])
 
         flash(f"Log '{new_date}' updated successfully!", "success")
         return redirect(url_for("student"))
 
-    conn.close()
     return render_template("edit_log.html", log=log, Page ='edit_log')
 
 
@@ -262,11 +414,9 @@ def delete_log(log_id):
         flash("Access Denied! Students only.", "danger")
         return redirect(url_for("login"))
 
-    conn = get_db_connection()
     # ensure student owns the log before deleting
-    conn.execute("DELETE FROM logs WHERE id = ? AND student_id = ?", (log_id, current_user.id))
-    conn.commit()
-    conn.close()
+    execute_write("DELETE FROM logs WHERE id = ? AND student_id = ?", (log_id, current_user.id))
+    bump_students([current_user.id])
 
     flash(f"Log {log_id} deleted successfully!", "warning")
     return redirect(url_for("student"))
@@ -277,67 +427,108 @@ def delete_log(log_id):
 # --------------------------
 @app.route("/supervisor", methods=["GET", "POST"])
 @login_required
+@cached_page("supervisor")
 def supervisor():
     """Supervisors view logs of their assigned students, with filters and actions."""
     if current_user.role != 'supervisor':
         flash("Access Denied! Supervisors only.", "danger")
         return redirect(url_for("login"))
 
+    # Filters come from the query string (filter form and page links) or a POSTed form
+    if "reset" in request.values:
+        return redirect(url_for("supervisor"))
+
+    selected_student = request.values.get("student_id", "all")
+    start_date = request.values.get("start_date") or None
+    end_date = request.values.get("end_date") or None
+    after = request.values.get("after")
+    per_page = app.config["SUPERVISOR_PAGE_SIZE"]
+
     conn = get_db_connection()
 
     # Fetch only students assigned to this supervisor
     students = conn.execute("SELECT id, username FROM users WHERE role = 'student' AND supervisor_id = ?", (current_user.id,)).fetchall()
 
-    selected_student = "all"
-    start_date = None
-    end_date = None
-
     query = """
-        SELECT logs.*, users.username
+        SELECT logs.id, logs.date, logs.activity, logs.status, logs.feedback, users.username
         FROM logs
         JOIN users ON logs.student_id = users.id
-        WHERE users.supervisor_id = ?
+        WHERE logs.supervisor_id = ?
     """
     params = [current_user.id]
 
-    if request.method == "POST":
-        # Reset button clears filters
-        if "reset" in request.form:
-            conn.close()
-            return redirect(url_for("supervisor"))
-
-        selected_student = request.form.get("student_id", "all")
-        start_date = request.form.get("start_date")
-        end_date = request.form.get("end_date")
+    if selected_student != "all":
+        query += " AND logs.student_id = ?"
+        params.append(selected_student)
 
-        if selected_student != "all":
-            query += " AND users.id = ?"
-            params.append(selected_student)
+    if start_date:
+        query += " AND logs.date >= ?"
+        params.append(start_date)
 
-        if start_date:
-            query += " AND logs.date >= ?"
-            params.append(start_date)
+    if end_date:
+        query += " AND logs.date <= ?"
+        params.append(end_date)
 
-        if end_date:
-            query += " AND logs.date <= ?"
-            params.append(end_date)
+    # Keyset pagination: continue after the (date, id) of the previous page's last row
+    cursor = decode_cursor(after, 2)
+    if cursor:
+        query += " AND (logs.date, logs.id) < (?, ?)"
+        params.extend(cursor)
 
-    query += " ORDER BY logs.date DESC"
-    logs = conn.execute(query, tuple(params)).fetchall()
+    query += " ORDER BY logs.date DESC, logs.id DESC LIMIT ?"
+    params.append(per_page + 1)
+    rows = conn.execute(query, tuple(params)).fetchall()
+    logs, next_cursor = split_page(rows, per_page, key=lambda row: (row["date"], row["id"]))
 
-    conn.close()
+    # The response is streamed, and the session cookie is sent before the
+    # body: pop flashed messages now so they are not shown again next time.
+    get_flashed_messages(with_categories=True)
 
-    return render_template(
+    return stream_template(
         "supervisor.html",
         logs=logs,
         students=students,
         selected_student=selected_student,
         start_date=start_date,
-        end_date=end_date, 
+        end_date=end_date,
+        next_cursor=next_cursor,
+        is_first_page=cursor is None,
         Page ='supervisor'
     )
 
 
+# --------------------------
+# SUPERVISOR: SEARCH LOGS
+# --------------------------
+@app.route("/supervisor/search")
+@login_required
+def supervisor_search():
+    """Supervisors search their students' logs by activity and feedback text."""
+    if current_user.role != "supervisor":
+        flash("Access Denied! Supervisors only.", "danger")
+        return redirect(url_for("login"))
+
+    q = request.args.get("q", "").strip()
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = 20
+
+    results = []
+    if q:
+        conn = get_db_connection()
+        results = search_logs(conn, q, supervisor_id=current_user.id,
+                              limit=per_page + 1, offset=(page - 1) * per_page)
+    has_next = len(results) > per_page
+
+    return render_template(
+        "supervisor_search.html",
+        results=results[:per_page],
+        q=q,
+        page=page,
+        has_next=has_next,
+        Page ='supervisor_search'
+    )
+
+
 # --------------------------
 # SUPERVISOR: UPDATE STATUS
 # --------------------------
@@ -350,17 +541,74 @@ def update_status(log_id):
         return redirect(url_for("login"))
 
     action = request.form.get("action")
-    new_status = "Approved" if action == "approve" else "Disapproved"
+    new_status = APPROVED if action == "approve" else DISAPPROVED
 
-    conn = get_db_connection()
-    conn.execute("UPDATE logs SET status = ? WHERE id = ?", (new_status, log_id))
-    conn.commit()
-    conn.close()
+    # RETURNING names the student whose pages (and supervisor's) must be refreshed
+    rows = run_write(lambda conn: conn.execute(
+        "UPDATE logs SET status = ? WHERE id = ? RETURNING student_id", (new_status, log_id)
+    ).fetchall())
+    bump_students(row[0] for row in rows)
 
-    flash(f"Log {log_id} marked as {new_status}!", "info")
+    flash(f"Log {log_id} marked as {status_label(new_status)}!", "info")
     return redirect(url_for("supervisor"))
 
 
+# --------------------------
+# SUPERVISOR: BULK APPROVE / DISAPPROVE
+# --------------------------
+@app.route("/supervisor/bulk_status", methods=["POST"])
+@login_required
+def supervisor_bulk_status():
+    """Approve or disapprove many logs at once; answers with JSON counts.
+
+    Takes form fields or a JSON body: ``action`` plus either ``log_ids`` or
+    ``scope=pending`` with optional ``start_date``, ``end_date`` and ``student_id``.
+    """
+    if current_user.role != "supervisor":
+        return jsonify({"error": "Supervisors only."}), 403
+
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "The JSON body must be an object."}), 400
+    else:
+        data = request.form
+    action = data.get("action")
+    if not isinstance(action, str) or action not in STATUSES:
+        return jsonify({"error": "action must be 'approve' or 'disapprove'."}), 400
+
+    try:
+        if data.get("scope") == "pending":
+            start_date = data.get("start_date") or None
+            end_date = data.get("end_date") or None
+            for value in (start_date, end_date):
+                if value:
+                    date.fromisoformat(value)
+            student_id = data.get("student_id")
+            student_id = int(student_id) if student_id not in (None, "", "all") else None
+            log_ids = None
+        else:
+            log_ids = data.get("log_ids", []) if request.is_json else request.form.getlist("log_ids")
+            if not isinstance(log_ids, list) or not all(
+                (isinstance(i, int) and not isinstance(i, bool)) or (isinstance(i, str) and i.isdigit())
+                for i in log_ids
+            ):
+                return jsonify({"error": "log_ids must be a list of log ids."}), 400
+            log_ids = [int(i) for i in log_ids]
+            if not log_ids:
+                return jsonify({"error": "No logs selected."}), 400
+            start_date = end_date = student_id = None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid log ids, student or date."}), 400
+
+    supervisor_id = current_user.id  # the write runs on the writer thread, outside this request
+    counts = run_write(lambda conn: set_status(
+        conn, supervisor_id, action, log_ids, start_date, end_date, student_id
+    ))
+    bump_supervisor(supervisor_id)
+    return jsonify(action=action, **counts)
+
+
 # --------------------------
 # SUPERVISOR: ADD FEEDBACK
 # --------------------------
@@ -374,42 +622,123 @@ def add_feedback(log_id):
 
     feedback = request.form.get("feedback", "").strip()
 
-    conn = get_db_connection()
-    conn.execute("UPDATE logs SET feedback = ? WHERE id = ?", (feedback, log_id))
-    conn.commit()
-    conn.close()
+    rows = run_write(lambda conn: conn.execute(
+        "UPDATE logs SET feedback = ? WHERE id = ? RETURNING student_id", (feedback, log_id)
+    ).fetchall())
+    bump_students(row[0] for row in rows)
 
     flash(f"Feedback added for Log {log_id}", "info")
     return redirect(url_for("supervisor"))
 
 
+# --------------------------
+# CALENDAR (STUDENT + SUPERVISOR)
+# --------------------------
+def _calendar_scope():
+    """(first day of month, student_id, supervisor_id) from the query string; ValueError if invalid."""
+    month = request.args.get("month")
+    first = parse_month(month) if month else date.today().replace(day=1)
+    if current_user.role == "student":
+        return first, current_user.id, None
+    student_id = request.args.get("student_id", "all")
+    return first, (int(student_id) if student_id != "all" else None), current_user.id
+
+
+@app.route("/calendar")
+@login_required
+def calendar_view():
+    """Month calendar with the number of logs per day and their statuses."""
+    if current_user.role not in ("student", "supervisor"):
+        flash("Access Denied! Students and supervisors only.", "danger")
+        return redirect(url_for("login"))
+
+    try:
+        first, student_id, supervisor_id = _calendar_scope()
+    except ValueError:
+        flash("Invalid month or student.", "danger")
+        return redirect(url_for("calendar_view"))
+
+    conn = get_db_connection()
+    days = month_summary(conn, first, student_id=student_id, supervisor_id=supervisor_id)
+    students = []
+    if supervisor_id is not None:
+        students = conn.execute("SELECT id, username FROM users WHERE role = 'student' AND supervisor_id = ?",
+                                (current_user.id,)).fetchall()
+    previous_month, next_month = adjacent_months(first)
+
+    return render_template(
+        "calendar.html",
+        month=first,
+        weeks=month_weeks(first),
+        days=days,
+        students=students,
+        selected_student=str(student_id) if supervisor_id is not None and student_id else "all",
+        previous_month=previous_month,
+        next_month=next_month,
+        today=date.today().isoformat(),
+        Page ='calendar'
+    )
+
+
+@app.route("/calendar/data")
+@login_required
+def calendar_data():
+    """Per-day counts for one month as JSON: ``?month=YYYY-MM`` (and ``student_id`` for supervisors)."""
+    if current_user.role not in ("student", "supervisor"):
+        return jsonify({"error": "Students and supervisors only."}), 403
+
+    try:
+        first, student_id, supervisor_id = _calendar_scope()
+    except ValueError:
+        return jsonify({"error": "month must be YYYY-MM and student_id a number."}), 400
+
+    conn = get_db_connection()
+    previous_month, next_month = adjacent_months(first)
+    return jsonify(
+        month=first.strftime("%Y-%m"),
+        days=month_summary(conn, first, student_id=student_id, supervisor_id=supervisor_id),
+        previous=previous_month,
+        next=next_month,
+    )
+
+
 # --------------------------
 # FILTER LOGS BY DATE (STUDENT)
 # --------------------------
 @app.route("/logs_by_date", methods=["GET", "POST"])
 @login_required
 def logs_by_date():
-    """Students filter their logs by a specific date."""
+    """Students filter their logs by a specific date (the calendar links here with ?date=)."""
     if current_user.role != "student":
         flash("Access Denied! Students only.", "danger")
         return redirect(url_for("login"))
 
     logs = []
-    selected_date = None
+    selected_date = request.values.get("date") or None
 
-    if request.method == "POST":
-        selected_date = request.form.get("date")
+    if selected_date:
+        try:
+            selected_date = date.fromisoformat(selected_date).isoformat()
+        except ValueError:
+            flash("Invalid date.", "danger")
+            return redirect(url_for("logs_by_date"))
 
+        # compare the raw column (not date(date)) so idx_logs_student_date finds the day directly
         conn = get_db_connection()
         logs = conn.execute(
-            "SELECT * FROM logs WHERE student_id = ? AND date(date) = ? ORDER BY date DESC",
+            "SELECT * FROM logs WHERE student_id = ? AND date = ? ORDER BY id",
             (current_user.id, selected_date),
         ).fetchall()
-        conn.close()
 
     return render_template("logs_by_date.html", logs=logs, selected_date=selected_date, Page ='logs_by_date')
 
 
+# --------------------------
+# STARTUP
+# --------------------------
+warmup.init_app(app)
+
+
 # --------------------------
 # RUN APP
 # --------------------------
@@ -0,0 +1,112 @@
+"""Set-based bulk approval for supervisors.
+
+``set_status`` changes many logs with one ``UPDATE`` per chunk of ids (or a
+single one for a date range) instead of one statement per log.
+``logs.supervisor_id`` (the student's supervisor, kept up to date by the
+migration 8 triggers) is the ownership check: logs of students who are not
+assigned to the supervisor are never touched.
+
+    python approvals.py --supervisor jdoe approve --ids 12,13,14
+    python approvals.py --supervisor jdoe approve --pending --start 2025-03-01 --end 2025-03-07
+"""
+import argparse
+import json
+import sqlite3
+
+from log_status import APPROVED, DISAPPROVED, PENDING
+from migrations import DB_PATH, migrate
+
+# the same codes update_status writes
+STATUSES = {"approve": APPROVED, "disapprove": DISAPPROVED}
+ID_CHUNK = 500  # ids per statement, well under SQLite's host parameter limit
+
+OWNED = "FROM logs WHERE supervisor_id = ?"
+
+
+def set_status(conn, supervisor_id, action, log_ids=None, start_date=None, end_date=None, student_id=None):
+    """Approve or disapprove logs owned by ``supervisor_id``; run inside one transaction.
+
+    Either ``log_ids`` (explicit selection) or the pending logs dated
+    ``start_date``..``end_date`` (inclusive, either end optional), optionally
+    for one student. Returns ``updated``; explicit ids also report
+    ``requested``, ``unchanged`` (already in that state) and ``rejected``
+    (unknown or not yours).
+    """
+    new_status = STATUSES[action]
+
+    if log_ids is not None:
+        ids = sorted(set(int(i) for i in log_ids))
+        counts = {"requested": len(ids), "updated": 0}
+        owned = 0
+        for start in range(0, len(ids), ID_CHUNK):
+            chunk = ids[start:start + ID_CHUNK]
+            marks = ", ".join("?" * len(chunk))
+            owned += conn.execute(
+                f"SELECT COUNT(*) {OWNED} AND id IN ({marks})", (supervisor_id, *chunk)
+            ).fetchone()[0]
+            counts["updated"] += conn.execute(f"""
+                UPDATE logs SET status = ?
+                WHERE supervisor_id = ? AND id IN ({marks}) AND status != ?
+            """, (new_status, supervisor_id, *chunk, new_status)).rowcount
+        counts["unchanged"] = owned - counts["updated"]
+        counts["rejected"] = len(ids) - owned
+        return counts
+
+    # every pending log in the range; uses the (supervisor_id, date) index
+    where = "status = ?"
+    params = [new_status, supervisor_id, PENDING]
+    if start_date:
+        where += " AND date >= ?"
+        params.append(start_date)
+    if end_date:
+        where += " AND date <= ?"
+        params.append(end_date)
+    if student_id:
+        where += " AND student_id = ?"
+        params.append(student_id)
+    updated = conn.execute(f"UPDATE logs SET status = ? WHERE supervisor_id = ? AND {where}", params).rowcount
+    return {"updated": updated}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Approve or disapprove many logs for one supervisor.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--supervisor", required=True, help="supervisor username")
+    parser.add_argument("action", choices=sorted(STATUSES))
+    parser.add_argument("--ids", help="comma-separated log ids")
+    parser.add_argument("--pending", action="store_true", help="all pending logs in the date range")
+    parser.add_argument("--start", help="YYYY-MM-DD (with --pending)")
+    parser.add_argument("--end", help="YYYY-MM-DD (with --pending)")
+    parser.add_argument("--student", help="limit --pending to one student username")
+    args = parser.parse_args()
+    if bool(args.ids) == args.pending:
+        parser.error("give either --ids or --pending")
+
+    migrate(args.db)
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    row = conn.execute("SELECT id FROM users WHERE username = ? AND role = 'supervisor'",
+                       (args.supervisor,)).fetchone()
+    if row is None:
+        parser.error(f"no supervisor named {args.supervisor!r}")
+    student_id = None
+    if args.student:
+        student = conn.execute("SELECT id FROM users WHERE username = ? AND role = 'student' AND supervisor_id = ?",
+                               (args.student, row[0])).fetchone()
+        if student is None:
+            parser.error(f"{args.student!r} is not one of {args.supervisor}'s students")
+        student_id = student[0]
+
+    log_ids = [int(i) for i in args.ids.split(",") if i.strip()] if args.ids else None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        counts = set_status(conn, row[0], args.action, log_ids, args.start, args.end, student_id)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    conn.close()
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""Self-hosted static assets: vendoring, fingerprinting, precompression, image variants.
+
+    python assets.py vendor   # fetch the pinned CSS/JS/fonts into static/vendor (needs internet once)
+    python assets.py build    # write static/dist and its manifest.json
+
+``vendor`` downloads each file in VENDOR, plus the fonts a stylesheet refers
+to, and records their sha384 in static/vendor/VENDOR.json. ``build`` copies
+every file under static/ to static/dist with a content hash in its name
+(url() references in stylesheets are rewritten to match), writes ``.gz``
+(and ``.br``, with the optional ``brotli`` package) variants of text files,
+and, with Pillow installed, resized WebP (and AVIF, when Pillow supports it)
+variants of each JPEG/PNG.
+
+In the templates, ``asset_url(path)`` gives the fingerprinted URL once the
+build exists and the plain static URL before; a vendored file that has not
+been fetched yet falls back to its pinned CDN URL, and
+``asset_integrity(path)`` then adds its ``integrity``/``crossorigin``
+attributes (from VENDOR_SRI or VENDOR.json). ``picture(path, alt)``
+renders a ``<picture>`` with the image variants in ``srcset``. Files under
+/static/dist are served with a one-year immutable Cache-Control, as the
+precompressed variant when the browser accepts it.
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import threading
+
+from flask import current_app, request, send_from_directory, url_for
+from markupsafe import Markup, escape
+from werkzeug.security import safe_join
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST = "dist"  # build output, under the static folder
+MANIFEST = "manifest.json"
+
+# static/vendor/<path> -> pinned URL
+VENDOR = {
+    "bootstrap/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+    "bootstrap/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js",
+    "bootstrap-icons/bootstrap-icons.css": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/bootstrap-icons.css",
+    "montserrat/index.css": "https://cdn.jsdelivr.net/npm/@fontsource-variable/montserrat@5.0.19/index.css",
+}
+# Subresource Integrity of VENDOR files, as published upstream; ``vendor`` checks downloads against them
+VENDOR_SRI = {
+    "bootstrap/bootstrap.min.css": "sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH",
+    "bootstrap/bootstrap.bundle.min.js": "sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz",
+}
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".map", ".ico", ".ttf", ".otf", ".eot"}
+IMAGES = {".jpg", ".jpeg", ".png"}
+IMAGE_WIDTHS = (480, 960, 1600)
+IMAGE_QUALITY = {"webp": 78, "avif": 55}
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _is_local(ref):
+    return not (ref.startswith(("data:", "#", "/")) or "://" in ref)
+
+
+def _split_ref(ref):
+    """``fonts/x.woff2?v=1#y`` -> ("fonts/x.woff2", "#y"); the query only busts caches, the hash does that now."""
+    path, _, fragment = ref.partition("#")
+    return path.split("?", 1)[0], "#" + fragment if fragment else ""
+
+
+# --------------------------
+# VENDOR
+# --------------------------
+def vendor(static_dir=STATIC_DIR, timeout=30):
+    """Download VENDOR (and the files its stylesheets use) into static/vendor; returns the lock dict."""
+    root = os.path.join(static_dir, "vendor")
+    lock = {}
+    for path, url in VENDOR.items():
+        _fetch(url, root, path, lock, timeout)
+    with open(os.path.join(root, "VENDOR.json"), "w") as f:
+        json.dump(lock, f, indent=2, sort_keys=True)
+    return lock
+
+
+def _fetch(url, root, path, lock, timeout):
+    import urllib.parse
+    import urllib.request  # only needed here, and slow to import
+
+    if path in lock:
+        return
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        data = response.read()
+    sha384 = base64.b64encode(hashlib.sha384(data).digest()).decode()
+    if path in VENDOR_SRI and VENDOR_SRI[path] != f"sha384-{sha384}":
+        raise ValueError(f"{url} does not match its pinned integrity {VENDOR_SRI[path]}")
+    dest = os.path.join(root, path)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(dest, "wb") as f:
+        f.write(data)
+    lock[path] = {"url": url, "sha384": sha384}
+    if path.endswith(".css"):
+        for _, ref in _CSS_URL.findall(data.decode("utf-8")):
+            if _is_local(ref):
+                ref_path, _ = _split_ref(ref)
+                _fetch(urllib.parse.urljoin(url, ref_path), root,
+                       posixpath.normpath(posixpath.join(posixpath.dirname(path), ref_path)), lock, timeout)
+
+
+# --------------------------
+# BUILD
+# --------------------------
+def build(static_dir=STATIC_DIR):
+    """Write static/dist from static/; returns the manifest."""
+    out_dir = os.path.join(static_dir, DIST)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    files, images = {}, {}
+
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(static_dir):
+        rel_dir = os.path.relpath(dirpath, static_dir).replace(os.sep, "/")
+        if rel_dir == DIST:
+            dirnames[:] = []
+            continue
+        for name in filenames:
+            if name == "VENDOR.json":
+                continue
+            sources.append(posixpath.normpath(posixpath.join(rel_dir, name)))
+    # stylesheets last, so the files they refer to already have their hashed names
+    for path in sorted(sources, key=lambda p: (p.endswith(".css"), p)):
+        with open(os.path.join(static_dir, path), "rb") as f:
+            data = f.read()
+        if path.endswith(".css"):
+            data = _rewrite_css(path, data.decode("utf-8"), files).encode("utf-8")
+        files[path] = _write(out_dir, path, data)
+        if os.path.splitext(path)[1].lower() in IMAGES:
+            variants = _image_variants(out_dir, path, data)
+            if variants:
+                images[path] = variants
+
+    manifest = {"files": files, "images": images}
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def _write(out_dir, path, data):
+    """Write ``data`` under its hashed name (plus compressed variants); returns the name relative to dist."""
+    stem, ext = posixpath.splitext(path)
+    hashed = f"{stem}.{hashlib.blake2b(data, digest_size=5).hexdigest()}{ext}"
+    dest = os.path.join(out_dir, hashed)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(dest, "wb") as f:
+        f.write(data)
+    if ext.lower() in COMPRESSIBLE:
+        variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            # not worth a second request path when it barely shrinks
+            if len(compressed) < 0.9 * len(data):
+                with open(dest + suffix, "wb") as f:
+                    f.write(compressed)
+    return hashed
+
+
+def _rewrite_css(path, text, files):
+    base = posixpath.dirname(path)  # dist mirrors the folders, so also where the hashed copy goes
+
+    def replace(match):
+        ref = match.group(2).strip()
+        if not _is_local(ref):
+            return match.group(0)
+        ref_path, fragment = _split_ref(ref)
+        target = files.get(posixpath.normpath(posixpath.join(base, ref_path)))
+        if target is None:
+            return match.group(0)
+        return f'url("{posixpath.relpath(target, base or ".")}{fragment}")'
+
+    return _CSS_URL.sub(replace, text)
+
+
+def _image_variants(out_dir, path, data):
+    """Resized WebP/AVIF copies of an image; {"width", "height", "variants": {format: [[width, name]]}}."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    Image.init()
+    formats = [fmt for fmt in ("avif", "webp") if fmt.upper() in Image.SAVE]
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() or image.mode == "P" else "RGB")
+        width, height = image.size
+        widths = sorted({w for w in IMAGE_WIDTHS if w < width} | {width})
+        variants = {}
+        stem = posixpath.splitext(path)[0]
+        for fmt in formats:
+            for w in widths:
+                resized = image if w == width else image.resize((w, round(height * w / width)), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, fmt.upper(), quality=IMAGE_QUALITY[fmt])
+                variants.setdefault(fmt, []).append([w, _write(out_dir, f"{stem}-{w}.{fmt}", buffer.getvalue())])
+    return {"width": width, "height": height, "variants": variants}
+
+
+# --------------------------
+# FLASK INTEGRATION
+# --------------------------
+class Assets:
+    """The build manifest of one app, reloaded when it changes in debug mode."""
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self.path = os.path.join(static_dir, DIST, MANIFEST)
+        self._mtime = self._stat()
+        self._read()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read(self):
+        manifest = {}
+        if self._mtime is not None:
+            with open(self.path) as f:
+                manifest = json.load(f)
+        self.files = manifest.get("files", {})
+        self.images = manifest.get("images", {})
+        self.missing_vendor = {f"vendor/{path}": url for path, url in VENDOR.items()
+                               if not os.path.isfile(os.path.join(self.static_dir, "vendor", path))}
+        integrity = {f"vendor/{path}": sri for path, sri in VENDOR_SRI.items()}
+        lock_path = os.path.join(self.static_dir, "vendor", "VENDOR.json")
+        if os.path.isfile(lock_path):
+            with open(lock_path) as f:
+                integrity.update({f"vendor/{path}": f"sha384-{entry['sha384']}" for path, entry in json.load(f).items()})
+        self.integrity = integrity
+
+    def load(self):
+        """Re-read the manifest if a build has replaced it."""
+        mtime = self._stat()
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._read()
+
+
+_assets_lock = threading.Lock()
+
+
+def get_assets(app=None):
+    app = app or current_app
+    assets = app.extensions.get("assets")
+    if assets is None:
+        with _assets_lock:
+            assets = app.extensions.get("assets")
+            if assets is None:
+                assets = app.extensions["assets"] = Assets(app.static_folder)
+    elif app.debug:
+        assets.load()
+    return assets
+
+
+def asset_url(path):
+    """URL of a file under static/: fingerprinted once built, the CDN for vendor files not fetched yet."""
+    assets = get_assets()
+    hashed = assets.files.get(path)
+    if hashed is not None:
+        return url_for("dist_asset", filename=hashed)
+    if path in assets.missing_vendor:
+        return assets.missing_vendor[path]
+    return url_for("static", filename=path)
+
+
+def asset_integrity(path):
+    """``integrity``/``crossorigin`` attributes for a vendor file served from its CDN, when its hash is known."""
+    assets = get_assets()
+    if path in assets.missing_vendor and path in assets.integrity:
+        return Markup(f' {_attrs({"integrity": assets.integrity[path], "crossorigin": "anonymous"})}')
+    return ""
+
+
+def _attrs(attrs):
+    # Python-friendly names: class_ -> class, aria_hidden -> aria-hidden
+    return " ".join(f'{name.rstrip("_").replace("_", "-")}="{escape(value)}"'
+                    for name, value in attrs.items() if value is not None)
+
+
+def picture(path, alt="", sizes="100vw", **attrs):
+    """``<picture>`` for an image under static/, offering its AVIF/WebP variants by width."""
+    info = get_assets().images.get(path)
+    img = {"src": asset_url(path), "alt": alt, "decoding": "async"}
+    sources = []
+    if info:
+        img.update(width=info["width"], height=info["height"])
+        for fmt in ("avif", "webp"):
+            if fmt in info["variants"]:
+                srcset = ", ".join(f"{url_for('dist_asset', filename=name)} {w}w"
+                                   for w, name in info["variants"][fmt])
+                sources.append(f"<source {_attrs({'type': f'image/{fmt}', 'srcset': srcset, 'sizes': sizes})}>")
+    img.update(attrs)
+    return Markup(f"<picture>{''.join(sources)}<img {_attrs(img)}></picture>")
+
+
+def send_asset(filename):
+    """Serve a built file, precompressed when the browser accepts it; it never changes, so cache it for good."""
+    dist = os.path.join(current_app.static_folder, DIST)
+    max_age = current_app.config.get("ASSETS_MAX_AGE", 31536000)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        path = safe_join(dist, filename + suffix)
+        if request.accept_encodings[encoding] and path is not None and os.path.isfile(path):
+            response = send_from_directory(dist, filename + suffix, mimetype=mimetype, max_age=max_age)
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_from_directory(dist, filename, mimetype=mimetype, max_age=max_age)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.add_url_rule(f"{app.static_url_path}/{DIST}/<path:filename>", "dist_asset", send_asset)
+    app.jinja_env.globals.update(asset_url=asset_url, asset_integrity=asset_integrity, picture=picture)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("vendor", "build"))
+    parser.add_argument("--static", default=STATIC_DIR, help="static folder (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command == "vendor":
+        lock = vendor(args.static)
+        print(f"fetched {len(lock)} files into {os.path.join(args.static, 'vendor')}")
+        return
+    manifest = build(args.static)
+    out_dir = os.path.join(args.static, DIST)
+
+    def size(name, suffix=""):
+        path = os.path.join(out_dir, name + suffix)
+        return os.path.getsize(path) if os.path.exists(path) else size(name) if suffix else 0
+
+    names = manifest["files"].values()
+    print(f"{len(manifest['files'])} files: {sum(map(size, names)) / 1024:.0f} KiB, "
+          f"{sum(size(name, '.gz') for name in names) / 1024:.0f} KiB gzipped; "
+          f"{len(manifest['images'])} images with WebP/AVIF variants")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Online database backups.
+
+Backups use SQLite's backup API (``Connection.backup``) a few hundred pages
+at a time, so writers are only locked out for the duration of one step and
+the copy is always a consistent snapshot (including WAL contents). A write
+from another connection between two steps makes SQLite start the copy over
+from page 1; after a few such restarts the rest is copied in a single step
+(see ``copy_online``). The copy
+is then compressed in fixed-size chunks into ``backups/`` and old backups
+are rotated out. With ``BACKUP_MODE = "incremental"`` the app stores
+deduplicated snapshots instead (see incremental_backup.py).
+
+    python backup.py [--db instance/siwes.db] [--dest backups] [--compress gzip|zstd|none]
+
+``zstd`` needs the optional ``zstandard`` package.
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+import incremental_backup
+
+DB_PATH = "instance/siwes.db"
+BACKUP_DIR = "backups"
+PREFIX = "siwes_backup_"
+CHUNK_SIZE = 1024 * 1024
+
+EXTENSIONS = {"none": ".db", "gzip": ".db.gz", "zstd": ".db.zst"}
+
+
+def _open_compressed(path, compress):
+    if compress == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compress == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd backups need the 'zstandard' package (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+    if compress == "none":
+        return open(path, "wb")
+    raise ValueError(f"Unknown compression {compress!r}")
+
+
+class _Restarted(Exception):
+    pass
+
+
+def copy_online(src, dst, pages=256, sleep=0.005, max_restarts=3):
+    """Copy ``src`` into ``dst`` with the backup API; returns the number of restarts.
+
+    ``pages`` pages are copied per step with ``sleep`` seconds between steps so
+    live writers get a turn. When another connection writes between two steps,
+    SQLite starts the whole copy over from page 1, and with the write queue
+    committing all the time that could go on forever: after ``max_restarts``
+    restarts the copy is done in one step instead (one read transaction, which
+    in WAL mode does not block the writer).
+    """
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        # a step that leaves at least as much to copy as the one before started over
+        if state["remaining"] is not None and remaining >= state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _Restarted
+        state["remaining"] = remaining
+
+    try:
+        src.backup(dst, pages=pages, progress=progress, sleep=sleep)
+    except _Restarted:
+        src.backup(dst, pages=-1)
+    return state["restarts"]
+
+
+def backup_database(db_path=DB_PATH, dest_dir=BACKUP_DIR, compress="gzip", pages=256, sleep=0.005):
+    """Take a consistent online snapshot of ``db_path`` and return the backup file path.
+
+    The snapshot is copied ``pages`` pages at a time (see ``copy_online``).
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    final_path = os.path.join(dest_dir, PREFIX + stamp + EXTENSIONS[compress])
+    snapshot_path = os.path.join(dest_dir, f".{PREFIX}{stamp}.tmp")
+
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(snapshot_path)
+    try:
+        copy_online(src, dst, pages=pages, sleep=sleep)
+    finally:
+        dst.close()
+        src.close()
+
+    try:
+        # write next to the final name and rename, so a half-written file never looks like a backup
+        partial_path = final_path + ".part"
+        with open(snapshot_path, "rb") as raw, _open_compressed(partial_path, compress) as out:
+            shutil.copyfileobj(raw, out, CHUNK_SIZE)
+        os.replace(partial_path, final_path)
+    finally:
+        os.remove(snapshot_path)
+    return final_path
+
+
+def list_backups(dest_dir=BACKUP_DIR, mode="full"):
+    """Backups in ``dest_dir``, newest first, as (name, size_in_bytes, modified_datetime).
+
+    With ``mode="incremental"`` these are the snapshot manifests, and the size
+    is that of the database they restore.
+    """
+    if mode == "incremental":
+        found = []
+        for name in incremental_backup.list_snapshots(dest_dir):
+            manifest = incremental_backup.load_manifest(dest_dir, name)
+            found.append((name, manifest["size"], datetime.fromisoformat(manifest["created"])))
+        return found[::-1]
+    if not os.path.isdir(dest_dir):
+        return []
+    found = []
+    for name in os.listdir(dest_dir):
+        if name.startswith(PREFIX) and name.endswith(tuple(EXTENSIONS.values())):
+            stat = os.stat(os.path.join(dest_dir, name))
+            found.append((name, stat.st_size, datetime.fromtimestamp(stat.st_mtime)))
+    # names embed the timestamp, so they sort chronologically
+    return sorted(found, reverse=True)
+
+
+def rotate(dest_dir=BACKUP_DIR, keep=10):
+    """Delete all but the ``keep`` newest backups; return the deleted names."""
+    removed = []
+    for name, _, _ in list_backups(dest_dir)[keep:]:
+        os.remove(os.path.join(dest_dir, name))
+        removed.append(name)
+    return removed
+
+
+# --------------------------
+# RUNNER
+# --------------------------
+class BackupRunner:
+    """Runs one backup at a time and remembers the last outcome.
+
+    The admin settings page queues a "backup" job (see jobs.py), whose
+    handler calls ``run`` on a job worker thread.
+    """
+
+    def __init__(self, db_path, dest_dir, compress="gzip", keep=10, pages=256, mode="full"):
+        self.db_path = db_path
+        self.dest_dir = dest_dir
+        self.compress = compress
+        self.keep = keep
+        self.pages = pages
+        self.mode = mode  # "full" or "incremental" (see incremental_backup.py)
+
+        self._lock = threading.Lock()
+        self._running = False
+        self.last = None  # dict describing the last finished backup
+
+    @property
+    def running(self):
+        return self._running
+
+    def run(self):
+        """Take a backup now and return the outcome dict (also kept as ``last``)."""
+        with self._lock:
+            if self._running:
+                raise RuntimeError("A backup is already running.")
+            self._running = True
+        started = time.perf_counter()
+        try:
+            if self.mode == "incremental":
+                manifest = incremental_backup.backup(self.db_path, self.dest_dir, pages=self.pages)
+                removed, _ = incremental_backup.prune(self.dest_dir, self.keep)
+                self.last = {"ok": True, "file": manifest["name"], "size": manifest["size"],
+                             "written": manifest["bytes_written"], "seconds": time.perf_counter() - started,
+                             "rotated": removed, "finished": datetime.now()}
+            else:
+                path = backup_database(self.db_path, self.dest_dir, self.compress, pages=self.pages)
+                removed = rotate(self.dest_dir, self.keep)
+                size = os.path.getsize(path)
+                self.last = {"ok": True, "file": os.path.basename(path), "size": size, "written": size,
+                             "seconds": time.perf_counter() - started, "rotated": removed,
+                             "finished": datetime.now()}
+        except Exception as e:
+            self.last = {"ok": False, "error": str(e), "seconds": time.perf_counter() - started,
+                         "finished": datetime.now()}
+        finally:
+            with self._lock:
+                self._running = False
+        return self.last
+
+
+_runner_lock = threading.Lock()
+
+
+def get_backup_runner(app=None):
+    app = app or current_app
+    runner = app.extensions.get("backup_runner")
+    if runner is None:
+        with _runner_lock:
+            runner = app.extensions.get("backup_runner")
+            if runner is None:
+                runner = BackupRunner(
+                    app.config.get("DATABASE", DB_PATH),
+                    app.config.get("BACKUP_DIR", BACKUP_DIR),
+                    compress=app.config.get("BACKUP_COMPRESSION", "gzip"),
+                    keep=app.config.get("BACKUP_KEEP", 10),
+                    pages=app.config.get("BACKUP_PAGES_PER_STEP", 256),
+                    mode=app.config.get("BACKUP_MODE", "full"),
+                )
+                app.extensions["backup_runner"] = runner
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Take an online backup of the SIWES database.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--dest", default=BACKUP_DIR)
+    parser.add_argument("--compress", choices=sorted(EXTENSIONS), default="gzip")
+    parser.add_argument("--keep", type=int, default=10, help="number of backups to keep")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path = backup_database(args.db, args.dest, args.compress)
+    removed = rotate(args.dest, args.keep)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1024:.1f} KB) in {time.perf_counter() - start:.2f}s")
+    for name in removed:
+        print(f"Rotated out {name}")
+
+
+if __name__ == "__main__":
+    main()
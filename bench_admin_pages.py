@@ -0,0 +1,113 @@
+"""Benchmark admin log paging: LIMIT/OFFSET versus keyset cursors.
+
+Seeds a database with N synthetic logs (1M by default), then walks every page
+of the admin logs list with keyset cursors using ``admin.logs_page_query``,
+and times the old ``LIMIT ? OFFSET ?`` query at a few
+sampled depths (walking every page with OFFSET would take hours).
+
+    python bench_admin_pages.py --logs 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from admin import logs_page_query
+from log_status import status_code
+from migrations import create_tables, migrate
+
+PER_PAGE = 25
+
+OFFSET_QUERY = """
+    SELECT logs.id, logs.date, logs.activity, logs.status, users.username AS student
+    FROM logs JOIN users ON logs.student_id = users.id
+    {where}
+    ORDER BY logs.date DESC, logs.id DESC LIMIT ? OFFSET ?
+"""
+
+
+def seed(path, n_logs, n_students=2000, seed=1):
+    """Insert users and logs first and build indexes afterwards, which is much faster."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    create_tables(conn.cursor())
+    conn.executemany("INSERT INTO users (username, password_hash, role) VALUES (?, 'x', 'student')",
+                     [(f"student{i:05d}",) for i in range(n_students)])
+    statuses = ("pending", "Approved", "Disapproved")
+    batch = []
+    for i in range(n_logs):
+        day = rng.randrange(0, 3 * 365)
+        batch.append((rng.randint(1, n_students),
+                      f"{2023 + day // 365}-{1 + day % 365 // 31:02d}-{1 + day % 28:02d}",
+                      "Synthetic activity entry", rng.choice(statuses)))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO logs (student_id, date, activity, status) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    conn.executemany("INSERT INTO logs (student_id, date, activity, status) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+    migrate(path)
+
+
+def walk_keyset(conn, status):
+    """Fetch every page in order; return per-page latencies."""
+    times = []
+    cursor = None
+    while True:
+        query, params = logs_page_query(status, cursor, PER_PAGE + 1)
+        start = time.perf_counter()
+        rows = conn.execute(query, params).fetchall()
+        times.append(time.perf_counter() - start)
+        if len(rows) <= PER_PAGE:
+            return times
+        last = rows[PER_PAGE - 1]
+        cursor = (last["date"], last["id"])
+
+
+def sample_offset(conn, status, total_pages, samples):
+    where, params = "", []
+    if status != "all":
+        where, params = "WHERE logs.status = ?", [status_code(status)]
+    results = []
+    for fraction in samples:
+        page = max(1, int(total_pages * fraction))
+        start = time.perf_counter()
+        conn.execute(OFFSET_QUERY.format(where=where), (*params, PER_PAGE, (page - 1) * PER_PAGE)).fetchall()
+        results.append((page, time.perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=1000000)
+    parser.add_argument("--status", default="all", help="all, pending, approved or disapproved")
+    parser.add_argument("--db", help="reuse an already seeded database")
+    args = parser.parse_args()
+
+    path = args.db
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="siwes_pages_"), "siwes.db")
+        start = time.perf_counter()
+        seed(path, args.logs)
+        print(f"seeded {args.logs} logs in {time.perf_counter() - start:.1f}s")
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+
+    start = time.perf_counter()
+    times = walk_keyset(conn, args.status)
+    wall = time.perf_counter() - start
+    print(f"keyset: {len(times)} pages in {wall:.1f}s; per page "
+          f"p50 {statistics.median(times) * 1000:.2f} ms, "
+          f"first {times[0] * 1000:.2f} ms, last {times[-1] * 1000:.2f} ms, max {max(times) * 1000:.2f} ms")
+
+    for page, elapsed in sample_offset(conn, args.status, len(times), (0, 0.1, 0.5, 0.9, 1.0)):
+        print(f"offset: page {page:>7} {elapsed * 1000:10.2f} ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Cold-start benchmark: time to first response of each route in a fresh worker.
+
+Every measurement starts a new Python process that imports the app and sends
+one request to one route, already signed in through the session cookie (so
+no earlier request has warmed anything up), then the same request again for
+comparison. Three ways of starting a worker are compared:
+
+* ``cold``: an empty template cache, as on a fresh deploy without warmup.py;
+* ``bytecode``: compiled templates loaded from TEMPLATE_CACHE_DIR (filled
+  with ``python warmup.py``);
+* ``warmup``: the bytecode cache plus ``warmup(app)`` (WARMUP_ON_START); the
+  warmup itself is reported separately, as the worker does it before taking
+  traffic.
+
+"ttfr" is from process start to the end of the first response (warmup
+included), "first" is the first request alone and "second" the repeat.
+Medians of ``--repeat`` runs:
+
+    python bench_cold_start.py --students 200 --logs 20000 --repeat 5 --out cold.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import seed_data
+
+MODES = ("cold", "bytecode", "warmup")
+
+# (name, signed in as, method, url, form)
+ROUTES = [
+    ("home", None, "GET", "/", None),
+    ("login page", None, "GET", "/login", None),
+    ("login", None, "POST", "/login", "student"),
+    ("student dashboard", "student", "GET", "/student", None),
+    ("log form", "student", "GET", "/log", None),
+    ("calendar", "student", "GET", "/calendar", None),
+    ("api logs", "student", "GET", "/api/v1/logs", None),
+    ("supervisor dashboard", "supervisor", "GET", "/supervisor", None),
+    ("supervisor search", "supervisor", "GET", "/supervisor/search?q=network", None),
+    ("admin dashboard", "admin", "GET", "/admin/dashboard", None),
+    ("admin logs", "admin", "GET", "/admin/logs", None),
+    ("admin students", "admin", "GET", "/admin/students", None),
+]
+
+
+# --------------------------
+# CHILD: one fresh worker, one route
+# --------------------------
+def child(spec):
+    started = spec["started"]
+    start = time.perf_counter()
+    from app import app
+    import warmup
+    imported = time.perf_counter()
+
+    app.config.update(TESTING=True, LOGIN_RATE_LIMIT=False, BCRYPT_LOG_ROUNDS=spec["cost"])
+    warmup_s = 0.0
+    if spec["mode"] == "warmup":
+        warmup.warmup(app)
+        warmup_s = time.perf_counter() - imported
+
+    name, role, method, url, form = ROUTES[spec["route"]]
+    client = app.test_client()
+    if role:
+        with client.session_transaction() as session:
+            session["_user_id"] = str(spec["users"][role]["id"])
+            session["_fresh"] = True
+    data = {"username": spec["users"][form]["username"], "password": spec["password"]} if form else None
+
+    begin = time.perf_counter()
+    response = client.open(url, method=method, data=data)
+    response.get_data()
+    first = time.perf_counter()
+    ttfr = time.time() - started
+    client.open(url, method=method, data=data).get_data()
+    second = time.perf_counter() - first
+
+    print(json.dumps({
+        "status": response.status_code, "import_s": imported - start, "warmup_s": warmup_s,
+        "first_s": first - begin, "second_s": second, "ttfr_s": ttfr,
+    }))
+    sys.stdout.flush()
+    # the password workers inherit our stdout: stop them, or the parent waits for them to exit
+    hasher = app.extensions.get("password_hasher")
+    if hasher is not None:
+        hasher.shutdown()
+    # skip interpreter teardown of the pool and writer
+    os._exit(0)
+
+
+# --------------------------
+# PARENT
+# --------------------------
+def precompile(workdir):
+    # also byte-compiles the app's modules, so every mode imports from .pyc files
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warmup.py")
+    subprocess.run([sys.executable, script], cwd=workdir, check=True, capture_output=True)
+
+
+def run_child(workdir, spec):
+    spec = dict(spec, started=time.time())
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", json.dumps(spec)],
+                         cwd=workdir, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def users(path):
+    conn = sqlite3.connect(path)
+    student = conn.execute(
+        "SELECT id, username FROM users WHERE role = 'student' AND supervisor_id IS NOT NULL ORDER BY id LIMIT 1"
+    ).fetchone()
+    supervisor = conn.execute("SELECT id, username FROM users WHERE id = "
+                              "(SELECT supervisor_id FROM users WHERE id = ?)", (student[0],)).fetchone()
+    admin = conn.execute("SELECT id, username FROM users WHERE role = 'admin' ORDER BY id LIMIT 1").fetchone()
+    conn.close()
+    return {role: {"id": row[0], "username": row[1]}
+            for role, row in (("student", student), ("supervisor", supervisor), ("admin", admin))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--supervisors", type=int, default=10)
+    parser.add_argument("--logs", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cost", type=int, default=4, help="bcrypt cost of seeded accounts (and the app)")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per route and mode")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes to run")
+    parser.add_argument("--out", help="write the results as JSON here")
+    args = parser.parse_args()
+
+    if args.child:
+        child(json.loads(args.child))
+        return
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))} (choose from {', '.join(MODES)})")
+
+    # the app finds instance/siwes.db and instance/template_cache relative to its working directory
+    workdir = tempfile.mkdtemp(prefix="siwes_cold_")
+    instance = os.path.join(workdir, "instance")
+    os.makedirs(instance)
+    db = os.path.join(instance, "siwes.db")
+    summary = seed_data.generate(db, args.students, args.supervisors, args.logs, args.seed, cost=args.cost)
+    print(f"seeded {summary['students']} students, {summary['supervisors']} supervisors, {summary['logs']} logs")
+    base = {"users": users(db), "password": seed_data.PASSWORD, "cost": args.cost}
+    cache_dir = os.path.join(instance, "template_cache")
+    precompile(workdir)
+
+    results = {}
+    for mode in modes:
+        for index, (name, *_rest) in enumerate(ROUTES):
+            runs = []
+            for _ in range(args.repeat):
+                if mode == "cold":
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                runs.append(run_child(workdir, dict(base, mode=mode, route=index)))
+            if mode == "cold":  # leave a full cache for the other modes
+                precompile(workdir)
+            results.setdefault(name, {})[mode] = {
+                key: statistics.median(run[key] for run in runs)
+                for key in ("import_s", "warmup_s", "first_s", "second_s", "ttfr_s")
+            } | {"status": runs[-1]["status"]}
+
+    print(f"{'route':<22}" + "".join(f" {mode + ' ttfr':>14} {'first':>8}" for mode in modes) + f" {'second':>8}")
+    for name, by_mode in results.items():
+        line = f"{name:<22}"
+        for mode in modes:
+            stats = by_mode[mode]
+            line += f" {1000 * stats['ttfr_s']:>14.1f} {1000 * stats['first_s']:>8.1f}"
+        print(line + f" {1000 * by_mode[modes[-1]]['second_s']:>8.2f}")
+    for mode in modes:
+        runs = [by_mode[mode] for by_mode in results.values()]
+        print(f"{mode:<9} import {1000 * statistics.median(r['import_s'] for r in runs):6.1f} ms, "
+              f"warmup {1000 * statistics.median(r['warmup_s'] for r in runs):6.1f} ms, "
+              f"first request {1000 * statistics.median(r['first_s'] for r in runs):6.1f} ms (median of routes)")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "meta": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                         "platform": platform.platform(), "cpus": os.cpu_count(), "repeat": args.repeat,
+                         "dataset": {key: summary[key] for key in ("students", "supervisors", "logs", "seed")}},
+                "routes": results,
+            }, f, indent=2)
+        print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
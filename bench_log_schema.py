@@ -0,0 +1,163 @@
+"""Benchmark the typed logs columns (migration 7) against the free-form ones.
+
+Seeds a schema-6 database with N logs (1M by default) whose dates and
+statuses look like the old form and code wrote them: plain dates, some with
+a time of day, and 'pending' / 'Approved' / 'disapproved' in mixed case.
+Each query is timed as the app used to write it, the database is migrated to
+version 7 (the migration itself is timed too), and the rewritten query is
+timed against the same data; the rows the two versions return are compared.
+
+    python bench_log_schema.py --logs 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from migrations import create_tables, migrate
+
+# (name, old query, new query, params) -- the params are drawn per run by ``draw``
+QUERIES = [
+    ("student status counts",
+     "SELECT lower(status), COUNT(*) FROM logs WHERE student_id = ? GROUP BY lower(status)",
+     "SELECT status, COUNT(*) FROM logs WHERE student_id = ? GROUP BY status",
+     "student"),
+    ("logs on one day",
+     "SELECT id FROM logs WHERE student_id = ? AND date(date) = ? ORDER BY id",
+     "SELECT id FROM logs WHERE student_id = ? AND date = ? ORDER BY id",
+     "student_day"),
+    ("month calendar",
+     "SELECT substr(date, 1, 10), lower(status), COUNT(*) FROM logs "
+     "WHERE student_id = ? AND date >= ? AND date < ? GROUP BY 1, 2",
+     "SELECT date, status, COUNT(*) FROM logs WHERE student_id = ? AND date >= ? AND date < ? GROUP BY 1, 2",
+     "student_month"),
+    ("admin recent activity",
+     "SELECT id FROM logs ORDER BY datetime(date) DESC, id DESC LIMIT 6",
+     "SELECT id FROM logs ORDER BY date DESC, id DESC LIMIT 6",
+     "none"),
+    ("admin logs by status",
+     "SELECT id FROM logs WHERE lower(status) = ? ORDER BY date DESC, id DESC LIMIT 26",
+     "SELECT id FROM logs WHERE status = ? ORDER BY date DESC, id DESC LIMIT 26",
+     "status"),
+    ("pending in a week",
+     "SELECT COUNT(*) FROM logs WHERE lower(status) = 'pending' AND date(date) BETWEEN ? AND ?",
+     "SELECT COUNT(*) FROM logs WHERE status = 0 AND date BETWEEN ? AND ?",
+     "week"),
+    ("logs in a week",
+     "SELECT COUNT(*) FROM logs WHERE date(date) BETWEEN ? AND ?",
+     "SELECT COUNT(*) FROM logs WHERE date BETWEEN ? AND ?",
+     "week"),
+]
+
+STATUS_SPELLINGS = ("pending", "Pending", "Approved", "approved", "Disapproved", "disapproved")
+STATUS_CODES = {"pending": 0, "approved": 1, "disapproved": 2}
+
+
+def seed(path, n_logs, n_students=2000, seed=1):
+    """Insert users and logs into the original tables, then migrate to version 6."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    create_tables(conn.cursor())
+    conn.executemany("INSERT INTO users (username, password_hash, role) VALUES (?, 'x', 'student')",
+                     [(f"student{i:05d}",) for i in range(n_students)])
+    batch = []
+    for i in range(n_logs):
+        day = rng.randrange(0, 3 * 365)
+        log_date = f"{2023 + day // 365}-{1 + day % 365 // 31:02d}-{1 + day % 28:02d}"
+        if rng.random() < 0.1:
+            log_date += f" {rng.randrange(8, 18):02d}:{rng.randrange(60):02d}"
+        batch.append((rng.randint(1, n_students), log_date, "Synthetic activity entry",
+                      rng.choice(STATUS_SPELLINGS)))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO logs (student_id, date, activity, status) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    conn.executemany("INSERT INTO logs (student_id, date, activity, status) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+    migrate(path, target=6)
+
+
+def draw(kind, rng, n_students, old):
+    """Random parameters for one run; status names become codes for the new schema."""
+    student = rng.randint(1, n_students)
+    year, month = rng.randrange(2023, 2026), rng.randrange(1, 13)
+    day = f"{year}-{month:02d}-{rng.randrange(1, 22):02d}"
+    if kind == "student":
+        return (student,)
+    if kind == "student_day":
+        return (student, day)
+    if kind == "student_month":
+        return (student, f"{year}-{month:02d}-01", f"{year + month // 12}-{month % 12 + 1:02d}-01")
+    if kind == "status":
+        name = rng.choice(tuple(STATUS_CODES))
+        return (name,) if old else (STATUS_CODES[name],)
+    if kind == "week":
+        return (day, day[:8] + f"{int(day[8:]) + 6:02d}")
+    return ()
+
+
+def time_query(conn, sql, params_list):
+    """Median seconds per run, and every run's rows (to compare old with new)."""
+    times, results = [], []
+    for params in params_list:
+        start = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        times.append(time.perf_counter() - start)
+        results.append(rows)
+    return statistics.median(times), results
+
+
+def normalize(rows):
+    """Old-schema rows with status names -> codes, so both versions compare equal."""
+    return sorted(tuple(STATUS_CODES.get(v, v) if isinstance(v, str) else v for v in row) for row in rows)
+
+
+def run_all(conn, runs, n_students, old, seed=7):
+    results = {}
+    for name, old_sql, new_sql, kind in QUERIES:
+        rng = random.Random(seed)
+        params_list = [draw(kind, rng, n_students, old) for _ in range(runs)]
+        results[name] = time_query(conn, old_sql if old else new_sql, params_list)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=1000000)
+    parser.add_argument("--runs", type=int, default=50, help="runs per query (random parameters)")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="siwes_schema_"), "siwes.db")
+    start = time.perf_counter()
+    seed(path, args.logs)
+    print(f"seeded {args.logs} logs in {time.perf_counter() - start:.1f}s")
+
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    size_before = os.path.getsize(path)
+    before = run_all(conn, args.runs, 2000, old=True)
+    conn.close()
+
+    start = time.perf_counter()
+    migrate(path)
+    migrated = time.perf_counter() - start
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    after = run_all(conn, args.runs, 2000, old=False)
+    conn.close()
+    print(f"migration 7 took {migrated:.1f}s; file {size_before / 2**20:.1f} MB -> {os.path.getsize(path) / 2**20:.1f} MB")
+
+    print(f"{'query':<24} {'before':>10} {'after':>10} {'speedup':>8}")
+    for name, *_ in QUERIES:
+        (old_time, old_rows), (new_time, new_rows) = before[name], after[name]
+        # the migration drops times of day, which can reorder logs within a day
+        same = all(normalize(a) == normalize(b) for a, b in zip(old_rows, new_rows))
+        print(f"{name:<24} {old_time * 1000:>8.3f}ms {new_time * 1000:>8.3f}ms {old_time / new_time:>7.1f}x"
+              f"{'' if same else '  (order within a day differs)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark logins per second against the number of password worker processes.
+
+Seeds a database with a few users at the given bcrypt cost, then for each
+worker count runs ``--clients`` threads that log in over and over through the
+real /login route for ``--seconds``. Meanwhile one more thread requests the
+home page to show how much the rush slows down requests that do no hashing.
+``0`` workers hashes inline on the request threads (the old behaviour).
+
+    python bench_login.py --cost 10 --clients 16 --workers 0,1,2,4
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+import bcrypt
+
+import db_utils
+from app import app
+from migrations import migrate
+
+PASSWORD = "bench-password"
+
+
+def seed(path, users, cost):
+    migrate(path)
+    conn = sqlite3.connect(path)
+    pw_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(cost)).decode()
+    conn.executemany("INSERT INTO users (username, password_hash, role) VALUES (?, ?, 'student')",
+                     [(f"user{i}", pw_hash) for i in range(users)])
+    conn.commit()
+    conn.close()
+
+
+def run(workers, clients, seconds, users):
+    """One round; returns (logins, failures, login latencies, home page latencies)."""
+    app.config["PASSWORD_WORKERS"] = workers
+    app.extensions.pop("password_hasher", None)
+    stop = time.perf_counter() + seconds
+    lock = threading.Lock()
+    logins, failures, login_times, home_times = [0], [0], [], []
+
+    def login_client(n):
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            resp = client.post("/login", data={"username": f"user{n % users}", "password": PASSWORD})
+            elapsed = time.perf_counter() - start
+            with lock:
+                login_times.append(elapsed)
+                if resp.status_code == 302:
+                    logins[0] += 1
+                else:
+                    failures[0] += 1
+            client.get("/logout")
+
+    def home_client():
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            client.get("/")
+            home_times.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    # start the pool (and its processes) before timing
+    from passwords import get_hasher
+    with app.app_context():
+        hasher = get_hasher()
+        if workers:
+            hasher.check(bcrypt.hashpw(b"x", bcrypt.gensalt(4)).decode(), "x")
+
+    threads = [threading.Thread(target=login_client, args=(i,)) for i in range(clients)]
+    threads.append(threading.Thread(target=home_client))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    hasher.shutdown()
+    return logins[0], failures[0], login_times, home_times
+
+
+def p99(values):
+    return sorted(values)[int(len(values) * 0.99)] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cost", type=int, default=10, help="bcrypt cost factor")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts (default 0,1,2,4..cores)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(",")]
+    else:
+        counts = [0] + [n for n in (1, 2, 4, 8, 16, 32) if n < cores] + [cores]
+
+    path = os.path.join(tempfile.mkdtemp(prefix="siwes_login_"), "siwes.db")
+    seed(path, args.users, args.cost)
+    # measuring hashing throughput, not the login rate limiter
+    app.config.update(DATABASE=path, BCRYPT_LOG_ROUNDS=args.cost, TESTING=True, LOGIN_RATE_LIMIT=False)
+
+    print(f"{cores} core(s), bcrypt cost {args.cost}, {args.clients} login clients, {args.seconds:.0f}s per run")
+    print(f"{'workers':>7} {'logins/s':>9} {'fail':>5} {'login p50':>10} {'login p99':>10} {'home p50':>9} {'home p99':>9}")
+    for workers in dict.fromkeys(counts):
+        logins, failures, login_times, home_times = run(workers, args.clients, args.seconds, args.users)
+        print(f"{workers:>7} {logins / args.seconds:>9.1f} {failures:>5} "
+              f"{statistics.median(login_times) * 1000:>8.0f}ms {p99(login_times) * 1000:>8.0f}ms "
+              f"{statistics.median(home_times) * 1000:>7.1f}ms {p99(home_times) * 1000:>7.1f}ms")
+    db_utils.shutdown(app)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark the student dashboard against one student with many logs.
+
+Compares the old approach (fetch every log with SELECT *, count in Python,
+slice the first five) with the grouped aggregate + LIMIT 5 used by
+``app.student``, reporting median latency and peak Python memory for each,
+then times the real /student route.
+
+    python bench_student.py --logs 10000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from flask_bcrypt import generate_password_hash
+
+import db_utils
+from app import app
+from log_status import APPROVED, DISAPPROVED, PENDING
+from migrations import migrate
+
+PASSWORD = "bench"
+WORDS = ("configured switch router cable patch panel server backup report meeting "
+         "documentation ticket install network printer user account audit").split()
+
+
+def seed(path, n_logs, seed=1):
+    migrate(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    pw_hash = generate_password_hash(PASSWORD, rounds=4).decode("utf-8")
+    cur = conn.execute("INSERT INTO users (username, password_hash, role) VALUES ('bench', ?, 'student')",
+                       (pw_hash,))
+    student_id = cur.lastrowid
+    rows = []
+    for i in range(n_logs):
+        activity = " ".join(rng.choice(WORDS) for _ in range(rng.randint(60, 200)))
+        status = rng.choice((PENDING, APPROVED, DISAPPROVED))
+        rows.append((student_id, f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}", activity, status, ""))
+    conn.executemany("INSERT INTO logs (student_id, date, activity, status, feedback) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return student_id
+
+
+def before(conn, student_id):
+    logs = conn.execute("SELECT * FROM logs WHERE student_id = ? ORDER BY date DESC", (student_id,)).fetchall()
+    total = len(logs)
+    pending = len([log for log in logs if log["status"] == PENDING])
+    approved = len([log for log in logs if log["status"] == APPROVED])
+    return total, pending, approved, logs[:5]
+
+
+def after(conn, student_id):
+    counts = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM logs WHERE student_id = ? GROUP BY status", (student_id,)
+    ).fetchall())
+    recent = conn.execute(
+        "SELECT id, date, activity, status, feedback FROM logs WHERE student_id = ? ORDER BY date DESC LIMIT 5",
+        (student_id,)
+    ).fetchall()
+    return sum(counts.values()), counts.get(PENDING, 0), counts.get(APPROVED, 0), recent
+
+
+def measure(fn, conn, student_id, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(conn, student_id)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn(conn, student_id)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="siwes_bench_"), "siwes.db")
+    student_id = seed(path, args.logs)
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    print(f"student with {args.logs} logs")
+    results = {}
+    for name, fn in (("before", before), ("after", after)):
+        median, peak, result = measure(fn, conn, student_id, args.repeat)
+        results[name] = result[:3]
+        print(f"{name:<8} median {median * 1000:8.2f} ms   peak memory {peak / 1024:10.1f} KiB")
+    conn.close()
+    assert results["before"] == results["after"], results
+
+    # end to end through the route
+    db_utils.shutdown(app)
+    app.config["DATABASE"] = path
+    client = app.test_client()
+    client.post("/login", data={"username": "bench", "password": PASSWORD})
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        resp = client.get("/student")
+        times.append(time.perf_counter() - start)
+        assert resp.status_code == 200
+    db_utils.shutdown(app)
+    print(f"/student median {statistics.median(times) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
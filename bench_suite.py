@@ -0,0 +1,389 @@
+"""Repeatable load benchmark: scripted user journeys against a synthetic database.
+
+Runs the journeys real users take (log in, open a dashboard, page through
+logs, search, look at the calendar, approve or add a log, log out) through
+the Flask test client against a database from ``seed_data.py``, and reports
+per step the p50/p95/p99/max latency, the number of SQL statements the step
+ran (request thread plus the write queue), peak Python memory, and errors.
+The same seed and iterations give the same requests in the same order, so
+results can be saved as a baseline and compared on every change:
+
+    python bench_suite.py --students 500 --logs 50000 --out baseline.json
+    python bench_suite.py --students 500 --logs 50000 --compare baseline.json --fail-on-regression
+
+``--db`` benchmarks a copy of an existing database instead (the original is
+not touched; every account needs the same password). Query counts are exact
+with one client; with ``--clients`` above 1 the write queue's statements are
+shared out among whichever requests are waiting on it.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import db_utils
+import seed_data
+from app import app
+from profiling import get_profiler
+
+# recorded with the results, so a baseline says what it was measured with
+CONFIG_KEYS = ("DB_POOL_SIZE", "DB_WRITE_QUEUE", "SQLITE_WAL", "SQLITE_SYNCHRONOUS", "USER_CACHE_SIZE",
+               "BCRYPT_LOG_ROUNDS", "PASSWORD_WORKERS", "LOGIN_RATE_LIMIT", "SUPERVISOR_PAGE_SIZE")
+MONTHS = [f"2025-{month:02d}" for month in range(1, 7)]
+SEARCH_TERMS = ("network", "report", "server backup", "safety briefing", "circuit", "invoice")
+
+
+class Recorder:
+    """Collects latencies, statement counts, peak memory and errors per step."""
+
+    def __init__(self):
+        self.steps = {}
+        self.journeys = {}
+        self.tracing = False
+        self._lock = threading.Lock()
+        self._profiler = get_profiler(app)
+        self._writer = db_utils.get_writer(app)
+
+    def _queries(self):
+        if self._profiler is None:  # --set SQL_PROFILE=false, to measure the profiler itself
+            return 0
+        count = self._profiler.count()
+        if self._writer is not None:
+            count += self._profiler.count(self._writer.thread_id)
+        return count
+
+    def request(self, client, step, method, url, **kwargs):
+        """Send one request (redirects are not followed) and record it under ``step``."""
+        if self.tracing:
+            tracemalloc.reset_peak()
+        queries = self._queries()
+        start = time.perf_counter()
+        try:
+            resp = client.open(url, method=method, **kwargs)
+            failed = resp.status_code >= 400
+        except Exception:
+            resp, failed = None, True
+        elapsed = time.perf_counter() - start
+        queries = self._queries() - queries
+        peak = tracemalloc.get_traced_memory()[1] if self.tracing else 0
+
+        with self._lock:
+            sample = self.steps.setdefault(step, {"times": [], "queries": [], "errors": 0, "peak": 0})
+            if self.tracing:
+                sample["peak"] = max(sample["peak"], peak)
+            else:
+                sample["times"].append(elapsed)
+                sample["queries"].append(queries)
+                sample["errors"] += failed
+        return resp
+
+    def journey(self, name, elapsed):
+        if not self.tracing:
+            with self._lock:
+                self.journeys.setdefault(name, []).append(elapsed)
+
+
+# --------------------------
+# JOURNEYS
+# --------------------------
+# Each takes (recorder, client, rng, dataset) and runs one visit, login to logout.
+
+def login_journey(rec, client, rng, data):
+    student = rng.choice(data["students"])
+    rec.request(client, "login: POST /login", "POST", "/login",
+                data={"username": student["username"], "password": data["password"]})
+    rec.request(client, "login: GET /logout", "GET", "/logout")
+
+
+def student_journey(rec, client, rng, data):
+    student = rng.choice(data["students"])
+    day = rng.choice(data["days"])
+    rec.request(client, "student: POST /login", "POST", "/login",
+                data={"username": student["username"], "password": data["password"]})
+    rec.request(client, "student: GET /student", "GET", "/student")
+    rec.request(client, "student: GET /calendar", "GET", f"/calendar?month={rng.choice(MONTHS)}")
+    rec.request(client, "student: GET /logs_by_date", "GET", f"/logs_by_date?date={day}")
+    rec.request(client, "student: POST /log", "POST", "/log",
+                data={"date": day, "activity": "Benchmark entry: " + " ".join(rng.sample(seed_data.WORDS, 12))})
+    rec.request(client, "student: GET /logout", "GET", "/logout")
+
+
+def supervisor_journey(rec, client, rng, data):
+    supervisor = rng.choice(data["supervisors"])
+    rec.request(client, "supervisor: POST /login", "POST", "/login",
+                data={"username": supervisor["username"], "password": data["password"]})
+    rec.request(client, "supervisor: GET /supervisor", "GET", "/supervisor")
+    rec.request(client, "supervisor: GET /supervisor/search", "GET",
+                f"/supervisor/search?q={rng.choice(SEARCH_TERMS)}")
+    rec.request(client, "supervisor: GET /calendar", "GET", f"/calendar?month={rng.choice(MONTHS)}")
+    if supervisor["log_ids"]:
+        rec.request(client, "supervisor: POST /update_status", "POST",
+                    f"/update_status/{rng.choice(supervisor['log_ids'])}",
+                    data={"action": rng.choice(("approve", "disapprove"))})
+    rec.request(client, "supervisor: GET /logout", "GET", "/logout")
+
+
+def admin_journey(rec, client, rng, data):
+    rec.request(client, "admin: POST /login", "POST", "/login",
+                data={"username": "admin", "password": data["password"]})
+    rec.request(client, "admin: GET /admin/dashboard", "GET", "/admin/dashboard")
+    rec.request(client, "admin: GET /admin/logs", "GET", "/admin/logs")
+    rec.request(client, "admin: GET /admin/logs?status=pending", "GET", "/admin/logs?status=pending")
+    rec.request(client, "admin: GET /admin/students", "GET", "/admin/students")
+    rec.request(client, "admin: GET /admin/supervisors", "GET", "/admin/supervisors")
+    rec.request(client, "admin: GET /logout", "GET", "/logout")
+
+
+JOURNEYS = {
+    "login": login_journey,
+    "student": student_journey,
+    "supervisor": supervisor_journey,
+    "admin": admin_journey,
+}
+
+
+# --------------------------
+# DATASET AND RUNS
+# --------------------------
+def load_dataset(path, password, samples=50):
+    """Accounts and a sample of each supervisor's log ids, read once before the run."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    students = [dict(row) for row in conn.execute(
+        "SELECT id, username FROM users WHERE role = 'student' ORDER BY id")]
+    supervisors = [dict(row, log_ids=[]) for row in conn.execute(
+        "SELECT id, username FROM users WHERE role = 'supervisor' ORDER BY id")]
+    for supervisor in supervisors:
+        supervisor["log_ids"] = [row[0] for row in conn.execute(
+            "SELECT logs.id FROM logs JOIN users ON users.id = logs.student_id "
+            "WHERE users.supervisor_id = ? ORDER BY logs.id LIMIT ?", (supervisor["id"], samples))]
+    days = [row[0] for row in conn.execute("SELECT DISTINCT date FROM logs ORDER BY date")]
+    logs = conn.execute("SELECT value FROM counters WHERE name = 'logs.total'").fetchone()
+    conn.close()
+    if not students or not supervisors or not days:
+        raise SystemExit(f"{path} needs students, supervisors and logs; seed it with seed_data.py")
+    return {"students": students, "supervisors": supervisors, "days": days, "password": password,
+            "counts": {"students": len(students), "supervisors": len(supervisors), "logs": logs[0] if logs else 0}}
+
+
+def run_clients(rec, data, journeys, iterations, clients, seed):
+    """Every client runs each journey ``iterations`` times, in a fixed order per client."""
+    def client_loop(index):
+        rng = random.Random(seed + index)
+        client = app.test_client()
+        for _ in range(iterations):
+            for name in journeys:
+                start = time.perf_counter()
+                JOURNEYS[name](rec, client, rng, data)
+                rec.journey(name, time.perf_counter() - start)
+
+    if clients == 1:
+        client_loop(0)
+        return
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(rec, seconds):
+    steps = {}
+    for step, sample in rec.steps.items():
+        times = sample["times"]
+        steps[step] = {
+            "count": len(times), "errors": sample["errors"],
+            "p50_ms": round(percentile(times, 50) * 1000, 3), "p95_ms": round(percentile(times, 95) * 1000, 3),
+            "p99_ms": round(percentile(times, 99) * 1000, 3), "max_ms": round(max(times) * 1000, 3),
+            "queries": percentile(sample["queries"], 50), "max_queries": max(sample["queries"]),
+            "peak_kib": round(sample["peak"] / 1024, 1),
+        }
+    journeys = {name: {"count": len(times), "p50_ms": round(percentile(times, 50) * 1000, 3),
+                       "p95_ms": round(percentile(times, 95) * 1000, 3),
+                       "p99_ms": round(percentile(times, 99) * 1000, 3)}
+                for name, times in rec.journeys.items()}
+    requests = sum(step["count"] for step in steps.values())
+    totals = {"requests": requests, "errors": sum(step["errors"] for step in steps.values()),
+              "seconds": round(seconds, 3), "requests_per_s": round(requests / seconds, 1),
+              # kilobytes on Linux
+              "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return steps, journeys, totals
+
+
+def git_commit():
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+# --------------------------
+# BASELINE COMPARISON
+# --------------------------
+def compare(baseline, results, tolerance, floor_ms):
+    """Print each step against the baseline; returns the regressed steps.
+
+    A step regresses when its p50 is more than ``tolerance`` slower and at
+    least ``floor_ms`` slower (so sub-millisecond noise never fails a run),
+    when it runs more statements, or when it starts failing.
+    """
+    if baseline["meta"]["dataset"] != results["meta"]["dataset"]:
+        print("warning: the baseline was measured on a different dataset")
+    regressions = []
+    print(f"{'step':<42} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'queries':>9}")
+    for step, new in results["steps"].items():
+        old = baseline["steps"].get(step)
+        if old is None:
+            print(f"{step:<42} {'-':>11} {new['p50_ms']:>8.2f}ms {'new':>8} {new['queries']:>9}")
+            continue
+        change = (new["p50_ms"] - old["p50_ms"]) / old["p50_ms"] if old["p50_ms"] else 0.0
+        slower = change > tolerance and new["p50_ms"] - old["p50_ms"] >= floor_ms
+        regressed = slower or new["queries"] > old["queries"] or new["errors"] > old["errors"]
+        if regressed:
+            regressions.append(step)
+        queries = f"{old['queries']}->{new['queries']}" if new["queries"] != old["queries"] else str(new["queries"])
+        print(f"{step:<42} {old['p50_ms']:>9.2f}ms {new['p50_ms']:>8.2f}ms {change:>+7.0%} {queries:>9}"
+              f"{'  REGRESSION' if regressed else ''}")
+    for step in baseline["steps"].keys() - results["steps"].keys():
+        print(f"{step:<42} missing from this run")
+    return regressions
+
+
+def parse_setting(text):
+    """KEY=VALUE for --set; the value is JSON when it parses (5, true, null), else a string."""
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="benchmark a copy of this database instead of seeding one")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--supervisors", type=int, default=10)
+    parser.add_argument("--logs", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1, help="seeds the data and the journeys")
+    parser.add_argument("--password", default=seed_data.PASSWORD, help="password of every account")
+    parser.add_argument("--cost", type=int, default=4, help="bcrypt cost of seeded accounts (and the app)")
+    parser.add_argument("--journeys", default=",".join(JOURNEYS), help="comma-separated journeys to run")
+    parser.add_argument("--iterations", type=int, default=30, help="runs of each journey per client")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed runs of each journey first")
+    parser.add_argument("--clients", type=int, default=1, help="concurrent clients (threads)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override app.config")
+    parser.add_argument("--out", help="write the results as JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a JSON file from --out")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--floor-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args()
+
+    journeys = [name.strip() for name in args.journeys.split(",") if name.strip()]
+    unknown = set(journeys) - JOURNEYS.keys()
+    if unknown:
+        parser.error(f"unknown journeys: {', '.join(sorted(unknown))} (choose from {', '.join(JOURNEYS)})")
+
+    # always work on a throwaway file: the journeys write
+    path = os.path.join(tempfile.mkdtemp(prefix="siwes_suite_"), "siwes.db")
+    if args.db:
+        source = sqlite3.connect(args.db)
+        target = sqlite3.connect(path)
+        source.backup(target)
+        target.close()
+        source.close()
+        dataset = {"source": os.path.abspath(args.db)}
+    else:
+        summary = seed_data.generate(path, args.students, args.supervisors, args.logs, args.seed,
+                                     args.password, args.cost)
+        print(f"seeded {summary['students']} students, {summary['supervisors']} supervisors, "
+              f"{summary['logs']} logs in {summary['seconds']}s")
+        dataset = {"source": "seed_data", "seed": args.seed}
+    data = load_dataset(path, args.password)
+    dataset.update(data["counts"])
+
+    db_utils.shutdown(app)
+    # measuring the pages, not the login limiter; seeded hashes must not be upgraded on login
+    app.config.update(DATABASE=path, SQL_PROFILE=True, BCRYPT_LOG_ROUNDS=args.cost,
+                      LOGIN_RATE_LIMIT=False, TESTING=True)
+    overrides = dict(parse_setting(text) for text in args.set)
+    app.config.update(overrides)
+
+    rec = Recorder()
+    if args.warmup:
+        run_clients(rec, data, journeys, args.warmup, 1, args.seed + 1000)
+        rec.steps.clear()
+        rec.journeys.clear()
+
+    start = time.perf_counter()
+    run_clients(rec, data, journeys, args.iterations, args.clients, args.seed)
+    seconds = time.perf_counter() - start
+
+    # a separate pass for memory: tracing slows every allocation down
+    rec.tracing = True
+    tracemalloc.start()
+    run_clients(rec, data, journeys, 1, 1, args.seed + 2000)
+    tracemalloc.stop()
+    db_utils.shutdown(app)
+
+    steps, journey_stats, totals = summarize(rec, seconds)
+    results = {
+        "meta": {
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "commit": git_commit(),
+            "dataset": dataset, "journeys": journeys, "iterations": args.iterations,
+            "clients": args.clients, "warmup": args.warmup,
+            "config": {key: app.config.get(key) for key in CONFIG_KEYS} | overrides,
+        },
+        "steps": steps,
+        "journeys": journey_stats,
+        "totals": totals,
+    }
+
+    print(f"{dataset['students']} students, {dataset['supervisors']} supervisors, {dataset['logs']} logs; "
+          f"{args.iterations} iterations x {args.clients} client(s)")
+    print(f"{'step':<42} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'queries':>7} {'peak KiB':>9} {'err':>4}")
+    for step, stats in steps.items():
+        print(f"{step:<42} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+              f"{stats['max_ms']:>8.2f} {stats['queries']:>7} {stats['peak_kib']:>9.1f} {stats['errors']:>4}")
+    for name, stats in journey_stats.items():
+        print(f"journey {name:<34} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+    print(f"{totals['requests']} requests in {totals['seconds']:.1f}s ({totals['requests_per_s']:.0f}/s), "
+          f"{totals['errors']} errors, max RSS {totals['max_rss_kib'] / 1024:.0f} MiB")
+
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance, args.floor_ms)
+        print(f"{len(regressions)} regression(s)")
+        if regressions and args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
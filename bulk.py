@@ -0,0 +1,320 @@
+"""Bulk import and export of logs and users as CSV or JSON Lines.
+
+Exports walk a single SELECT with ``fetchmany`` and yield encoded text a
+batch at a time, so memory stays flat however big the table is (and the whole
+export sees one consistent snapshot). Imports read the input as a stream,
+validate each record and insert in chunks with ``executemany``, one
+transaction per chunk.
+
+    python bulk.py export logs  --format csv   -o logs.csv
+    python bulk.py export users --format jsonl            # to stdout
+    python bulk.py import logs  logs.csv
+    python bulk.py import users users.jsonl
+
+Columns:
+
+    logs   student, date (YYYY-MM-DD), activity, status, feedback
+    users  username, role, supervisor, password or password_hash
+
+``student`` and ``supervisor`` are usernames. Users exports leave out
+password hashes unless ``--with-hashes`` is given (CLI only); imported users
+need either a bcrypt ``password_hash`` or a plain ``password`` to hash, which
+is slow for large files (inside the app, plain passwords are hashed by the
+password worker pool, see passwords.py).
+"""
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+import time
+from datetime import date
+
+from log_status import SQL_NAME, status_code
+from migrations import DB_PATH, migrate
+from passwords import PasswordHasher
+
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+FETCH_SIZE = 1000   # rows per fetchmany() / per yielded export block
+CHUNK_SIZE = 5000   # rows per import transaction
+MAX_ERRORS = 100    # rejected rows reported in detail (all are counted)
+
+ROLES = ("student", "supervisor", "admin")
+
+EXPORTS = {
+    # files carry the status name; the column holds its code
+    "logs": f"""
+        SELECT logs.id, users.username AS student, logs.date, logs.activity,
+               {SQL_NAME.format("logs.status")} AS status, logs.feedback
+        FROM logs JOIN users ON users.id = logs.student_id
+        ORDER BY logs.id
+    """,
+    "users": """
+        SELECT u.id, u.username, u.role, s.username AS supervisor{hashes}
+        FROM users u LEFT JOIN users s ON s.id = u.supervisor_id
+        ORDER BY u.id
+    """,
+}
+
+
+# --------------------------
+# EXPORT
+# --------------------------
+def iter_rows(conn, sql, params=(), size=FETCH_SIZE):
+    """Yield lists of up to ``size`` rows from one query without loading the whole result."""
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def _counted(batches, counter):
+    counter.setdefault("rows", 0)
+    for rows in batches:
+        counter["rows"] += len(rows)
+        yield rows
+
+
+def export(conn, table, fmt="csv", with_hashes=False, counter=None):
+    """Yield ``table`` encoded as ``fmt`` in blocks of text; the first block is the CSV header.
+
+    If a ``counter`` dict is given, ``counter["rows"]`` is advanced as rows are encoded.
+    """
+    sql = EXPORTS[table]
+    if table == "users":
+        sql = sql.format(hashes=", u.password_hash" if with_hashes else "")
+    batches = iter_rows(conn, sql)
+    columns = [d[0] for d in conn.execute(sql + " LIMIT 0").description]
+    if counter is not None:
+        batches = _counted(batches, counter)
+
+    if fmt == "jsonl":
+        for rows in batches:
+            yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+    elif fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+    else:
+        raise ValueError(f"Unknown format {fmt!r}")
+
+
+# --------------------------
+# IMPORT
+# --------------------------
+def read_records(stream, fmt):
+    """Yield (line_number, dict) from a text stream; undecodable JSON lines yield (line_number, None)."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record if isinstance(record, dict) else None
+    else:
+        raise ValueError(f"Unknown format {fmt!r}")
+
+
+def _text(record, key):
+    value = record.get(key)
+    return "" if value is None else str(value).strip()
+
+
+class _Users:
+    """username -> (id, role) lookups, fetched from the database once per name."""
+
+    def __init__(self, conn, hash_password):
+        self.conn = conn
+        self.hash_password = hash_password
+        self.known = {}
+
+    def get(self, username):
+        if username not in self.known:
+            row = self.conn.execute("SELECT id, role FROM users WHERE username = ?", (username,)).fetchone()
+            self.known[username] = tuple(row) if row else None
+        return self.known[username]
+
+
+def _validate_log(record, users):
+    student = _text(record, "student")
+    found = users.get(student) if student else None
+    if found is None or found[1] != "student":
+        raise ValueError(f"unknown student {student!r}")
+    log_date = _text(record, "date")
+    try:
+        # cheaper than strptime; the length check rejects the looser forms newer Pythons accept
+        if len(log_date) != 10:
+            raise ValueError
+        date.fromisoformat(log_date)
+    except ValueError:
+        raise ValueError(f"invalid date {log_date!r} (expected YYYY-MM-DD)")
+    activity = _text(record, "activity")
+    if not activity:
+        raise ValueError("activity is empty")
+    status = status_code(_text(record, "status") or "pending")
+    return (found[0], log_date, activity, status, _text(record, "feedback"))
+
+
+def _validate_user(record, users):
+    username = _text(record, "username")
+    if not username:
+        raise ValueError("username is empty")
+    if users.get(username) is not None:
+        raise ValueError(f"username {username!r} already exists")
+    role = _text(record, "role").lower()
+    if role not in ROLES:
+        raise ValueError(f"invalid role {role!r}")
+    supervisor = _text(record, "supervisor")
+    if supervisor:
+        if role != "student":
+            raise ValueError("only students can have a supervisor")
+        found = users.get(supervisor)
+        if found is None or found[1] != "supervisor":
+            raise ValueError(f"unknown supervisor {supervisor!r}")
+    password_hash = _text(record, "password_hash")
+    if password_hash:
+        if not password_hash.startswith("$2"):
+            raise ValueError("password_hash is not a bcrypt hash")
+    elif _text(record, "password"):
+        password_hash = users.hash_password(_text(record, "password"))
+    else:
+        raise ValueError("password or password_hash is required")
+    # later rows may refer to this user (e.g. as supervisor); the real id is assigned on insert
+    users.known[username] = (None, role)
+    return (username, password_hash, role, supervisor or None)
+
+
+def _insert_logs(conn, rows):
+    conn.executemany(
+        "INSERT INTO logs (student_id, date, activity, status, feedback) VALUES (?, ?, ?, ?, ?)", rows
+    )
+
+
+def _insert_users(conn, rows):
+    conn.executemany(
+        "INSERT INTO users (username, password_hash, role, supervisor_id) "
+        "VALUES (?, ?, ?, (SELECT id FROM users WHERE username = ? AND role = 'supervisor'))",
+        rows,
+    )
+
+
+IMPORTS = {"logs": (_validate_log, _insert_logs), "users": (_validate_user, _insert_users)}
+
+
+def import_records(conn, table, records, run_write, chunk_size=CHUNK_SIZE, hash_password=None):
+    """Validate ``records`` and insert the valid ones in chunks.
+
+    ``conn`` is used for lookups; ``run_write(work)`` must run ``work(conn)``
+    in its own committed transaction (``db_utils.run_write`` inside the app,
+    ``transaction_runner`` from the command line). ``hash_password`` hashes
+    plain passwords of imported users (``passwords.hash_password`` inside the
+    app; bcrypt in this process by default). Returns a summary dict.
+    """
+    validate, insert = IMPORTS[table]
+    users = _Users(conn, hash_password or PasswordHasher(workers=0).hash)
+    started = time.perf_counter()
+    result = {"inserted": 0, "rejected": 0, "errors": []}
+
+    def flush(chunk):
+        run_write(lambda write_conn: insert(write_conn, chunk))
+        result["inserted"] += len(chunk)
+
+    chunk = []
+    for line, record in records:
+        try:
+            if record is None:
+                raise ValueError("not a JSON object")
+            chunk.append(validate(record, users))
+        except ValueError as e:
+            result["rejected"] += 1
+            if len(result["errors"]) < MAX_ERRORS:
+                result["errors"].append((line, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    result["seconds"] = time.perf_counter() - started
+    result["rows_per_sec"] = result["inserted"] / result["seconds"] if result["seconds"] else 0.0
+    return result
+
+
+def transaction_runner(conn):
+    """A ``run_write`` for a plain connection: BEGIN IMMEDIATE, work, COMMIT."""
+    def run(work):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            work(conn)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of SIWES logs and users.")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export")
+    p_export.add_argument("table", choices=sorted(EXPORTS))
+    p_export.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    p_export.add_argument("-o", "--output", help="file to write (default: stdout)")
+    p_export.add_argument("--with-hashes", action="store_true", help="include users' password hashes")
+
+    p_import = sub.add_parser("import")
+    p_import.add_argument("table", choices=sorted(IMPORTS))
+    p_import.add_argument("file")
+    p_import.add_argument("--format", choices=sorted(FORMATS), help="default: from the file extension")
+    p_import.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    args = parser.parse_args()
+    migrate(args.db)
+    conn = sqlite3.connect(args.db, isolation_level=None)
+
+    if args.command == "export":
+        out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        start = time.perf_counter()
+        counter = {"rows": 0}
+        try:
+            for block in export(conn, args.table, args.format, args.with_hashes, counter):
+                out.write(block)
+        finally:
+            if args.output:
+                out.close()
+        rows = counter["rows"]
+        elapsed = time.perf_counter() - start
+        print(f"Exported {rows} {args.table} in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)",
+              file=sys.stderr)
+    else:
+        fmt = args.format or ("jsonl" if args.file.endswith((".jsonl", ".ndjson")) else "csv")
+        with open(args.file, newline="", encoding="utf-8") as f:
+            result = import_records(conn, args.table, read_records(f, fmt), transaction_runner(conn),
+                                    args.chunk_size)
+        for line, message in result["errors"]:
+            print(f"line {line}: {message}", file=sys.stderr)
+        print(f"Imported {result['inserted']} {args.table}, rejected {result['rejected']}, "
+              f"in {result['seconds']:.2f}s ({result['rows_per_sec']:.0f} rows/s)")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""EXPLAIN QUERY PLAN check for the queries issued by app.py and admin.py.
+
+Builds a scratch database at the latest schema version (or uses --db), runs
+EXPLAIN QUERY PLAN on every query below and reports full table scans and
+temporary sort b-trees. Exits non-zero if a query that is expected to use an
+index does not. Keep QUERIES in sync when adding or changing a query.
+
+With --db, ANALYZE statistics from a small database can make the planner
+prefer scanning a tiny table; judge those plans by table size.
+
+    python check_queries.py
+    python check_queries.py --db instance/siwes.db
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+from migrations import migrate
+
+# (where, sql, params, allowed) -- ``allowed`` lists plan details that are
+# expected for this query, e.g. a LIKE '%q%' search can only ever scan.
+QUERIES = [
+    # ---- app.py
+    ("load_user", "SELECT id, username, password_hash, role FROM users WHERE id = ?;", (1,), []),
+    ("login", "SELECT * FROM users WHERE username = ?", ("x",), []),
+    ("student", "SELECT status, COUNT(*) FROM logs WHERE student_id = ? GROUP BY status",
+     (1,), ["TEMP B-TREE"]),
+    ("student", "SELECT id, date, activity, status, feedback FROM logs WHERE student_id = ? ORDER BY date DESC LIMIT 5",
+     (1,), []),
+    ("log", "INSERT INTO logs (date, activity, status, feedback, student_id) VALUES (?, ?, ?, ?, ?)",
+     ("2025-01-01", "x", "pending", "", 1), []),
+    ("edit_log", "SELECT * FROM logs WHERE id = ? AND student_id = ?", (1, 1), []),
+    ("edit_log", "UPDATE logs SET date = ?, activity = ?, status = ?, feedback = NULL WHERE id = ?",
+     ("2025-01-01", "x", 0, 1), []),
+    ("delete_log", "DELETE FROM logs WHERE id = ? AND student_id = ?", (1, 1), []),
+    ("supervisor", "SELECT id, username FROM users WHERE role = 'student' AND supervisor_id = ?", (1,), []),
+    ("supervisor", """
+        SELECT logs.id, logs.date, logs.activity, logs.status, logs.feedback, users.username
+        FROM logs
+        JOIN users ON logs.student_id = users.id
+        WHERE logs.supervisor_id = ? AND logs.student_id = ? AND logs.date >= ? AND logs.date <= ?
+        AND (logs.date, logs.id) < (?, ?)
+        ORDER BY logs.date DESC, logs.id DESC LIMIT ?
+    """, (1, 1, "2025-01-01", "2025-12-31", "2025-06-01", 10, 51), []),
+    # all students: one range of idx_logs_supervisor_date, already in order
+    ("supervisor", """
+        SELECT logs.id, logs.date, logs.activity, logs.status, logs.feedback, users.username
+        FROM logs
+        JOIN users ON logs.student_id = users.id
+        WHERE logs.supervisor_id = ?
+        ORDER BY logs.date DESC, logs.id DESC LIMIT ?
+    """, (1, 51), []),
+    ("update_status", "UPDATE logs SET status = ? WHERE id = ? RETURNING student_id", (1, 1), []),
+    ("supervisor_bulk_status", "SELECT COUNT(*) FROM logs WHERE supervisor_id = ? AND id IN (?, ?, ?)",
+     (1, 1, 2, 3), []),
+    ("supervisor_bulk_status", "UPDATE logs SET status = ? WHERE supervisor_id = ? AND id IN (?, ?, ?) AND status != ?",
+     (1, 1, 1, 2, 3, 1), []),
+    ("supervisor_bulk_status", """
+        UPDATE logs SET status = ? WHERE supervisor_id = ? AND status = ? AND date >= ? AND date <= ?
+    """, (1, 1, 0, "2025-03-01", "2025-03-07"), []),
+    ("add_feedback", "UPDATE logs SET feedback = ? WHERE id = ? RETURNING student_id", ("ok", 1), []),
+    # grouping sorts only the month's rows, found through idx_logs_student_date
+    ("calendar", """
+        SELECT date AS day, status, COUNT(*) AS n
+        FROM logs
+        WHERE student_id = ? AND date >= ? AND date < ?
+        GROUP BY day, status
+    """, (1, "2025-03-01", "2025-04-01"), ["TEMP B-TREE"]),
+    ("calendar", """
+        SELECT date AS day, status, COUNT(*) AS n
+        FROM logs
+        WHERE supervisor_id = ? AND date >= ? AND date < ? AND student_id = ?
+        GROUP BY day, status
+    """, (1, "2025-03-01", "2025-04-01", 2), ["TEMP B-TREE"]),
+    ("calendar", """
+        SELECT date AS day, status, COUNT(*) AS n
+        FROM logs
+        WHERE supervisor_id = ? AND date >= ? AND date < ?
+        GROUP BY day, status
+    """, (1, "2025-03-01", "2025-04-01"), ["TEMP B-TREE"]),
+    ("logs_by_date", "SELECT * FROM logs WHERE student_id = ? AND date = ? ORDER BY id", (1, "2025-01-01"), []),
+
+    # ---- api.py
+    ("api.logs student", """
+        SELECT logs.id, logs.date, logs.status, logs.date, logs.id FROM logs JOIN users ON logs.student_id = users.id
+        WHERE 1 = 1 AND logs.student_id = ? AND (logs.date, logs.id) < (?, ?)
+        ORDER BY logs.date DESC, logs.id DESC LIMIT ?
+    """, (1, "2025-03-01", 10, 51), []),
+    ("api.logs supervisor", """
+        SELECT logs.id, users.username, logs.date, logs.id FROM logs JOIN users ON logs.student_id = users.id
+        WHERE 1 = 1 AND logs.supervisor_id = ? AND logs.status = ?
+        ORDER BY logs.date DESC, logs.id DESC LIMIT ?
+    """, (1, 0, 51), []),
+    # newest first along idx_logs_date, stops after a page
+    ("api.logs admin", """
+        SELECT logs.id, users.username, logs.date, logs.id FROM logs JOIN users ON logs.student_id = users.id
+        WHERE 1 = 1 ORDER BY logs.date DESC, logs.id DESC LIMIT ?
+    """, (51,), ["SCAN logs USING INDEX idx_logs_date"]),
+    ("api.students", """
+        SELECT s.id, s.username, sup.username, s.id FROM users s LEFT JOIN users sup ON s.supervisor_id = sup.id
+        WHERE s.role = 'student' AND s.supervisor_id = ? AND s.id > ? ORDER BY s.id LIMIT ?
+    """, (1, 0, 51), []),
+    ("api.stats", "SELECT COUNT(*) FROM users WHERE supervisor_id = ? AND role = 'student'", (1,), []),
+    ("api.stats", "SELECT status, COUNT(*) FROM logs WHERE supervisor_id = ? GROUP BY status", (1,), ["TEMP B-TREE"]),
+
+    # ---- page_cache.py
+    ("bump_students", """
+        SELECT DISTINCT supervisor_id FROM users WHERE id IN (?, ?) AND supervisor_id IS NOT NULL
+    """, (1, 2), ["TEMP B-TREE"]),
+    ("bump_supervisor", "SELECT id FROM users WHERE supervisor_id = ?", (1,), []),
+
+    # ---- jobs.py
+    ("jobs.logs_action", "SELECT DISTINCT student_id FROM logs WHERE id IN (?, ?, ?)", (1, 2, 3), ["TEMP B-TREE"]),
+
+    # ---- admin.py
+    ("admin.dashboard", "SELECT name, value FROM counters", (), ["SCAN counters"]),
+    # walks idx_logs_date from the newest end and stops after six rows
+    ("admin.dashboard", """
+        SELECT logs.id, users.username AS student, logs.date, logs.status
+        FROM logs
+        JOIN users ON logs.student_id = users.id
+        ORDER BY logs.date DESC, logs.id DESC
+        LIMIT 6
+    """, (), ["SCAN logs USING INDEX idx_logs_date"]),
+    ("admin.students", "UPDATE users SET supervisor_id = ? WHERE id = ?", (1, 2), []),
+    ("admin.students", "DELETE FROM users WHERE id = ? AND role = 'student'", (2,), []),
+    ("admin.students", "DELETE FROM logs WHERE student_id = ?", (2,), []),
+    ("admin.students", """
+        SELECT s.id, s.username AS student_name, u.username AS supervisor_name
+        FROM users s
+        LEFT JOIN users u ON s.supervisor_id = u.id
+        WHERE s.role='student' AND s.id IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)
+        AND s.username > ?
+        ORDER BY s.username LIMIT ?;
+    """, ('"abc"', "m", 11), []),
+    ("admin.students", """
+        SELECT s.id, s.username AS student_name, u.username AS supervisor_name
+        FROM users s
+        LEFT JOIN users u ON s.supervisor_id = u.id
+        WHERE s.role='student' AND s.username > ?
+        ORDER BY s.username LIMIT ?;
+    """, ("m", 11), []),
+    ("admin.students", "SELECT id, username FROM users WHERE role='supervisor' ORDER BY username;", (), []),
+    ("admin.supervisors", "UPDATE users SET supervisor_id = NULL WHERE supervisor_id = ?", (1,), []),
+    ("admin.supervisors", "DELETE FROM users WHERE id = ? AND role='supervisor'", (1,), []),
+    ("admin.supervisors", """
+        SELECT u.id, u.username, COALESCE(c.value, 0) AS total_students
+        FROM users u
+        LEFT JOIN counters c ON c.name = 'roster.' || u.id
+        WHERE u.role='supervisor'
+        ORDER BY u.username;
+    """, (), []),
+    ("admin.logs", """
+        SELECT logs.id, logs.date, logs.activity, logs.status, users.username AS student
+        FROM logs JOIN users ON logs.student_id = users.id
+        WHERE logs.status = ? AND (logs.date, logs.id) < (?, ?)
+        ORDER BY logs.date DESC, logs.id DESC LIMIT ?
+    """, (0, "2025-06-01", 10, 26), []),
+    ("admin.logs", """
+        SELECT logs.id, logs.date, logs.activity, logs.status, users.username AS student
+        FROM logs JOIN users ON logs.student_id = users.id
+        WHERE (logs.date, logs.id) < (?, ?)
+        ORDER BY logs.date DESC, logs.id DESC LIMIT ?
+    """, ("2025-06-01", 10, 26), []),
+    ("admin.search / supervisor_search", """
+        SELECT logs.id, logs.date, logs.status, users.username AS student,
+               snippet(logs_fts, 0, char(2), char(3), '…', 24) AS activity,
+               snippet(logs_fts, 1, char(2), char(3), '…', 16) AS feedback
+        FROM logs_fts
+        JOIN logs ON logs.id = logs_fts.rowid
+        JOIN users ON users.id = logs.student_id
+        WHERE logs_fts MATCH ? AND logs.supervisor_id = ?
+        ORDER BY rank LIMIT ? OFFSET ?
+    """, ('"router"*', 1, 21, 0), ["SCAN logs_fts"]),
+    ("admin.logs_action", "UPDATE logs SET status = 1 WHERE id = ?", (1,), []),
+    ("admin.logs_action", "DELETE FROM logs WHERE id = ?", (1,), []),
+    ("admin.settings", "SELECT * FROM users WHERE id = ?", (1,), []),
+    ("admin.settings", "UPDATE users SET password_hash = ? WHERE id = ?", ("x", 1), []),
+
+    # ---- jobs.py
+    ("jobs.claim", "SELECT 1 FROM jobs WHERE status = 'queued' AND run_after <= datetime('now') LIMIT 1", (), []),
+    ("jobs.claim", """
+        UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                        started_at = datetime('now'), heartbeat_at = datetime('now')
+        WHERE id = (
+            SELECT id FROM jobs WHERE status = 'queued' AND run_after <= datetime('now') ORDER BY id LIMIT 1
+        )
+        RETURNING id, kind, params, attempts, max_attempts
+    """, (), ["TEMP B-TREE"]),  # the claimable few are sorted by id
+    ("jobs.is_active", "SELECT 1 FROM jobs WHERE status IN ('queued', 'running') AND kind = ? LIMIT 1",
+     ("backup",), []),
+    # newest first along the rowid, stopping after LIMIT rows
+    ("jobs.recent_jobs", "SELECT id FROM jobs ORDER BY id DESC LIMIT ?", (50,), ["SCAN jobs"]),
+    ("jobs.delete_student", "DELETE FROM logs WHERE id IN (SELECT id FROM logs WHERE student_id = ? LIMIT ?)",
+     (1, 500), []),
+
+    # ---- bulk.py (exports read every row in primary-key order)
+    ("bulk.export logs", """
+        SELECT logs.id, users.username AS student, logs.date, logs.activity,
+               CASE logs.status WHEN 0 THEN 'pending' WHEN 1 THEN 'approved' WHEN 2 THEN 'disapproved' END AS status,
+               logs.feedback
+        FROM logs JOIN users ON users.id = logs.student_id
+        ORDER BY logs.id
+    """, (), ["SCAN logs"]),
+    ("bulk.export users", """
+        SELECT u.id, u.username, u.role, s.username AS supervisor
+        FROM users u LEFT JOIN users s ON s.id = u.supervisor_id
+        ORDER BY u.id
+    """, (), ["SCAN u"]),
+    ("bulk.import", "SELECT id, role FROM users WHERE username = ?", ("x",), []),
+    ("bulk.import users", "INSERT INTO users (username, password_hash, role, supervisor_id) "
+     "VALUES (?, ?, ?, (SELECT id FROM users WHERE username = ? AND role = 'supervisor'))",
+     ("x", "y", "student", "z"), []),
+    ("bulk.import logs", "INSERT INTO logs (student_id, date, activity, status, feedback) VALUES (?, ?, ?, ?, ?)",
+     (1, "2025-01-01", "x", "pending", ""), []),
+
+    # ---- metrics.py (jobs are pruned after JOB_KEEP_DAYS, and this reads only the status index)
+    ("metrics.collect", "SELECT status, COUNT(*) FROM jobs GROUP BY status", (),
+     ["SCAN jobs USING COVERING INDEX idx_jobs_status_run_after"]),
+]
+
+
+def problems(plan_rows, allowed):
+    """Plan details that indicate a full scan or a sort, minus the allowed ones."""
+    found = []
+    for row in plan_rows:
+        detail = row[3]
+        full_scan = detail.startswith("SCAN ") and " INDEX" not in detail
+        if full_scan or "TEMP B-TREE" in detail:
+            if not any(a in detail for a in allowed):
+                found.append(detail)
+    return found
+
+
+def check(conn, verbose=False):
+    failures = 0
+    for where, sql, params, allowed in QUERIES:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        bad = problems(rows, allowed)
+        status = "FAIL" if bad else "ok"
+        failures += bool(bad)
+        first_line = " ".join(sql.split())[:70]
+        print(f"[{status:>4}] {where:<20} {first_line}")
+        if verbose or bad:
+            for row in rows:
+                print(f"         {row[3]}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check query plans of app queries.")
+    parser.add_argument("--db", help="database to check (default: scratch db at latest schema)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    path = args.db
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="siwes_plan_"), "plan.db")
+        migrate(path)
+
+    conn = sqlite3.connect(path)
+    failures = check(conn, args.verbose)
+    conn.close()
+
+    print(f"{len(QUERIES)} queries checked, {failures} with unexpected scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
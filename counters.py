@@ -0,0 +1,87 @@
+"""Materialized user/log counters for the admin dashboard.
+
+The ``counters`` table (migration 3) holds one row per counter and is kept up
+to date by triggers on ``users`` and ``logs``:
+
+    users.<role>      students, supervisors, admins
+    logs.total        all logs
+    logs.<status>     logs per status name (pending, approved, disapproved)
+    roster.<id>       students assigned to supervisor <id> (migration 8)
+
+Reading them is a single primary-key range scan instead of a COUNT(*) per
+number. ``python counters.py`` recounts everything from the base tables,
+reports any drift and stores the corrected values.
+"""
+import argparse
+import sqlite3
+
+from log_status import status_name
+from migrations import DB_PATH, migrate
+
+
+def read_counters(conn):
+    """All counters as a dict; missing counters read as 0 via ``.get``."""
+    return {row[0]: row[1] for row in conn.execute("SELECT name, value FROM counters")}
+
+
+def actual_counts(conn):
+    """Recount every counter from the base tables."""
+    counts = {}
+    for role, n in conn.execute("SELECT role, COUNT(*) FROM users GROUP BY role"):
+        counts[f"users.{role}"] = n
+    counts["logs.total"] = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+    for status, n in conn.execute("SELECT status, COUNT(*) FROM logs GROUP BY status"):
+        counts[f"logs.{status_name(status)}"] = n
+    for supervisor_id, n in conn.execute(
+        "SELECT supervisor_id, COUNT(*) FROM users WHERE role = 'student' AND supervisor_id IS NOT NULL "
+        "GROUP BY supervisor_id"
+    ):
+        counts[f"roster.{supervisor_id}"] = n
+    return counts
+
+
+def reconcile(conn, fix=True):
+    """Compare stored counters with real counts; return {name: (stored, actual)} for every mismatch.
+
+    With ``fix`` the counters table is rewritten in the same transaction, so
+    no concurrent write can slip in between the recount and the rewrite.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        stored = read_counters(conn)
+        actual = actual_counts(conn)
+        drift = {}
+        for name in sorted(set(stored) | set(actual)):
+            if stored.get(name, 0) != actual.get(name, 0):
+                drift[name] = (stored.get(name, 0), actual.get(name, 0))
+        if fix:
+            conn.execute("DELETE FROM counters")
+            conn.executemany("INSERT INTO counters (name, value) VALUES (?, ?)", actual.items())
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild dashboard counters and report drift.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--check", action="store_true", help="report drift without fixing it")
+    args = parser.parse_args()
+
+    migrate(args.db)
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    drift = reconcile(conn, fix=not args.check)
+    conn.close()
+
+    if not drift:
+        print("Counters are in sync.")
+        return
+    for name, (stored, actual) in drift.items():
+        print(f"{name:<20} stored {stored:>8}  actual {actual:>8}  drift {stored - actual:+d}")
+    print("Counters rebuilt." if not args.check else f"{len(drift)} counter(s) out of sync.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,486 @@
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app, g, has_app_context
+
+import migrations
+from profiling import get_profiler
 
 Database = "instance/siwes.db"
 
-def get_db_connection():
-    conn = sqlite3.connect(Database)
+_pool_lock = threading.Lock()
+
+# Pragmas applied once when a pooled connection is opened.
+# Override with app.config["SQLITE_PRAGMAS"].
+DEFAULT_PRAGMAS = {
+    "cache_size": -8000,      # ~8 MB page cache per connection
+    "temp_store": "MEMORY",
+}
+
+
+def open_connection(path=Database, pragmas=None, profiler=None):
+    """Open a raw SQLite connection with row access by name and the given pragmas.
+
+    With a QueryProfiler (see profiling.py), every statement is counted and timed.
+    """
+    if profiler is None:
+        conn = sqlite3.connect(path, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False, factory=ProfilingConnection)
+        conn.profiler = profiler
     conn.row_factory = sqlite3.Row
+    for name, value in (pragmas or {}).items():
+        conn.execute(f"PRAGMA {name} = {value}")
     return conn
+
+
+# --------------------------
+# PROFILING CONNECTIONS
+# --------------------------
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times each statement, adding the time spent fetching its rows."""
+
+    _timing = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._timing = self.connection.profiler.record(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._timing = self.connection.profiler.record(sql, time.perf_counter() - start)
+
+    def _fetch(self, fetch, *args):
+        # SQLite produces rows as they are fetched, so this is statement time too
+        start = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._timing is not None:
+                self._timing.seconds += time.perf_counter() - start
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        return self._fetch(super().__next__)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose statements are recorded in ``self.profiler``."""
+
+    profiler = None
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    # Connection.execute would use a plain cursor, so route it through ours
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# --------------------------
+# CONNECTION POOL
+# --------------------------
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections.
+
+    A thread that already holds a connection gets the same one back on a
+    nested checkout, so e.g. the user loader and the view share a connection.
+    Idle connections are handed out most-recently-used first.
+    """
+
+    def __init__(self, path=Database, max_size=5, timeout=10.0, pragmas=None, profiler=None):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.profiler = profiler
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+        self._counters = {
+            "checkouts": 0,
+            "reused": 0,
+            "created": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def acquire(self):
+        """Check out a connection, blocking up to ``timeout`` seconds if the pool is exhausted."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            self._count("reused")
+            return held
+
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            self._count("waits")
+            if not self._slots.acquire(timeout=self.timeout):
+                self._count("timeouts")
+                raise PoolTimeout(f"No database connection free after {self.timeout}s")
+        waited = time.perf_counter() - start
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = open_connection(self.path, self.pragmas, self.profiler)
+            except Exception:
+                self._slots.release()
+                raise
+            with self._lock:
+                self._all.append(conn)
+            self._count("created")
+
+        with self._lock:
+            self._counters["checkouts"] += 1
+            self._counters["wait_time_total"] += waited
+            self._counters["wait_time_max"] = max(self._counters["wait_time_max"], waited)
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection; any open transaction is rolled back."""
+        if getattr(self._local, "conn", None) is not conn:
+            raise ValueError("Connection was not checked out by this thread")
+
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+        self._slots.release()
+
+    def prefill(self, prepare=None):
+        """Open connections up to ``max_size`` ahead of demand and pass each one to ``prepare``.
+
+        Meant for startup (see warmup.py), before requests start checking connections out.
+        """
+        conns = []
+        while True:
+            try:
+                conns.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            missing = self.max_size - len(self._all)
+        for _ in range(missing):
+            conn = open_connection(self.path, self.pragmas, self.profiler)
+            with self._lock:
+                self._all.append(conn)
+            self._count("created")
+            conns.append(conn)
+        try:
+            for conn in conns:
+                if prepare is not None:
+                    prepare(conn)
+                if conn.in_transaction:
+                    conn.rollback()
+        finally:
+            for conn in conns:
+                self._idle.put(conn)
+        return len(conns)
+
+    def close_all(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._all.remove(conn)
+
+    def stats(self):
+        """Snapshot of pool counters, useful for sizing ``max_size``."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["open"] = len(self._all)
+        stats["idle"] = self._idle.qsize()
+        stats["in_use"] = stats["open"] - stats["idle"]
+        stats["max_size"] = self.max_size
+        stats["wait_time_avg"] = (
+            stats["wait_time_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        )
+        return stats
+
+
+# --------------------------
+# WRITE QUEUE (GROUP COMMIT)
+# --------------------------
+class WriteQueue:
+    """Serialize all writes through one background connection.
+
+    Each submitted unit of work runs inside its own savepoint; whatever units
+    are queued when the writer wakes up are committed together in a single
+    transaction, so N concurrent submissions cost one fsync instead of N.
+    A failing unit is rolled back to its savepoint without affecting the rest.
+    """
+
+    def __init__(self, path=Database, pragmas=None, max_batch=64, max_delay=0.0, profiler=None):
+        self.path = path
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.profiler = profiler
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._counters = {"writes": 0, "errors": 0, "commits": 0, "batch_max": 0}
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, work):
+        """Queue ``work(conn)``; the returned Future resolves once it is committed."""
+        future = Future()
+        self._queue.put((future, work))
+        return future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["queued"] = self._queue.qsize()
+        stats["avg_batch"] = stats["writes"] / stats["commits"] if stats["commits"] else 0.0
+        return stats
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None, True
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    @property
+    def thread_id(self):
+        return self._thread.ident
+
+    def _run(self):
+        conn = open_connection(self.path, self.pragmas, self.profiler)
+        conn.isolation_level = None  # transactions are managed explicitly below
+
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, work in batch:
+                conn.execute("SAVEPOINT unit")
+                try:
+                    outcomes.append((future, work(conn), None))
+                    conn.execute("RELEASE unit")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO unit")
+                    conn.execute("RELEASE unit")
+                    outcomes.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._lock:
+                self._counters["errors"] += len(batch)
+            for future, _ in batch:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self._counters["writes"] += len(batch)
+            self._counters["commits"] += 1
+            self._counters["batch_max"] = max(self._counters["batch_max"], len(batch))
+            self._counters["errors"] += sum(1 for _, _, err in outcomes if err)
+        for future, result, err in outcomes:
+            if err is not None:
+                future.set_exception(err)
+            else:
+                future.set_result(result)
+
+
+# --------------------------
+# FLASK INTEGRATION
+# --------------------------
+def connection_pragmas(app):
+    """Per-connection pragmas derived from the app config."""
+    pragmas = dict(DEFAULT_PRAGMAS)
+    pragmas.update(app.config.get("SQLITE_PRAGMAS") or {})
+    if "SQLITE_BUSY_TIMEOUT" in app.config:
+        pragmas["busy_timeout"] = int(app.config["SQLITE_BUSY_TIMEOUT"])
+    if "SQLITE_SYNCHRONOUS" in app.config:
+        pragmas["synchronous"] = app.config["SQLITE_SYNCHRONOUS"]
+    return pragmas
+
+
+def get_pool(app=None):
+    """Return the app's connection pool, creating it from config on first use."""
+    app = app or current_app
+    pool = app.extensions.get("sqlite_pool")
+    if pool is None:
+        profiler = get_profiler(app)
+        with _pool_lock:
+            pool = app.extensions.get("sqlite_pool")
+            if pool is None:
+                path = app.config.get("DATABASE", Database)
+                if app.config.get("DB_AUTO_MIGRATE"):
+                    migrations.migrate(path)
+                if app.config.get("SQLITE_WAL"):
+                    # journal_mode is stored in the database file, so set it once
+                    conn = open_connection(path)
+                    conn.execute("PRAGMA journal_mode = WAL")
+                    conn.close()
+                pool = ConnectionPool(
+                    path,
+                    max_size=app.config.get("DB_POOL_SIZE", 5),
+                    timeout=app.config.get("DB_POOL_TIMEOUT", 10.0),
+                    pragmas=connection_pragmas(app),
+                    profiler=profiler,
+                )
+                app.extensions["sqlite_pool"] = pool
+    return pool
+
+
+def get_writer(app=None):
+    """Return the app's write queue, or None when DB_WRITE_QUEUE is off."""
+    app = app or current_app
+    if not app.config.get("DB_WRITE_QUEUE"):
+        return None
+    writer = app.extensions.get("sqlite_writer")
+    if writer is None:
+        get_pool(app)  # make sure WAL is switched on before the writer connects
+        profiler = get_profiler(app)
+        with _pool_lock:
+            writer = app.extensions.get("sqlite_writer")
+            if writer is None:
+                writer = WriteQueue(
+                    app.config.get("DATABASE", Database),
+                    pragmas=connection_pragmas(app),
+                    max_batch=app.config.get("DB_WRITE_BATCH_SIZE", 64),
+                    max_delay=app.config.get("DB_WRITE_BATCH_DELAY", 0.0),
+                    profiler=profiler,
+                )
+                app.extensions["sqlite_writer"] = writer
+    return writer
+
+
+def run_write(work):
+    """Run ``work(conn)`` as one committed write and return its result.
+
+    Goes through the write queue when enabled, otherwise runs on the
+    request's pooled connection and commits directly.
+    """
+    writer = get_writer()
+    if writer is None:
+        conn = get_db_connection()
+        try:
+            result = work(conn)
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        return result
+    return writer.submit(work).result()
+
+
+def execute_write(sql, params=(), many=False):
+    """Execute one INSERT/UPDATE/DELETE (``executemany`` if ``many``) and return the row count."""
+    def work(conn):
+        cur = conn.executemany(sql, params) if many else conn.execute(sql, params)
+        return cur.rowcount
+    return run_write(work)
+
+
+def get_db_connection():
+    """Connection for the current app context, checked out from the pool once and reused."""
+    if not has_app_context():
+        return open_connection(Database, DEFAULT_PRAGMAS)
+
+    if "db" not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    """Return the app context's connection to the pool."""
+    conn = g.pop("db", None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+def shutdown(app):
+    """Stop background jobs and the writer, then close pooled connections (e.g. before switching databases)."""
+    runner = app.extensions.pop("job_runner", None)
+    if runner is not None:
+        runner.stop()
+    writer = app.extensions.pop("sqlite_writer", None)
+    if writer is not None:
+        writer.stop()
+    pool = app.extensions.pop("sqlite_pool", None)
+    if pool is not None:
+        pool.close_all()
+    app.extensions.pop("sql_profiler", None)
+    app.extensions.pop("page_cache", None)
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
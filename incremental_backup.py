@@ -0,0 +1,214 @@
+"""Incremental, deduplicated backups with point-in-time restore.
+
+Each run takes a consistent snapshot with the SQLite backup API (as in
+backup.py), cuts it into page-aligned chunks and stores every chunk under its
+SHA-256 hash in ``backups/chunks/``. A chunk that an earlier snapshot already
+stored is not written again, so the bytes written per run grow with the
+number of changed pages, not with the database size. A JSON manifest per
+snapshot lists its chunks in order.
+
+    python incremental_backup.py backup   [--db instance/siwes.db] [--dest backups]
+    python incremental_backup.py list     [--dest backups]
+    python incremental_backup.py restore  MANIFEST OUTPUT.db
+    python incremental_backup.py prune    --keep 30
+
+Restoring concatenates the chunks, checks every hash and finishes with
+``PRAGMA integrity_check``.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+DB_PATH = "instance/siwes.db"
+BACKUP_DIR = "backups"
+MANIFEST_DIR = "incremental"
+CHUNK_DIR = "chunks"
+PREFIX = "siwes_snapshot_"
+PAGES_PER_CHUNK = 16  # 64 KiB chunks with the default 4 KiB page size
+
+
+def _chunk_path(dest_dir, digest):
+    return os.path.join(dest_dir, CHUNK_DIR, digest[:2], digest + ".z")
+
+
+def _snapshot(db_path, dest_dir, pages, sleep):
+    """Consistent copy of the live database in a temp file; returns (path, page_size)."""
+    from backup import copy_online  # backup.py imports this module
+
+    fd, path = tempfile.mkstemp(prefix=".snapshot_", suffix=".db", dir=dest_dir)
+    os.close(fd)
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(path)
+    try:
+        copy_online(src, dst, pages=pages, sleep=sleep)
+        page_size = dst.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+    return path, page_size
+
+
+def backup(db_path=DB_PATH, dest_dir=BACKUP_DIR, pages_per_chunk=PAGES_PER_CHUNK, pages=256, sleep=0.005):
+    """Store a new snapshot; return its manifest (a dict, also written as JSON)."""
+    started = time.perf_counter()
+    os.makedirs(os.path.join(dest_dir, MANIFEST_DIR), exist_ok=True)
+    snapshot_path, page_size = _snapshot(db_path, dest_dir, pages, sleep)
+    chunk_size = page_size * pages_per_chunk
+
+    chunks = []
+    new_chunks = 0
+    bytes_written = 0
+    try:
+        with open(snapshot_path, "rb") as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(digest)
+                path = _chunk_path(dest_dir, digest)
+                if os.path.exists(path):
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                packed = zlib.compress(data, 6)
+                with open(path + ".part", "wb") as out:
+                    out.write(packed)
+                os.replace(path + ".part", path)
+                new_chunks += 1
+                bytes_written += len(packed)
+        size = os.path.getsize(snapshot_path)
+    finally:
+        os.remove(snapshot_path)
+
+    created = datetime.now()
+    name = PREFIX + created.strftime("%Y%m%d_%H%M%S_%f") + ".json"
+    manifest = {
+        "name": name,
+        "created": created.isoformat(timespec="seconds"),
+        "source": os.path.abspath(db_path),
+        "size": size,
+        "page_size": page_size,
+        "chunk_size": chunk_size,
+        "chunks": chunks,
+        "new_chunks": new_chunks,
+        "bytes_written": bytes_written,
+    }
+    manifest_path = os.path.join(dest_dir, MANIFEST_DIR, name)
+    manifest["elapsed"] = round(time.perf_counter() - started, 4)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    manifest["bytes_written"] += os.path.getsize(manifest_path)
+    return manifest
+
+
+def list_snapshots(dest_dir=BACKUP_DIR):
+    """Manifest file names, oldest first."""
+    folder = os.path.join(dest_dir, MANIFEST_DIR)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(n for n in os.listdir(folder) if n.startswith(PREFIX) and n.endswith(".json"))
+
+
+def load_manifest(dest_dir, name):
+    path = name if os.path.sep in name else os.path.join(dest_dir, MANIFEST_DIR, name)
+    with open(path) as f:
+        return json.load(f)
+
+
+def restore(manifest, output_path, dest_dir=BACKUP_DIR):
+    """Rebuild a snapshot into ``output_path``; raises ValueError if it does not verify."""
+    if os.path.exists(output_path):
+        raise ValueError(f"{output_path} already exists; refusing to overwrite it")
+
+    partial_path = output_path + ".part"
+    with open(partial_path, "wb") as out:
+        for digest in manifest["chunks"]:
+            with open(_chunk_path(dest_dir, digest), "rb") as f:
+                data = zlib.decompress(f.read())
+            if hashlib.sha256(data).hexdigest() != digest:
+                out.close()
+                os.remove(partial_path)
+                raise ValueError(f"Chunk {digest} is corrupt")
+            out.write(data)
+
+    conn = sqlite3.connect(partial_path)
+    result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    conn.close()
+    if result != "ok":
+        os.remove(partial_path)
+        raise ValueError(f"Restored database failed integrity_check: {result}")
+    os.replace(partial_path, output_path)
+    return output_path
+
+
+def prune(dest_dir=BACKUP_DIR, keep=30):
+    """Keep the ``keep`` newest snapshots and delete chunks no remaining snapshot uses.
+
+    Returns (snapshots_removed, chunks_removed).
+    """
+    names = list_snapshots(dest_dir)
+    doomed = names[:-keep] if keep else names
+    for name in doomed:
+        os.remove(os.path.join(dest_dir, MANIFEST_DIR, name))
+
+    live = set()
+    for name in list_snapshots(dest_dir):
+        live.update(load_manifest(dest_dir, name)["chunks"])
+
+    removed = 0
+    chunk_root = os.path.join(dest_dir, CHUNK_DIR)
+    for folder, _, files in os.walk(chunk_root):
+        for file in files:
+            if file.endswith(".z") and file[:-2] not in live:
+                os.remove(os.path.join(folder, file))
+                removed += 1
+    return len(doomed), removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental SIWES database backups.")
+    parser.add_argument("--dest", default=BACKUP_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_backup = sub.add_parser("backup", help="store a new snapshot")
+    p_backup.add_argument("--db", default=DB_PATH)
+    p_backup.add_argument("--pages-per-chunk", type=int, default=PAGES_PER_CHUNK)
+
+    sub.add_parser("list", help="list stored snapshots")
+
+    p_restore = sub.add_parser("restore", help="rebuild a snapshot and verify it")
+    p_restore.add_argument("manifest", help="manifest name (see 'list') or path")
+    p_restore.add_argument("output")
+
+    p_prune = sub.add_parser("prune", help="drop old snapshots and unreferenced chunks")
+    p_prune.add_argument("--keep", type=int, default=30)
+
+    args = parser.parse_args()
+
+    if args.command == "backup":
+        m = backup(args.db, args.dest, args.pages_per_chunk)
+        print(f"{m['name']}: {len(m['chunks'])} chunks, {m['new_chunks']} new, "
+              f"{m['bytes_written'] / 1024:.1f} KB written in {m['elapsed']:.2f}s "
+              f"(database {m['size'] / 1024:.1f} KB)")
+    elif args.command == "list":
+        for name in list_snapshots(args.dest):
+            m = load_manifest(args.dest, name)
+            print(f"{name}  {m['created']}  {m['size'] / 1024:10.1f} KB  "
+                  f"{m['new_chunks']:>5} new chunks  {m['bytes_written'] / 1024:8.1f} KB written")
+    elif args.command == "restore":
+        start = time.perf_counter()
+        restore(load_manifest(args.dest, args.manifest), args.output, args.dest)
+        print(f"Restored {args.output} (integrity_check ok) in {time.perf_counter() - start:.2f}s")
+    elif args.command == "prune":
+        snapshots, chunks = prune(args.dest, args.keep)
+        print(f"Removed {snapshots} snapshot(s) and {chunks} unused chunk(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,45 @@
 from flask_bcrypt import Bcrypt
+import argparse
 import sqlite3
 import os
 
+from migrations import migrate
+
 DB_PATH = "instance/siwes.db"
 
-# Remove the old DB (optional for a fresh start)
-if os.path.exists(DB_PATH):
-    os.remove(DB_PATH)
-    print(f"Removed existing database at {DB_PATH}")
-
-# Create connection
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
-# Create Users table
-cursor.execute('''
-    CREATE TABLE users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password_hash TEXT NOT NULL,
-        role TEXT NOT NULL CHECK(role IN ('student', 'supervisor', 'admin')),
-        supervisor_id INTEGER,
-        FOREIGN KEY (supervisor_id) REFERENCES users(id)
-    )
-''')
-
-# Create Logs table
-cursor.execute('''
-    CREATE TABLE logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student_id INTEGER NOT NULL,
-        date DATETIME NOT NULL,
-        activity TEXT NOT NULL,
-        status TEXT DEFAULT 'pending',
-        feedback TEXT,
-        FOREIGN KEY (student_id) REFERENCES users(id)
-    )
-''')
-
-# Create default admin user
-bcrypt = Bcrypt()
-pw_hash = bcrypt.generate_password_hash("adminpass").decode('utf-8')
-
-cursor.execute('''
-    INSERT INTO users (username, password_hash, role)
-    VALUES (?, ?, ?)
-''', ('admin', pw_hash, 'admin'))
-
-# Save and close
-conn.commit()
-conn.close()
-
-print("Database initialized successfully with users, logs, and default admin.")
\ No newline at end of file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or upgrade the SIWES database.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--reset", action="store_true", help="delete the existing database first")
+    args = parser.parse_args()
+
+    # Remove the old DB (only when explicitly asked for a fresh start)
+    if args.reset and os.path.exists(args.db):
+        os.remove(args.db)
+        print(f"Removed existing database at {args.db}")
+
+    os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+
+    # Create or upgrade tables and indexes; safe to run on an existing database
+    version = migrate(args.db, verbose=True)
+
+    # Create default admin user if there is none yet
+    conn = sqlite3.connect(args.db)
+    cursor = conn.cursor()
+
+    if cursor.execute("SELECT 1 FROM users WHERE role = 'admin'").fetchone() is None:
+        bcrypt = Bcrypt()
+        pw_hash = bcrypt.generate_password_hash("adminpass").decode('utf-8')
+
+        cursor.execute('''
+            INSERT INTO users (username, password_hash, role)
+            VALUES (?, ?, ?)
+        ''', ('admin', pw_hash, 'admin'))
+        print("Created default admin user.")
+
+    # Save and close
+    conn.commit()
+    conn.close()
+
+    print(f"Database ready at {args.db} (schema version {version}).")
@@ -0,0 +1,372 @@
+"""Background jobs for slow admin operations.
+
+Jobs are rows in the ``jobs`` table (migration 6), so they survive restarts
+and can be polled from any worker process. Each app has one JobRunner: a
+dispatcher thread claims queued jobs (an atomic UPDATE, so several processes
+can share the table) and hands them to a pool of ``JOB_WORKERS`` threads.
+Handlers run inside an app context and use the usual db_utils helpers, so
+their writes still go through the write queue.
+
+Handlers report progress with ``job.progress(done, total)``, which is also
+where a cancellation request is noticed: the job stops after the current
+chunk. A handler that raises is retried with exponential backoff until it has
+run ``max_attempts`` times, so handlers must be safe to run again after a
+partial run.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from backup import get_backup_runner
+from db_utils import get_db_connection, run_write, execute_write
+from log_status import APPROVED, DISAPPROVED
+from page_cache import bump_all, bump_students
+from user_cache import invalidate_user, ALL_USERS
+
+HANDLERS = {}
+CHUNK_SIZE = 500  # rows per write in the handlers below
+
+JOB_COLUMNS = """id, kind, status, progress, total, attempts, max_attempts, cancel_requested,
+                 result, error, created_by, created_at, started_at, finished_at"""
+
+_runner_lock = threading.Lock()
+
+
+def handler(kind):
+    """Register ``fn(job)`` as the handler for jobs of ``kind``; its return value is stored as the result."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+class JobCancelled(Exception):
+    """Raised from ``Job.progress`` once the job has been asked to stop."""
+
+
+class Job:
+    """A claimed job as seen by its handler."""
+
+    def __init__(self, row):
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.params = json.loads(row["params"])
+        self.attempt = row["attempts"]
+        self.max_attempts = row["max_attempts"]
+
+    def progress(self, done, total=None):
+        """Record progress (and a heartbeat); raises JobCancelled if a cancel was requested."""
+        def work(conn):
+            conn.execute(
+                "UPDATE jobs SET progress = ?, total = COALESCE(?, total), heartbeat_at = datetime('now') "
+                "WHERE id = ?", (done, total, self.id)
+            )
+            return conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.id,)).fetchone()[0]
+        if run_write(work):
+            raise JobCancelled()
+
+
+# --------------------------
+# QUEUEING AND POLLING
+# --------------------------
+def enqueue(kind, params=None, created_by=None, unique=False):
+    """Queue a job and return its id.
+
+    With ``unique``, nothing is queued (and None is returned) while another
+    job of the same kind is still queued or running.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    max_attempts = current_app.config.get("JOB_MAX_ATTEMPTS", 3)
+
+    def work(conn):
+        if unique and conn.execute(
+            "SELECT 1 FROM jobs WHERE status IN ('queued', 'running') AND kind = ? LIMIT 1", (kind,)
+        ).fetchone():
+            return None
+        return conn.execute(
+            "INSERT INTO jobs (kind, params, created_by, max_attempts) VALUES (?, ?, ?, ?)",
+            (kind, json.dumps(params or {}), created_by, max_attempts),
+        ).lastrowid
+
+    job_id = run_write(work)
+    if job_id is not None:
+        get_job_runner().wake()
+    return job_id
+
+
+def cancel(job_id):
+    """Cancel a queued job at once, or ask a running one to stop. Returns its status (None if unknown)."""
+    def work(conn):
+        conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = datetime('now') "
+                     "WHERE id = ? AND status = 'queued'", (job_id,))
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+    return run_write(work)
+
+
+def job_dict(row):
+    """A jobs row as a JSON-ready dict."""
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+def get_job(conn, job_id):
+    row = conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return job_dict(row) if row else None
+
+
+def recent_jobs(conn, limit=50):
+    return [job_dict(row) for row in
+            conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs ORDER BY id DESC LIMIT ?", (limit,))]
+
+
+def is_active(conn, kind):
+    """True while a job of ``kind`` is queued or running."""
+    return conn.execute(
+        "SELECT 1 FROM jobs WHERE status IN ('queued', 'running') AND kind = ? LIMIT 1", (kind,)
+    ).fetchone() is not None
+
+
+# --------------------------
+# RUNNER
+# --------------------------
+class JobRunner:
+    """Claims queued jobs and runs at most ``workers`` of them at a time."""
+
+    def __init__(self, app, workers=2, poll_interval=1.0, retry_delay=5.0, stale_after=300, keep_days=30):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.stale_after = stale_after
+        self.keep_days = keep_days
+
+        self._slots = threading.Semaphore(workers)
+        self._running = set()  # ids of the jobs this runner is executing
+        self._next_housekeeping = 0.0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Look for new jobs now instead of at the next poll."""
+        self._wake.set()
+
+    def stop(self):
+        """Stop claiming jobs and wait for the running ones to finish."""
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self):
+        while not self._stopping:
+            if time.monotonic() >= self._next_housekeeping:
+                self._next_housekeeping = time.monotonic() + self.stale_after
+                try:
+                    with self.app.app_context():
+                        run_write(self._housekeeping)
+                except Exception:
+                    self.app.logger.exception("Job housekeeping failed")
+            # wait for a free worker before claiming, so queued jobs stay visible as queued
+            if not self._slots.acquire(timeout=self.poll_interval):
+                continue
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    # a cheap read first, so an idle runner never takes the write lock
+                    rows = run_write(_claim) if _claimable(get_db_connection()) else []
+            except Exception:
+                self.app.logger.exception("Could not claim a job")
+                rows = []
+            if not rows:
+                self._slots.release()
+                self._wake.wait(self.poll_interval)
+                continue
+            job = Job(rows[0])
+            self._running.add(job.id)
+            self._executor.submit(self._run, job)
+
+    def _housekeeping(self, conn):
+        # jobs left 'running' by a process that died: nothing has reported in a while
+        mine = list(self._running)
+        conn.execute(
+            "UPDATE jobs SET status = 'queued' WHERE status = 'running' "
+            "AND COALESCE(heartbeat_at, started_at) < datetime('now', ?) "
+            f"AND id NOT IN ({', '.join('?' * len(mine))})",
+            (f"-{int(self.stale_after)} seconds", *mine)
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < datetime('now', ?)",
+            (f"-{int(self.keep_days)} days",)
+        )
+
+    def _run(self, job):
+        try:
+            with self.app.app_context():
+                fn = HANDLERS.get(job.kind)
+                try:
+                    if fn is None:
+                        raise LookupError(f"No handler for job kind {job.kind!r}")
+                    result = fn(job)
+                except JobCancelled:
+                    _finish(job.id, "cancelled")
+                except LookupError as e:
+                    _finish(job.id, "failed", error=str(e))
+                except Exception as e:
+                    self.app.logger.exception("Job %s (%s) failed", job.id, job.kind)
+                    if job.attempt < job.max_attempts:
+                        delay = self.retry_delay * 2 ** (job.attempt - 1)
+                        _retry(job.id, f"attempt {job.attempt}: {e}", delay)
+                    else:
+                        _finish(job.id, "failed", error=str(e))
+                else:
+                    _finish(job.id, "done", result=result)
+        finally:
+            self._running.discard(job.id)
+            self._slots.release()
+
+
+def _claimable(conn):
+    return conn.execute(
+        "SELECT 1 FROM jobs WHERE status = 'queued' AND run_after <= datetime('now') LIMIT 1"
+    ).fetchone() is not None
+
+
+def _claim(conn):
+    # fetchall: the statement must finish before the write queue releases its savepoint
+    return conn.execute("""
+        UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                        started_at = datetime('now'), heartbeat_at = datetime('now')
+        WHERE id = (
+            SELECT id FROM jobs WHERE status = 'queued' AND run_after <= datetime('now') ORDER BY id LIMIT 1
+        )
+        RETURNING id, kind, params, attempts, max_attempts
+    """).fetchall()
+
+
+def _finish(job_id, status, result=None, error=None):
+    execute_write(
+        "UPDATE jobs SET status = ?, result = ?, error = COALESCE(?, error), finished_at = datetime('now') "
+        "WHERE id = ?",
+        (status, json.dumps(result) if result is not None else None, error, job_id),
+    )
+
+
+def _retry(job_id, error, delay):
+    execute_write(
+        "UPDATE jobs SET status = 'queued', error = ?, run_after = datetime('now', ?) WHERE id = ?",
+        (error, f"+{int(delay)} seconds", job_id),
+    )
+
+
+def get_job_runner(app=None):
+    """Return the app's job runner, starting it on first use."""
+    app = app or current_app._get_current_object()
+    runner = app.extensions.get("job_runner")
+    if runner is None:
+        with _runner_lock:
+            runner = app.extensions.get("job_runner")
+            if runner is None:
+                runner = JobRunner(
+                    app,
+                    workers=app.config.get("JOB_WORKERS", 2),
+                    poll_interval=app.config.get("JOB_POLL_INTERVAL", 1.0),
+                    retry_delay=app.config.get("JOB_RETRY_DELAY", 5.0),
+                    stale_after=app.config.get("JOB_STALE_AFTER", 300),
+                    keep_days=app.config.get("JOB_KEEP_DAYS", 30),
+                )
+                app.extensions["job_runner"] = runner
+    return runner
+
+
+# --------------------------
+# HANDLERS
+# --------------------------
+LOG_ACTIONS = {
+    "approve": f"UPDATE logs SET status = {APPROVED} WHERE id = ?",
+    "disapprove": f"UPDATE logs SET status = {DISAPPROVED} WHERE id = ?",
+    "delete": "DELETE FROM logs WHERE id = ?",
+}
+
+
+@handler("logs_action")
+def _logs_action(job):
+    """Approve, disapprove or delete the selected logs, a chunk per transaction."""
+    sql = LOG_ACTIONS[job.params["action"]]
+    ids = job.params["ids"]
+    conn = get_db_connection()
+    done = 0
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        # looked up first: a deleted log no longer says whose it was
+        students = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT student_id FROM logs WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+        )]
+        execute_write(sql, [(log_id,) for log_id in chunk], many=True)
+        bump_students(students)
+        done += len(chunk)
+        job.progress(done, len(ids))
+    return {"logs": done}
+
+
+@handler("delete_student")
+def _delete_student(job):
+    """Delete a student's logs in chunks, then the student."""
+    student_id = job.params["student_id"]
+    conn = get_db_connection()
+    if conn.execute("SELECT 1 FROM users WHERE id = ? AND role = 'student'", (student_id,)).fetchone() is None:
+        return {"logs_deleted": 0}
+
+    total = conn.execute("SELECT COUNT(*) FROM logs WHERE student_id = ?", (student_id,)).fetchone()[0]
+    done = 0
+    while True:
+        deleted = execute_write(
+            "DELETE FROM logs WHERE id IN (SELECT id FROM logs WHERE student_id = ? LIMIT ?)",
+            (student_id, CHUNK_SIZE),
+        )
+        if not deleted:
+            break
+        done += deleted
+        bump_students([student_id])
+        job.progress(done, total)
+    execute_write("DELETE FROM users WHERE id = ? AND role = 'student'", (student_id,))
+    invalidate_user(student_id)
+    bump_all()
+    return {"logs_deleted": done}
+
+
+@handler("delete_supervisor")
+def _delete_supervisor(job):
+    """Unassign a supervisor's students and delete the supervisor, in one transaction."""
+    supervisor_id = job.params["supervisor_id"]
+
+    def work(conn):
+        unassigned = conn.execute("UPDATE users SET supervisor_id = NULL WHERE supervisor_id = ?",
+                                  (supervisor_id,)).rowcount
+        conn.execute("DELETE FROM users WHERE id = ? AND role='supervisor'", (supervisor_id,))
+        return unassigned
+
+    unassigned = run_write(work)
+    # the supervisor and every student they had changed
+    invalidate_user(ALL_USERS)
+    bump_all()
+    return {"students_unassigned": unassigned}
+
+
+@handler("backup")
+def _backup(job):
+    """Online backup of the database (see backup.py)."""
+    last = get_backup_runner().run()
+    if not last["ok"]:
+        raise RuntimeError(last["error"])
+    return {"file": last["file"], "written": last["written"], "seconds": round(last["seconds"], 3)}
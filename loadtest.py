@@ -0,0 +1,156 @@
+"""Mixed read/write load test for the SIWES app.
+
+Runs the same traffic twice against fresh throw-away databases: once with the
+default rollback journal and direct commits ("before"), once with WAL and the
+group-commit write queue ("after"), and prints p50/p99 latency for each.
+
+    python loadtest.py --threads 16 --requests 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask_bcrypt import generate_password_hash
+
+import db_utils
+from app import app
+from migrations import create_tables
+
+PASSWORD = "loadtest"
+
+MODES = {
+    "before": {"SQLITE_WAL": False, "DB_WRITE_QUEUE": False},
+    "after": {"SQLITE_WAL": True, "DB_WRITE_QUEUE": True,
+              "SQLITE_BUSY_TIMEOUT": 5000, "SQLITE_SYNCHRONOUS": "NORMAL"},
+}
+MODE_KEYS = {"SQLITE_WAL", "DB_WRITE_QUEUE", "SQLITE_BUSY_TIMEOUT", "SQLITE_SYNCHRONOUS"}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def seed(path, students, supervisors, logs_per_student):
+    """Create a database with supervisors, assigned students and some logs."""
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    create_tables(cur)
+
+    # low cost factor: we are measuring the database, not bcrypt
+    pw_hash = generate_password_hash(PASSWORD, rounds=4).decode("utf-8")
+    sup_ids = []
+    for i in range(supervisors):
+        cur.execute("INSERT INTO users (username, password_hash, role) VALUES (?, ?, 'supervisor')",
+                    (f"sup{i}", pw_hash))
+        sup_ids.append(cur.lastrowid)
+    for i in range(students):
+        cur.execute("INSERT INTO users (username, password_hash, role, supervisor_id) VALUES (?, ?, 'student', ?)",
+                    (f"stu{i}", pw_hash, sup_ids[i % len(sup_ids)]))
+        student_id = cur.lastrowid
+        cur.executemany(
+            "INSERT INTO logs (student_id, date, activity, status, feedback) VALUES (?, ?, ?, 'pending', '')",
+            [(student_id, f"2025-{1 + d % 12:02d}-{1 + d % 28:02d}", "Worked on the network rack. " * 8)
+             for d in range(logs_per_student)],
+        )
+    conn.commit()
+    max_log_id = cur.execute("SELECT MAX(id) FROM logs").fetchone()[0] or 1
+    conn.close()
+    return max_log_id
+
+
+def worker(username, is_student, requests, write_ratio, max_log_id, results, rng):
+    client = app.test_client()
+    client.post("/login", data={"username": username, "password": PASSWORD})
+
+    for _ in range(requests):
+        write = rng.random() < write_ratio
+        start = time.perf_counter()
+        if is_student and write:
+            resp = client.post("/log", data={"date": "2025-06-01", "activity": "Load test entry"})
+        elif is_student:
+            resp = client.get("/student")
+        elif write:
+            log_id = rng.randint(1, max_log_id)
+            if rng.random() < 0.5:
+                resp = client.post(f"/update_status/{log_id}", data={"action": "approve"})
+            else:
+                resp = client.post(f"/add_feedback/{log_id}", data={"feedback": "Reviewed"})
+        else:
+            resp = client.get("/supervisor")
+        elapsed = time.perf_counter() - start
+
+        results.append(("write" if write else "read", elapsed, resp.status_code >= 500))
+
+
+def run_mode(name, args):
+    workdir = tempfile.mkdtemp(prefix=f"siwes_load_{name}_")
+    path = os.path.join(workdir, "siwes.db")
+    max_log_id = seed(path, args.students, args.supervisors, args.logs)
+
+    db_utils.shutdown(app)
+    for key in MODE_KEYS:
+        app.config.pop(key, None)
+    app.config.update(MODES[name])
+    app.config["DATABASE"] = path
+    app.config["DB_POOL_SIZE"] = args.threads
+    app.testing = False  # count "database is locked" as a 500 instead of raising
+
+    results = []
+    rng = random.Random(args.seed)
+    threads = []
+    for i in range(args.threads):
+        is_student = i % 4 != 3  # three students per supervisor session
+        username = f"stu{i % args.students}" if is_student else f"sup{i % args.supervisors}"
+        t = threading.Thread(target=worker, args=(
+            username, is_student, args.requests, args.write_ratio, max_log_id,
+            results, random.Random(rng.random())))
+        threads.append(t)
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    db_utils.shutdown(app)
+
+    report = {"mode": name, "requests": len(results), "rps": len(results) / wall,
+              "errors": sum(1 for _, _, err in results if err)}
+    for kind in ("read", "write", "all"):
+        times = [t for k, t, _ in results if kind == "all" or k == kind]
+        report[f"{kind}_p50_ms"] = percentile(times, 50) * 1000
+        report[f"{kind}_p99_ms"] = percentile(times, 99) * 1000
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="requests per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--supervisors", type=int, default=5)
+    parser.add_argument("--logs", type=int, default=50, help="seed logs per student")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mode", choices=["before", "after", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = ["before", "after"] if args.mode == "both" else [args.mode]
+    print(f"{'mode':<8}{'req':>6}{'rps':>8}{'err':>6}"
+          f"{'read p50':>10}{'read p99':>10}{'write p50':>11}{'write p99':>11}{'all p99':>10}")
+    for name in modes:
+        r = run_mode(name, args)
+        print(f"{r['mode']:<8}{r['requests']:>6}{r['rps']:>8.1f}{r['errors']:>6}"
+              f"{r['read_p50_ms']:>10.1f}{r['read_p99_ms']:>10.1f}"
+              f"{r['write_p50_ms']:>11.1f}{r['write_p99_ms']:>11.1f}{r['all_p99_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
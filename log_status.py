@@ -0,0 +1,31 @@
+"""Approval states of a log, stored in ``logs.status`` as small integers (migration 7).
+
+The column has a CHECK constraint, so every row holds one of these codes and
+queries compare it directly (``status = ?``) instead of through ``lower()``.
+Names are what the UI, URLs, counters and CSV/JSONL files use.
+"""
+PENDING, APPROVED, DISAPPROVED = 0, 1, 2
+
+NAMES = ("pending", "approved", "disapproved")  # indexed by code
+CODES = {name: code for code, name in enumerate(NAMES)}
+
+# SQL expression naming a status code, for the counter triggers
+SQL_NAME = "CASE {} " + " ".join(f"WHEN {code} THEN '{name}'" for code, name in enumerate(NAMES)) + " END"
+
+
+def status_name(code):
+    """0 -> "pending"."""
+    return NAMES[code]
+
+
+def status_label(code):
+    """0 -> "Pending", for display."""
+    return NAMES[code].capitalize()
+
+
+def status_code(name):
+    """"Approved" / "approved" -> 1; ValueError for anything else."""
+    try:
+        return CODES[name.strip().lower()]
+    except (AttributeError, KeyError):
+        raise ValueError(f"invalid status {name!r}") from None
@@ -0,0 +1,94 @@
+"""Operational metrics for /admin/metrics and its Prometheus text endpoint.
+
+``collect`` takes one snapshot of everything worth watching: the SQL
+profiler (when SQL_PROFILE is on), the connection pool, write queue, user
+cache, password hasher, login limiter and page cache (only those already
+started, so looking never creates one), queued jobs and the row counters.
+``prometheus_text`` renders a snapshot in the Prometheus exposition format.
+"""
+from counters import read_counters
+from profiling import DURATION_BUCKETS, get_profiler
+
+# app.extensions key -> metric prefix; each component's stats() values become gauges
+COMPONENTS = {
+    "sqlite_pool": "db_pool",
+    "sqlite_writer": "db_writer",
+    "user_cache": "user_cache",
+    "password_hasher": "password_hasher",
+    "login_limiter": "login_limiter",
+    "page_cache": "page_cache",
+}
+
+
+def collect(app, conn):
+    profiler = get_profiler(app)
+    components = {}
+    for key, prefix in COMPONENTS.items():
+        component = app.extensions.get(key)
+        if component is not None:
+            components[prefix] = component.stats()
+    return {
+        "profiler": profiler.snapshot() if profiler is not None else None,
+        "components": components,
+        "jobs": dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()),
+        "counters": read_counters(conn),
+    }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def prometheus_text(snapshot):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP siwes_{name} {help_text}")
+        lines.append(f"# TYPE siwes_{name} {kind}")
+        for suffix, labels, value in samples:
+            value = int(value) if isinstance(value, (bool, int)) else repr(float(value))
+            lines.append(f"siwes_{name}{suffix}{_labels(labels)} {value}")
+
+    profile = snapshot["profiler"]
+    metric("sql_profile_enabled", "gauge", "1 when SQL_PROFILE is on.", [("", {}, profile is not None)])
+    if profile is not None:
+        endpoints = profile["endpoints"]
+        metric("http_requests_total", "counter", "Requests handled, by endpoint.",
+               [("", {"endpoint": name}, stats["requests"]) for name, stats in endpoints.items()])
+        metric("http_server_errors_total", "counter", "Requests answered with a 5xx status, by endpoint.",
+               [("", {"endpoint": name}, stats["errors"]) for name, stats in endpoints.items()])
+        histogram = []
+        for name, stats in endpoints.items():
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stats["buckets"]):
+                cumulative += count
+                histogram.append(("_bucket", {"endpoint": name, "le": f"{bound:g}"}, cumulative))
+            histogram.append(("_bucket", {"endpoint": name, "le": "+Inf"}, stats["requests"]))
+            histogram.append(("_sum", {"endpoint": name}, stats["seconds"]))
+            histogram.append(("_count", {"endpoint": name}, stats["requests"]))
+        metric("http_request_duration_seconds", "histogram", "Request duration, by endpoint.", histogram)
+        metric("sql_queries_total", "counter", "SQL statements run by requests, by endpoint.",
+               [("", {"endpoint": name}, stats["queries"]) for name, stats in endpoints.items()])
+        metric("sql_seconds_total", "counter", "Time requests spent in SQL, by endpoint.",
+               [("", {"endpoint": name}, stats["sql_seconds"]) for name, stats in endpoints.items()])
+        metric("sql_statement_calls_total", "counter", "Executions, by normalized statement.",
+               [("", {"statement": row["sql"]}, row["calls"]) for row in profile["statements"]])
+        metric("sql_statement_seconds_total", "counter", "Time spent, by normalized statement.",
+               [("", {"statement": row["sql"]}, row["seconds"]) for row in profile["statements"]])
+
+    for prefix, stats in snapshot["components"].items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                metric(f"{prefix}_{key}", "gauge", f"{prefix.replace('_', ' ')} {key.replace('_', ' ')}.",
+                       [("", {}, value)])
+    metric("jobs", "gauge", "Background jobs, by status.",
+           [("", {"status": status}, count) for status, count in snapshot["jobs"].items()])
+    metric("rows", "gauge", "Row counters (see counters.py).",
+           [("", {"counter": name}, value) for name, value in snapshot["counters"].items()])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,454 @@
+"""Versioned schema migrations for the SIWES database.
+
+The applied version is kept in ``PRAGMA user_version``; every migration with a
+higher number is run in order, each inside its own transaction. Migrations
+must be safe on databases created by older versions of init_db.py.
+
+    python migrations.py                   # upgrade instance/siwes.db
+    python migrations.py --db other.db
+    python migrations.py --status
+"""
+import argparse
+import sqlite3
+from datetime import datetime
+
+from log_status import SQL_NAME
+
+DB_PATH = "instance/siwes.db"
+
+
+# --------------------------
+# MIGRATIONS
+# --------------------------
+def run_script(conn, script):
+    """Execute a multi-statement script inside the current transaction.
+
+    (``executescript`` would COMMIT first, breaking the migration's atomicity.)
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        raise ValueError(f"Incomplete SQL statement: {statement!r}")
+
+
+def create_tables(cursor):
+    """Create the users and logs tables if they do not exist."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('student', 'supervisor', 'admin')),
+            supervisor_id INTEGER,
+            FOREIGN KEY (supervisor_id) REFERENCES users(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            date DATETIME NOT NULL,
+            activity TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            feedback TEXT,
+            FOREIGN KEY (student_id) REFERENCES users(id)
+        )
+    ''')
+
+
+def _baseline(conn):
+    """users and logs tables, as originally created by init_db.py."""
+    create_tables(conn.cursor())
+
+
+INDEXES_V2 = [
+    # student dashboard / edit / date filter: WHERE student_id = ? ORDER BY date
+    "CREATE INDEX IF NOT EXISTS idx_logs_student_date ON logs(student_id, date)",
+    # supervisor date range filters and ORDER BY logs.date
+    "CREATE INDEX IF NOT EXISTS idx_logs_date ON logs(date)",
+    # admin logs: WHERE lower(status) = ? ORDER BY datetime(date) DESC, and status counts
+    "CREATE INDEX IF NOT EXISTS idx_logs_status_datetime ON logs(lower(status), datetime(date))",
+    # admin dashboard recent activity: ORDER BY datetime(date) DESC LIMIT 6
+    "CREATE INDEX IF NOT EXISTS idx_logs_datetime ON logs(datetime(date))",
+    # role counts and the admin student/supervisor listings (covering for username order)
+    "CREATE INDEX IF NOT EXISTS idx_users_role_username ON users(role, username)",
+    # supervisor's students and per-supervisor student counts
+    "CREATE INDEX IF NOT EXISTS idx_users_supervisor_role ON users(supervisor_id, role)",
+]
+
+
+def _indexes(conn):
+    """Secondary and expression indexes for the hot queries in app.py and admin.py."""
+    for sql in INDEXES_V2:
+        conn.execute(sql)
+
+
+COUNTERS_V3 = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_users_insert AFTER INSERT ON users BEGIN
+    INSERT INTO counters (name, value) VALUES ('users.' || NEW.role, 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_users_delete AFTER DELETE ON users BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'users.' || OLD.role;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_users_role AFTER UPDATE OF role ON users
+WHEN OLD.role IS NOT NEW.role BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'users.' || OLD.role;
+    INSERT INTO counters (name, value) VALUES ('users.' || NEW.role, 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_logs_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO counters (name, value) VALUES ('logs.total', 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    INSERT INTO counters (name, value) VALUES ('logs.' || COALESCE(lower(NEW.status), 'none'), 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_logs_delete AFTER DELETE ON logs BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'logs.total';
+    UPDATE counters SET value = value - 1 WHERE name = 'logs.' || COALESCE(lower(OLD.status), 'none');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_counters_logs_status AFTER UPDATE OF status ON logs
+WHEN lower(OLD.status) IS NOT lower(NEW.status) BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'logs.' || COALESCE(lower(OLD.status), 'none');
+    INSERT INTO counters (name, value) VALUES ('logs.' || COALESCE(lower(NEW.status), 'none'), 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+
+DELETE FROM counters;
+INSERT INTO counters (name, value) SELECT 'users.' || role, COUNT(*) FROM users GROUP BY role;
+INSERT INTO counters (name, value) SELECT 'logs.total', COUNT(*) FROM logs;
+INSERT INTO counters (name, value)
+    SELECT 'logs.' || COALESCE(lower(status), 'none'), COUNT(*) FROM logs GROUP BY 1;
+"""
+
+
+def _counters(conn):
+    """counters table kept up to date by triggers, backfilled from existing rows."""
+    run_script(conn, COUNTERS_V3)
+
+
+def _keyset_indexes(conn):
+    """(lower(status), date) index for keyset pagination of the admin logs list."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_status_date ON logs(lower(status), date)")
+    # admin logs no longer sorts by datetime(date) within a status
+    conn.execute("DROP INDEX IF EXISTS idx_logs_status_datetime")
+
+
+# kept separate so migration 7 can recreate them after rebuilding logs
+LOGS_FTS_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS trg_logs_fts_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts (rowid, activity, feedback) VALUES (NEW.id, NEW.activity, NEW.feedback);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_logs_fts_delete AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts (logs_fts, rowid, activity, feedback)
+    VALUES ('delete', OLD.id, OLD.activity, OLD.feedback);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_logs_fts_update AFTER UPDATE OF activity, feedback ON logs BEGIN
+    INSERT INTO logs_fts (logs_fts, rowid, activity, feedback)
+    VALUES ('delete', OLD.id, OLD.activity, OLD.feedback);
+    INSERT INTO logs_fts (rowid, activity, feedback) VALUES (NEW.id, NEW.activity, NEW.feedback);
+END;
+"""
+
+SEARCH_V5 = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+    activity, feedback,
+    content='logs', content_rowid='id',
+    tokenize='porter unicode61'
+);
+""" + LOGS_FTS_TRIGGERS + """
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+    username,
+    content='users', content_rowid='id',
+    tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_users_fts_insert AFTER INSERT ON users BEGIN
+    INSERT INTO users_fts (rowid, username) VALUES (NEW.id, NEW.username);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_fts_delete AFTER DELETE ON users BEGIN
+    INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', OLD.id, OLD.username);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_fts_update AFTER UPDATE OF username ON users BEGIN
+    INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', OLD.id, OLD.username);
+    INSERT INTO users_fts (rowid, username) VALUES (NEW.id, NEW.username);
+END;
+
+INSERT INTO logs_fts (logs_fts) VALUES ('rebuild');
+INSERT INTO users_fts (users_fts) VALUES ('rebuild');
+"""
+
+
+def _search(conn):
+    """FTS5 indexes over log activity/feedback and trigram index over usernames."""
+    run_script(conn, SEARCH_V5)
+
+
+JOBS_V6 = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK(status IN ('queued', 'running', 'done', 'failed', 'cancelled')),
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_by INTEGER,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    run_after TEXT NOT NULL DEFAULT (datetime('now')),
+    started_at TEXT,
+    heartbeat_at TEXT,
+    finished_at TEXT
+);
+
+-- the worker claims: WHERE status = 'queued' AND run_after <= now ORDER BY id
+CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after);
+"""
+
+
+def _jobs(conn):
+    """jobs table for the background job runner (jobs.py)."""
+    run_script(conn, JOBS_V6)
+
+
+LOGS_V7 = """
+CREATE TABLE logs_v7 (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    date TEXT NOT NULL CHECK (date IS date(date, '+0 days')),  -- a real YYYY-MM-DD day
+    activity TEXT NOT NULL,
+    status INTEGER NOT NULL DEFAULT 0 CHECK (status IN (0, 1, 2)),
+    feedback TEXT,
+    FOREIGN KEY (student_id) REFERENCES users(id)
+);
+
+INSERT INTO logs_v7 (id, student_id, date, activity, status, feedback)
+SELECT id, student_id, date(date, '+0 days'), activity,
+       CASE lower(trim(COALESCE(status, 'pending')))
+           WHEN 'pending' THEN 0 WHEN 'approved' THEN 1 WHEN 'disapproved' THEN 2
+       END,
+       feedback
+FROM logs;
+
+DROP TABLE logs;
+ALTER TABLE logs_v7 RENAME TO logs;
+
+CREATE INDEX idx_logs_student_date ON logs(student_id, date);
+CREATE INDEX idx_logs_date ON logs(date);
+CREATE INDEX idx_logs_status_date ON logs(status, date);
+
+CREATE TRIGGER trg_counters_logs_insert AFTER INSERT ON logs BEGIN
+    INSERT INTO counters (name, value) VALUES ('logs.total', 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    INSERT INTO counters (name, value) VALUES ('logs.' || {new}, 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER trg_counters_logs_delete AFTER DELETE ON logs BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'logs.total';
+    UPDATE counters SET value = value - 1 WHERE name = 'logs.' || {old};
+END;
+
+CREATE TRIGGER trg_counters_logs_status AFTER UPDATE OF status ON logs
+WHEN OLD.status IS NOT NEW.status BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'logs.' || {old};
+    INSERT INTO counters (name, value) VALUES ('logs.' || {new}, 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+
+DELETE FROM counters WHERE name LIKE 'logs.%';
+INSERT INTO counters (name, value) SELECT 'logs.total', COUNT(*) FROM logs;
+INSERT INTO counters (name, value) SELECT 'logs.' || {status}, COUNT(*) FROM logs GROUP BY status;
+""".format(new=SQL_NAME.format("NEW.status"), old=SQL_NAME.format("OLD.status"), status=SQL_NAME.format("status"))
+
+# dates that SQLite's date() cannot read; day-first, as they are written in Nigeria
+LEGACY_DATE_FORMATS = ("%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d %B %Y", "%d %b %Y", "%B %d, %Y")
+
+
+def _legacy_date(value):
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def _typed_logs(conn):
+    """logs.date as an ISO date and logs.status as a 0/1/2 code, both with CHECK constraints."""
+    statuses = [row[0] for row in conn.execute(
+        "SELECT DISTINCT status FROM logs WHERE lower(trim(status)) NOT IN ('pending', 'approved', 'disapproved')"
+    )]
+    if statuses:
+        raise ValueError(f"logs.status has values migration 7 cannot map: {statuses!r}")
+
+    unreadable = []
+    for log_id, value in conn.execute("SELECT id, date FROM logs WHERE date(date, '+0 days') IS NULL").fetchall():
+        fixed = _legacy_date(str(value)) if value is not None else None
+        if fixed is None:
+            unreadable.append((log_id, value))
+        else:
+            conn.execute("UPDATE logs SET date = ? WHERE id = ?", (fixed, log_id))
+    if unreadable:
+        raise ValueError(f"logs.date has values migration 7 cannot read as dates (id, date): {unreadable[:20]!r}")
+
+    # rebuilding the table drops the old sqlite_sequence row; keep ids from being reused
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'logs'").fetchone()
+    run_script(conn, LOGS_V7)
+    run_script(conn, LOGS_FTS_TRIGGERS)
+    if row:
+        conn.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'logs'", (row[0],))
+
+
+# logs.supervisor_id is the supervisor of the log's student (NULL when unassigned),
+# and counters 'roster.<supervisor id>' the number of students each supervisor has
+ROSTER_V8 = """
+ALTER TABLE logs ADD COLUMN supervisor_id INTEGER;
+
+-- supervisor dashboard, calendar, search and bulk approval: WHERE supervisor_id = ? ORDER BY date
+CREATE INDEX idx_logs_supervisor_date ON logs(supervisor_id, date);
+
+CREATE TRIGGER trg_roster_logs_insert AFTER INSERT ON logs BEGIN
+    UPDATE logs SET supervisor_id = (
+        SELECT supervisor_id FROM users WHERE id = NEW.student_id AND role = 'student'
+    ) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER trg_roster_logs_student AFTER UPDATE OF student_id ON logs
+WHEN OLD.student_id IS NOT NEW.student_id BEGIN
+    UPDATE logs SET supervisor_id = (
+        SELECT supervisor_id FROM users WHERE id = NEW.student_id AND role = 'student'
+    ) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER trg_roster_users_insert AFTER INSERT ON users
+WHEN NEW.role = 'student' AND NEW.supervisor_id IS NOT NULL BEGIN
+    INSERT INTO counters (name, value) VALUES ('roster.' || NEW.supervisor_id, 1)
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER trg_roster_users_delete AFTER DELETE ON users BEGIN
+    UPDATE counters SET value = value - 1
+    WHERE name = 'roster.' || OLD.supervisor_id AND OLD.role = 'student';
+    DELETE FROM counters WHERE name = 'roster.' || OLD.id;
+END;
+
+CREATE TRIGGER trg_roster_users_assign AFTER UPDATE OF supervisor_id, role ON users
+WHEN OLD.supervisor_id IS NOT NEW.supervisor_id OR OLD.role IS NOT NEW.role BEGIN
+    UPDATE counters SET value = value - 1
+    WHERE name = 'roster.' || OLD.supervisor_id AND OLD.role = 'student';
+    INSERT INTO counters (name, value)
+    SELECT 'roster.' || NEW.supervisor_id, 1 WHERE NEW.role = 'student' AND NEW.supervisor_id IS NOT NULL
+    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    UPDATE logs SET supervisor_id = CASE WHEN NEW.role = 'student' THEN NEW.supervisor_id END
+    WHERE student_id = NEW.id;
+END;
+
+UPDATE logs SET supervisor_id = (
+    SELECT supervisor_id FROM users WHERE users.id = logs.student_id AND users.role = 'student'
+);
+DELETE FROM counters WHERE name LIKE 'roster.%';
+INSERT INTO counters (name, value)
+    SELECT 'roster.' || supervisor_id, COUNT(*) FROM users
+    WHERE role = 'student' AND supervisor_id IS NOT NULL GROUP BY supervisor_id;
+"""
+
+
+def _roster(conn):
+    """logs.supervisor_id and per-supervisor student counters, kept up to date by triggers."""
+    run_script(conn, ROSTER_V8)
+
+
+# (version, callable) in the order they must be applied. Append only.
+MIGRATIONS = [
+    (1, _baseline),
+    (2, _indexes),
+    (3, _counters),
+    (4, _keyset_indexes),
+    (5, _search),
+    (6, _jobs),
+    (7, _typed_logs),
+    (8, _roster),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# --------------------------
+# RUNNER
+# --------------------------
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path=DB_PATH, target=None, verbose=False):
+    """Bring the database at ``path`` up to ``target`` (default: latest). Returns the final version."""
+    target = LATEST_VERSION if target is None else target
+    conn = sqlite3.connect(path)
+    conn.isolation_level = None  # we issue BEGIN/COMMIT ourselves
+    try:
+        version = start = current_version(conn)
+        for number, step in MIGRATIONS:
+            if number <= version or number > target:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            version = number
+            if verbose:
+                print(f"Applied migration {number}: {step.__doc__.strip()}")
+        if version != start:
+            conn.execute("ANALYZE")  # refresh planner statistics for the new indexes
+        return version
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--target", type=int, default=None)
+    parser.add_argument("--status", action="store_true", help="only print the current version")
+    args = parser.parse_args()
+
+    if args.status:
+        conn = sqlite3.connect(args.db)
+        print(f"{args.db}: version {current_version(conn)} (latest {LATEST_VERSION})")
+        conn.close()
+        return
+
+    version = migrate(args.db, args.target, verbose=True)
+    print(f"{args.db} is at version {version}")
+
+
+if __name__ == "__main__":
+    main()
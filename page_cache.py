@@ -0,0 +1,269 @@
+"""Cache rendered dashboards, and answer unchanged ones with 304 Not Modified.
+
+The student, supervisor and admin dashboards only change when the data
+behind them does. Each cached view declares a scope: ``student`` and
+``supervisor`` pages depend on the signed-in user's own logs, ``site`` pages
+on everything. Every scope has a data version, and the routes and jobs that
+write logs or users bump the versions they touch once the write is committed
+(``bump_students``, ``bump_supervisor``, ``bump_site``, ``bump_all``).
+
+A page is keyed by route, user and query string, and its ETag is derived
+from that key and the current versions, so:
+
+* a request whose ``If-None-Match`` holds the current ETag of a page this
+  worker cached less than ``PAGE_CACHE_TTL`` ago gets a 304 without running
+  the view or touching the database;
+* otherwise a body cached at the current versions is sent as is;
+* otherwise the view runs and its 200 response is kept (a streamed response
+  is kept once it has streamed to the end).
+
+Requests with flashed messages waiting are never served from the cache nor
+stored. ETags carry a random per-process epoch, so a restarted process or
+another worker never validates a page it did not render. Without
+``PAGE_CACHE_SHARED`` a worker does not see the bumps of the others, so
+neither its cached pages nor its 304s outlive the TTL; with several worker
+processes set it to a file path so bumps reach every worker (the same
+mechanism as USER_CACHE_SHARED, see user_cache.py).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from db_utils import get_db_connection
+from user_cache import SharedInvalidations
+
+SITE = "site"
+ALL_SCOPES = None  # published through PAGE_CACHE_SHARED by bump_all
+
+
+class PageCache:
+    """LRU/TTL cache of rendered pages, validated by per-scope data versions."""
+
+    def __init__(self, max_size=512, ttl=300.0, shared_path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = SharedInvalidations(shared_path, table="page_versions", column="scope",
+                                          column_type="TEXT") if shared_path else None
+        self.epoch = os.urandom(4).hex()
+        self._entries = OrderedDict()  # key -> (expires_at, etag, body, mimetype)
+        self._versions = {}            # scope -> version
+        self._generation = 0           # bumped by bump_all, part of every ETag
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "not_modified": 0, "stores": 0, "evictions": 0,
+                          "bypassed": 0, "bumps": 0}
+
+    def _sync(self):
+        """Apply bumps published by other workers."""
+        if self.shared is None:
+            return
+        scopes = self.shared.poll()
+        for scope in scopes or ():
+            if scope is ALL_SCOPES:
+                self._bump_all()
+            else:
+                self._bump(scope)
+
+    def etag(self, key, scopes):
+        self._sync()
+        with self._lock:
+            versions = (self._generation, *(self._versions.get(scope, 0) for scope in scopes))
+        digest = hashlib.blake2b(repr((key, versions)).encode(), digest_size=12).hexdigest()
+        return f"{self.epoch}-{digest}"
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key, etag):
+        """The cached (body, mimetype) for ``key`` if it was rendered at ``etag``, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != etag or entry[0] <= time.monotonic():
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[2], entry[3]
+
+    def fresh(self, key, etag):
+        """True if ``key`` was rendered at ``etag`` less than ``ttl`` ago, so a client's copy is still good."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] == etag and entry[0] > time.monotonic()
+
+    def put(self, key, etag, body, mimetype):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, etag, body, mimetype)
+            self._entries.move_to_end(key)
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def tee(self, key, etag, chunks, mimetype, charset="utf-8"):
+        """Pass a streamed body through, storing it once it has been sent completely."""
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk.encode(charset) if isinstance(chunk, str) else chunk)
+            yield chunk
+        # only reached when the client read to the end
+        self.put(key, etag, b"".join(parts), mimetype)
+
+    def bump(self, scopes):
+        """Make pages depending on any of ``scopes`` stale, here and in the other workers."""
+        for scope in scopes:
+            self._bump(scope)
+            if self.shared is not None:
+                self.shared.publish(scope)
+
+    def bump_all(self):
+        self._bump_all()
+        if self.shared is not None:
+            self.shared.publish(ALL_SCOPES)
+
+    def _bump(self, scope):
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+            self._counters["bumps"] += 1
+
+    def _bump_all(self):
+        with self._lock:
+            self._generation += 1
+            self._versions.clear()
+            self._entries.clear()
+            self._counters["bumps"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "scopes": len(self._versions),
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+            }
+
+
+# --------------------------
+# FLASK INTEGRATION
+# --------------------------
+_cache_lock = threading.Lock()
+
+
+def get_page_cache(app=None):
+    """Return the app's page cache, or None when PAGE_CACHE_SIZE is 0."""
+    app = app or current_app
+    if not app.config.get("PAGE_CACHE_SIZE"):
+        return None
+    cache = app.extensions.get("page_cache")
+    if cache is None:
+        with _cache_lock:
+            cache = app.extensions.get("page_cache")
+            if cache is None:
+                cache = PageCache(
+                    max_size=app.config["PAGE_CACHE_SIZE"],
+                    ttl=app.config.get("PAGE_CACHE_TTL", 300.0),
+                    shared_path=app.config.get("PAGE_CACHE_SHARED"),
+                )
+                app.extensions["page_cache"] = cache
+    return cache
+
+
+def _revalidate(response, etag):
+    # browsers keep the page but must ask again before reusing it
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _scope_key(scope):
+    if scope is None:  # the signed-in user's own data, whatever their role
+        scope = SITE if current_user.role == "admin" else current_user.role
+    return scope if scope == SITE else f"{scope}:{current_user.id}"
+
+
+def cached_page(scope=None):
+    """Cache a GET view's page under ``scope`` ("student", "supervisor", SITE, or None for the user's role).
+
+    Goes below ``@login_required``: pages are cached per signed-in user.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_page_cache()
+            if cache is None or request.method != "GET" or session.get("_flashes"):
+                if cache is not None:
+                    cache.count("bypassed")
+                return view(*args, **kwargs)
+
+            scopes = (_scope_key(scope),)
+            key = (request.endpoint, current_user.id, tuple(sorted(request.args.items(multi=True))))
+            etag = cache.etag(key, scopes)
+            if request.if_none_match.contains_weak(etag) and cache.fresh(key, etag):
+                cache.count("not_modified")
+                return _revalidate(current_app.response_class(status=304), etag)
+            hit = cache.get(key, etag)
+            if hit is not None:
+                body, mimetype = hit
+                return _revalidate(current_app.response_class(body, mimetype=mimetype), etag)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if response.is_streamed:
+                response.response = cache.tee(key, etag, response.response, response.mimetype)
+            else:
+                cache.put(key, etag, response.get_data(), response.mimetype)
+            return _revalidate(response, etag)
+        return wrapper
+    return decorator
+
+
+def bump_students(student_ids):
+    """Call after writing these students' logs: their pages, their supervisors' and the site's go stale."""
+    cache = get_page_cache()
+    if cache is None:
+        return
+    student_ids = sorted({int(student_id) for student_id in student_ids})
+    if not student_ids:
+        return
+    supervisors = get_db_connection().execute(
+        f"SELECT DISTINCT supervisor_id FROM users WHERE id IN ({', '.join('?' * len(student_ids))}) "
+        "AND supervisor_id IS NOT NULL",
+        student_ids,
+    ).fetchall()
+    cache.bump([f"student:{i}" for i in student_ids]
+               + [f"supervisor:{row[0]}" for row in supervisors] + [SITE])
+
+
+def bump_supervisor(supervisor_id):
+    """Call after writing logs of a supervisor's students (any of them)."""
+    cache = get_page_cache()
+    if cache is None:
+        return
+    students = get_db_connection().execute(
+        "SELECT id FROM users WHERE supervisor_id = ?", (supervisor_id,)
+    ).fetchall()
+    cache.bump([f"student:{row[0]}" for row in students] + [f"supervisor:{supervisor_id}", SITE])
+
+
+def bump_site():
+    """Call after a change that only site-wide pages (the admin dashboard) show, e.g. a new user."""
+    cache = get_page_cache()
+    if cache is not None:
+        cache.bump([SITE])
+
+
+def bump_all():
+    """Call after changes that can touch anyone's pages: users assigned or deleted, bulk edits, imports."""
+    cache = get_page_cache()
+    if cache is not None:
+        cache.bump_all()
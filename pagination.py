@@ -0,0 +1,45 @@
+"""Opaque cursors for keyset (seek) pagination.
+
+A cursor encodes the sort key of the last row on a page; the next page is
+``WHERE (sort_key) < (cursor) ORDER BY sort_key DESC LIMIT n``, which is an
+index range scan no matter how deep the page is (unlike OFFSET).
+"""
+import base64
+import json
+
+
+def encode_cursor(*values):
+    """Pack the sort-key values of a row into a URL-safe token."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, size):
+    """Unpack a token made by ``encode_cursor``; None if missing or malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != size or not all(map(_is_key, values)):
+        return None
+    return tuple(values)
+
+
+def _is_key(value):
+    # only what encode_cursor writes for our sort keys; anything else would fail as a bind parameter
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -2**63 <= value < 2**63
+    return isinstance(value, str)
+
+
+def split_page(rows, per_page, key):
+    """Given up to ``per_page + 1`` rows, return (page_rows, next_cursor or None)."""
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor(*key(rows[-1]))
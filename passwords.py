@@ -0,0 +1,151 @@
+"""Password hashing off the request thread.
+
+bcrypt is deliberately slow and CPU-bound, so during a registration or login
+rush it used to hold up every other request on the worker. PasswordHasher
+runs ``hashpw``/``checkpw`` in a pool of ``PASSWORD_WORKERS`` processes.
+
+At most ``PASSWORD_QUEUE_SIZE`` hashes may be queued or running at once. A
+caller that finds the queue full waits up to ``PASSWORD_QUEUE_TIMEOUT``
+seconds for a slot and then gets HasherBusy, which the routes turn into a
+503 "try again" page instead of piling up more work.
+
+``BCRYPT_LOG_ROUNDS`` sets the cost of new hashes. A successful login with a
+hash of a different cost re-hashes the password at the current cost, so
+raising (or lowering) the cost upgrades accounts as people log in.
+``PASSWORD_WORKERS = 0`` hashes inline, which is handy in tests.
+
+Workers are started with "spawn" (forking a process that already runs the
+writer and job threads is unsafe), which re-imports the main module in each
+worker: scripts that use the app must keep their entry point under
+``if __name__ == "__main__":``, as app.py and the bench scripts do.
+"""
+import os
+import threading
+
+import bcrypt
+from flask import current_app
+
+_hasher_lock = threading.Lock()
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue stays full for longer than the timeout."""
+
+
+# these run in the worker processes, so they must be importable top-level functions
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password, password_hash):
+    return bcrypt.checkpw(password, password_hash)
+
+
+def hash_cost(password_hash):
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), or None if it is not one."""
+    parts = password_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """bcrypt in a bounded process pool."""
+
+    def __init__(self, rounds=12, workers=None, queue_size=64, timeout=5.0, mp_context="spawn"):
+        self.rounds = rounds
+        self.workers = os.cpu_count() if workers is None else workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._counters = {"hashed": 0, "checked": 0, "busy": 0, "in_flight": 0}
+        self._executor = None
+        if self.workers:
+            # imported here: multiprocessing is a noticeable part of the app's import time
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(mp_context)
+            )
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _run(self, counter, fn, *args):
+        if self._executor is None:
+            self._count(counter)
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("busy")
+            raise HasherBusy("Too many password checks in progress; try again shortly.")
+        self._count("in_flight")
+        try:
+            future = self._executor.submit(fn, *args)
+            # counted once submitted, so calls rejected as busy are not counted as work
+            self._count(counter)
+            return future.result()
+        finally:
+            self._count("in_flight", -1)
+            self._slots.release()
+
+    def hash(self, password):
+        """bcrypt hash of ``password`` at the configured cost, as str."""
+        return self._run("hashed", _hash, password.encode("utf-8"), self.rounds)
+
+    def check(self, password_hash, password):
+        """True if ``password`` matches ``password_hash``."""
+        try:
+            return self._run("checked", _check, password.encode("utf-8"), password_hash.encode("utf-8"))
+        except ValueError:  # not a bcrypt hash
+            return False
+
+    def needs_rehash(self, password_hash):
+        return hash_cost(password_hash) != self.rounds
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(workers=self.workers, rounds=self.rounds)
+        return stats
+
+    def start(self):
+        """Start every worker process now instead of on the first hashes (see warmup.py)."""
+        if self._executor is not None:
+            for future in [self._executor.submit(os.getpid) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+def get_hasher(app=None):
+    """Return the app's PasswordHasher, creating it from config on first use."""
+    app = app or current_app
+    hasher = app.extensions.get("password_hasher")
+    if hasher is None:
+        with _hasher_lock:
+            hasher = app.extensions.get("password_hasher")
+            if hasher is None:
+                hasher = PasswordHasher(
+                    rounds=app.config.get("BCRYPT_LOG_ROUNDS", 12),
+                    workers=app.config.get("PASSWORD_WORKERS"),
+                    queue_size=app.config.get("PASSWORD_QUEUE_SIZE", 64),
+                    timeout=app.config.get("PASSWORD_QUEUE_TIMEOUT", 5.0),
+                )
+                app.extensions["password_hasher"] = hasher
+    return hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def check_password(password_hash, password):
+    return get_hasher().check(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    return get_hasher().needs_rehash(password_hash)
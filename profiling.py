@@ -0,0 +1,229 @@
+"""Per-request SQL profiling (SQL_PROFILE).
+
+When enabled, pooled and write-queue connections are opened with a
+profiling connection factory (see db_utils), so every statement is counted
+and timed, including the time spent fetching its rows. For each request the
+profiler adds up the statements and their time, sends them back in a
+``Server-Timing`` header (shown in the browser's network panel), and folds
+them into per-endpoint totals. Statements are also totalled by their
+normalized text (literals replaced by ``?``), so the few that dominate stand
+out on /admin/metrics. Statements slower than ``SQL_SLOW_MS`` are logged and
+the slowest ``SQL_PROFILE_KEEP`` are kept.
+
+Statements run outside a request (the write queue, background jobs) are
+totalled with their execute time only. With SQL_PROFILE off, connections are
+plain sqlite3 ones and the request hooks return after one config lookup.
+"""
+import heapq
+import itertools
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app, g, request
+
+# upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\b(IN)\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Statement text with literals as ``?`` and whitespace collapsed, to group executions."""
+    sql = _NUMBER.sub("?", _STRING.sub("?", sql))
+    return _SPACE.sub(" ", _IN_LIST.sub(r"\1 (?, ...)", sql)).strip()
+
+
+class Timing:
+    """One execution: set by the cursor's execute, extended by each fetch."""
+
+    __slots__ = ("sql", "seconds")
+
+    def __init__(self, sql, seconds):
+        self.sql = sql
+        self.seconds = seconds
+
+
+class RequestProfile:
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def queries(self):
+        return len(self.statements)
+
+    @property
+    def sql_time(self):
+        return sum(timing.seconds for timing in self.statements)
+
+
+class QueryProfiler:
+    """Statement counts and timings, per thread, per request, per endpoint and per statement."""
+
+    def __init__(self, slow_ms=100, keep=20, logger=None):
+        self.slow = slow_ms / 1000
+        self.keep = keep
+        self.logger = logger
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._threads = {}          # thread id -> statements run, never reset
+        self.reset()
+
+    def reset(self):
+        """Start the request, statement and slowest-execution totals over."""
+        with self._lock:
+            self._statements = {}   # normalized sql -> [calls, seconds, max seconds]
+            self._endpoints = {}
+            self._slowest = []      # min-heap of (seconds, seq, sql, endpoint, at)
+            self.since = datetime.now().isoformat(" ", "seconds")
+
+    # --- called by the profiling connections (db_utils) ---
+    def record(self, sql, seconds):
+        """Count one execution on this thread; returns its Timing for the fetches to extend."""
+        timing = Timing(sql, seconds)
+        profile = getattr(self._local, "profile", None)
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+            if profile is None:
+                self._add_statement(timing, "(background)")
+        if profile is not None:
+            profile.statements.append(timing)
+        return timing
+
+    def count(self, thread_id=None):
+        """Statements run so far by ``thread_id`` (default: the calling thread)."""
+        with self._lock:
+            return self._threads.get(thread_id or threading.get_ident(), 0)
+
+    # --- called around each request ---
+    def begin(self):
+        self._local.profile = RequestProfile()
+
+    def end(self, endpoint, status, seconds):
+        """Fold the thread's request into the totals; returns its RequestProfile (None if not begun)."""
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            return None
+        self._local.profile = None
+        sql_time = profile.sql_time
+        slow = []
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    "requests": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "queries": 0,
+                    "max_queries": 0, "sql_seconds": 0.0, "buckets": [0] * len(DURATION_BUCKETS),
+                }
+            stats["requests"] += 1
+            stats["errors"] += status >= 500
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["queries"] += profile.queries
+            stats["max_queries"] = max(stats["max_queries"], profile.queries)
+            stats["sql_seconds"] += sql_time
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    stats["buckets"][i] += 1
+                    break
+            for timing in profile.statements:
+                if self._add_statement(timing, endpoint):
+                    slow.append(timing)
+        if self.logger is not None:
+            for timing in slow:
+                self.logger.warning("Slow SQL (%.1f ms) in %s: %s", timing.seconds * 1000, endpoint,
+                                    normalize_sql(timing.sql))
+        return profile
+
+    def _add_statement(self, timing, endpoint):
+        """Add one execution to the per-statement totals (lock held); True when it was slow."""
+        sql = normalize_sql(timing.sql)
+        stats = self._statements.get(sql)
+        if stats is None:
+            stats = self._statements[sql] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += timing.seconds
+        stats[2] = max(stats[2], timing.seconds)
+        if timing.seconds < self.slow:
+            return False
+        entry = (timing.seconds, next(self._seq), sql, endpoint, datetime.now().isoformat(" ", "seconds"))
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, entry)
+        elif self.keep:
+            heapq.heappushpop(self._slowest, entry)
+        return True
+
+    def snapshot(self):
+        """Totals for the metrics page: endpoints, statements (costliest first), the slowest executions."""
+        with self._lock:
+            endpoints = {name: dict(stats, buckets=list(stats["buckets"])) for name, stats in self._endpoints.items()}
+            costliest = sorted(self._statements.items(), key=lambda item: item[1][1], reverse=True)
+            slowest = sorted(self._slowest, reverse=True)
+            since = self.since
+        return {
+            "since": since,
+            "endpoints": endpoints,
+            "statements": [{"sql": sql, "calls": calls, "seconds": total, "max_seconds": longest}
+                           for sql, (calls, total, longest) in costliest],
+            "slowest": [{"seconds": seconds, "sql": sql, "endpoint": endpoint, "at": at}
+                        for seconds, _, sql, endpoint, at in slowest],
+        }
+
+
+# --------------------------
+# FLASK INTEGRATION
+# --------------------------
+_profiler_lock = threading.Lock()
+
+
+def get_profiler(app=None):
+    """Return the app's QueryProfiler, or None when SQL_PROFILE is off."""
+    app = app or current_app
+    if not app.config.get("SQL_PROFILE"):
+        return None
+    profiler = app.extensions.get("sql_profiler")
+    if profiler is None:
+        with _profiler_lock:
+            profiler = app.extensions.get("sql_profiler")
+            if profiler is None:
+                profiler = QueryProfiler(
+                    slow_ms=app.config.get("SQL_SLOW_MS", 100),
+                    keep=app.config.get("SQL_PROFILE_KEEP", 20),
+                    logger=app.logger,
+                )
+                app.extensions["sql_profiler"] = profiler
+    return profiler
+
+
+def _begin_request():
+    profiler = get_profiler()
+    if profiler is not None:
+        g.profile_started = time.perf_counter()
+        profiler.begin()
+
+
+def _end_request(response):
+    profiler = get_profiler()
+    started = g.pop("profile_started", None)
+    if profiler is None or started is None:
+        return response
+    seconds = time.perf_counter() - started
+    profile = profiler.end(request.endpoint or "(unmatched)", response.status_code, seconds)
+    if profile is not None:
+        response.headers.add("Server-Timing", f'db;dur={profile.sql_time * 1000:.2f};desc="{profile.queries} queries"')
+        response.headers.add("Server-Timing", f"app;dur={seconds * 1000:.2f}")
+    return response
+
+
+def init_app(app):
+    app.before_request(_begin_request)
+    app.after_request(_end_request)
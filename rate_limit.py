@@ -0,0 +1,168 @@
+"""Token-bucket rate limiting for login attempts.
+
+``login()`` asks the limiter before it touches the database or bcrypt. Each
+attempt takes one token from two buckets:
+
+    user:<username>   small burst, slow refill (LOGIN_LIMIT_USER)
+    ip:<address>      larger, since a whole campus may share one NAT address (LOGIN_LIMIT_IP)
+
+An empty username bucket means the account is locked out until a token
+refills; an empty IP bucket rejects everything from that address. A
+successful login refills the username bucket, so a typo or two does not
+count against the next session. Limits are ``(capacity, seconds)``: a full
+bucket holds ``capacity`` tokens and refills completely in ``seconds``.
+
+Buckets live in process memory by default. With several worker processes,
+set ``LOGIN_LIMIT_SHARED`` to a file path to keep them in a small SQLite
+database that all workers share.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+ALLOWED, REJECTED, LOCKED_OUT = "allowed", "rejected", "locked_out"
+
+_limiter_lock = threading.Lock()
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryStore:
+    """Buckets in a bounded LRU dict (an evicted bucket simply starts full again)."""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def consume(self, buckets, now):
+        """Take a token from every ``(key, capacity, rate)`` bucket, or from none.
+
+        Returns None on success, else ``(index, retry_after)`` for the first empty bucket.
+        """
+        with self._lock:
+            levels = []
+            for i, (key, capacity, rate) in enumerate(buckets):
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                tokens = _refill(tokens, updated, capacity, rate, now)
+                if tokens < 1:
+                    return i, (1 - tokens) / rate
+                levels.append((key, tokens))
+            for key, tokens in levels:
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return None
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class SQLiteStore:
+    """Buckets in a SQLite file shared by all worker processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._calls = 0
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets "
+                     "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID")
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+
+    def consume(self, buckets, now):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            levels = []
+            for i, (key, capacity, rate) in enumerate(buckets):
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens = _refill(*(row or (capacity, now)), capacity, rate, now)
+                if tokens < 1:
+                    conn.execute("ROLLBACK")
+                    return i, (1 - tokens) / rate
+                levels.append((key, tokens - 1, now))
+            conn.executemany("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", levels)
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                # buckets untouched for a day are full again anyway
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - 86400,))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return None
+
+    def reset(self, key):
+        conn = self._connect()
+        conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+        conn.close()
+
+
+class LoginLimiter:
+    """Per-username and per-IP token buckets for login attempts, with counters."""
+
+    def __init__(self, store, user_limit=(5, 300), ip_limit=(100, 60)):
+        self.store = store
+        self.user_limit = user_limit
+        self.ip_limit = ip_limit
+        self._lock = threading.Lock()
+        self._counters = {ALLOWED: 0, REJECTED: 0, LOCKED_OUT: 0}
+
+    @staticmethod
+    def _bucket(key, limit):
+        capacity, seconds = limit
+        return key, capacity, capacity / seconds
+
+    def check(self, username, ip):
+        """Spend one attempt; returns (verdict, retry_after_seconds)."""
+        buckets = [
+            self._bucket("user:" + username.strip().lower(), self.user_limit),
+            self._bucket(f"ip:{ip}", self.ip_limit),
+        ]
+        outcome = self.store.consume(buckets, time.time())
+        if outcome is None:
+            verdict, retry_after = ALLOWED, 0.0
+        else:
+            index, retry_after = outcome
+            verdict = LOCKED_OUT if index == 0 else REJECTED
+        with self._lock:
+            self._counters[verdict] += 1
+        return verdict, retry_after
+
+    def succeeded(self, username):
+        """A correct password refills the username's bucket."""
+        self.store.reset("user:" + username.strip().lower())
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+def get_login_limiter(app=None):
+    """Return the app's LoginLimiter, or None when LOGIN_RATE_LIMIT is off."""
+    app = app or current_app
+    if not app.config.get("LOGIN_RATE_LIMIT", True):
+        return None
+    limiter = app.extensions.get("login_limiter")
+    if limiter is None:
+        with _limiter_lock:
+            limiter = app.extensions.get("login_limiter")
+            if limiter is None:
+                shared = app.config.get("LOGIN_LIMIT_SHARED")
+                limiter = LoginLimiter(
+                    SQLiteStore(shared) if shared else MemoryStore(),
+                    user_limit=app.config.get("LOGIN_LIMIT_USER", (5, 300)),
+                    ip_limit=app.config.get("LOGIN_LIMIT_IP", (100, 60)),
+                )
+                app.extensions["login_limiter"] = limiter
+    return limiter
@@ -0,0 +1,118 @@
+"""Full-text search over logs and usernames (SQLite FTS5, migration 5).
+
+``logs_fts`` indexes logs.activity and logs.feedback; ``users_fts`` is a
+trigram index over usernames so ``%q%`` style searches use an index. Both are
+external-content tables kept in sync by triggers. For a database whose
+indexes are missing or suspect, rebuild them from the base tables:
+
+    python search.py --rebuild [--db instance/siwes.db]
+"""
+import argparse
+import re
+import sqlite3
+
+from markupsafe import Markup, escape
+
+from migrations import DB_PATH, migrate
+
+# snippet() wraps matches in these control characters; they are turned into
+# <mark> only after the surrounding (user-written) text has been escaped.
+MARK_START, MARK_END = "\x02", "\x03"
+
+
+def fts_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight(snippet):
+    """Escape a snippet and turn the match markers into <mark> tags."""
+    if not snippet:
+        return ""
+    return Markup(str(escape(snippet)).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+
+
+def search_logs(conn, text, supervisor_id=None, limit=20, offset=0):
+    """Best matches first; each row has id, date, status, student, activity and feedback snippets.
+
+    With ``supervisor_id`` only logs of that supervisor's students are returned.
+    Ranked results have to be scored in full anyway, so pages use OFFSET.
+    """
+    match = fts_query(text)
+    if match is None:
+        return []
+    query = """
+        SELECT logs.id, logs.date, logs.status, users.username AS student,
+               snippet(logs_fts, 0, char(2), char(3), '…', 24) AS activity,
+               snippet(logs_fts, 1, char(2), char(3), '…', 16) AS feedback
+        FROM logs_fts
+        JOIN logs ON logs.id = logs_fts.rowid
+        JOIN users ON users.id = logs.student_id
+        WHERE logs_fts MATCH ?
+    """
+    params = [match]
+    if supervisor_id is not None:
+        query += " AND logs.supervisor_id = ?"
+        params.append(supervisor_id)
+    query += " ORDER BY rank LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+
+    results = []
+    for row in conn.execute(query, params):
+        results.append({
+            "id": row["id"],
+            "date": row["date"],
+            "status": row["status"],
+            "student": row["student"],
+            "activity": highlight(row["activity"]),
+            # snippet() falls back to the column's first words when only the other column matched
+            "feedback": highlight(row["feedback"]) if MARK_START in (row["feedback"] or "") else "",
+        })
+    return results
+
+
+def username_filter(text, column="s.id"):
+    """SQL condition + params matching usernames that contain ``text``.
+
+    Three or more characters use the trigram index; shorter input falls back
+    to LIKE (the trigram tokenizer cannot index fewer than three characters).
+    """
+    if len(text) >= 3:
+        phrase = '"' + text.replace('"', '""') + '"'
+        return f"{column} IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)", [phrase]
+    return f"{column} IN (SELECT id FROM users WHERE username LIKE ?)", [f"%{text}%"]
+
+
+def rebuild(conn):
+    """Rebuild both search indexes from the base tables and merge their b-trees."""
+    with conn:
+        for table in ("logs_fts", "users_fts"):
+            conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+            conn.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the full-text search indexes.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild logs_fts and users_fts")
+    args = parser.parse_args()
+
+    migrate(args.db)  # creates the indexes if this database predates them
+    if args.rebuild:
+        conn = sqlite3.connect(args.db)
+        rebuild(conn)
+        n_logs = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+        n_users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        conn.close()
+        print(f"Rebuilt search indexes for {n_logs} logs and {n_users} users.")
+    else:
+        print("Search indexes are present. Use --rebuild to rebuild them.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Generate a realistic synthetic SIWES database for load tests and benchmarks.
+
+Creates an admin, M supervisors and N students (most assigned to a
+supervisor, a few not yet), and K logs spread unevenly over the students:
+some log every working day, some hardly at all. Logs fall on weekdays of a
+24-week placement; older ones are mostly reviewed, recent ones mostly
+pending; activity lengths follow a long-tailed distribution around ~40
+words, and about a third of reviewed logs carry feedback. The same ``--seed``
+always produces the same data.
+
+Rows are inserted through the normal schema, so the counters, full-text
+indexes and CHECK constraints stay consistent. Every account's password is
+``--password`` (hashed once, at a low bcrypt cost by default).
+
+    python seed_data.py --db /tmp/siwes_big.db --students 2000 --supervisors 50 --logs 200000
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import bcrypt
+
+from log_status import APPROVED, DISAPPROVED, PENDING
+from migrations import migrate
+
+PASSWORD = "siwes-bench"
+PLACEMENT_START = date(2025, 1, 6)  # a Monday
+PLACEMENT_WEEKS = 24
+CHUNK = 10000  # logs per executemany
+
+WORDS = (
+    "configured installed tested documented assisted reviewed designed troubleshot deployed monitored "
+    "replaced repaired measured calibrated inspected analysed prepared attended presented updated "
+    "network router switch server firewall cable rack printer database backup report spreadsheet "
+    "inventory drawing circuit transformer generator inverter panel meter sensor pump valve pipeline "
+    "concrete survey site foreman engineer supervisor client meeting training safety briefing "
+    "maintenance schedule procedure workshop laboratory sample specimen reading results software "
+    "website module feature bug ticket deployment account payroll invoice ledger audit customer "
+    "the a an and with for on in of to at from during after before under using while new old main"
+).split()
+
+FEEDBACK = (
+    "Good work keep it up", "Please add more detail about what you did", "Well documented",
+    "Describe the tools you used", "Nice progress this week", "Include the outcome of the task",
+    "See me about this entry", "Clear and concise", "Too brief please expand", "Excellent initiative",
+)
+
+
+def _activity(rng):
+    words = max(5, min(400, int(rng.lognormvariate(3.6, 0.6))))
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _status(rng, day_index, days):
+    # the further back, the likelier a supervisor has reviewed it
+    if rng.random() < 0.15 + 0.8 * day_index / days:
+        return PENDING
+    return APPROVED if rng.random() < 0.85 else DISAPPROVED
+
+
+def _log_rows(rng, student_ids, n_logs):
+    workdays = [PLACEMENT_START + timedelta(days=d) for d in range(PLACEMENT_WEEKS * 7)
+                if (PLACEMENT_START + timedelta(days=d)).weekday() < 5]
+    # diligence per student: a few keep daily logs, many log now and then
+    cum_weights = list(itertools.accumulate(rng.paretovariate(1.5) for _ in student_ids))
+    for _ in range(n_logs):
+        student_id = rng.choices(student_ids, cum_weights=cum_weights)[0]
+        day_index = rng.randrange(len(workdays))
+        status = _status(rng, day_index, len(workdays))
+        feedback = rng.choice(FEEDBACK) if status != PENDING and rng.random() < 0.35 else ""
+        yield (student_id, workdays[day_index].isoformat(), _activity(rng), status, feedback)
+
+
+def generate(path, students=200, supervisors=10, logs=20000, seed=1, password=PASSWORD, cost=4):
+    """Fill an empty database at ``path``; returns a summary dict."""
+    start = time.perf_counter()
+    migrate(path)
+    rng = random.Random(seed)
+    pw_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(cost)).decode()
+
+    conn = sqlite3.connect(path)
+    # the indexes and the full-text index take random inserts; keep their pages in memory
+    conn.execute("PRAGMA cache_size = -262144")
+    if conn.execute("SELECT 1 FROM logs LIMIT 1").fetchone() or \
+            conn.execute("SELECT 1 FROM users WHERE role != 'admin' LIMIT 1").fetchone():
+        conn.close()
+        raise ValueError(f"{path} already has users or logs; seed an empty database")
+
+    if conn.execute("SELECT 1 FROM users WHERE username = 'admin'").fetchone() is None:
+        conn.execute("INSERT INTO users (username, password_hash, role) VALUES ('admin', ?, 'admin')", (pw_hash,))
+    conn.executemany("INSERT INTO users (username, password_hash, role) VALUES (?, ?, 'supervisor')",
+                     [(f"sup{i:04d}", pw_hash) for i in range(supervisors)])
+    supervisor_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'supervisor' ORDER BY id")]
+    # about 3% of students are not assigned yet
+    conn.executemany(
+        "INSERT INTO users (username, password_hash, role, supervisor_id) VALUES (?, ?, 'student', ?)",
+        [(f"stu{i:05d}", pw_hash,
+          rng.choice(supervisor_ids) if supervisor_ids and rng.random() >= 0.03 else None)
+         for i in range(students)],
+    )
+    student_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'student' ORDER BY id")]
+
+    inserted = 0
+    if student_ids:
+        chunk = []
+        for row in _log_rows(rng, student_ids, logs):
+            chunk.append(row)
+            if len(chunk) == CHUNK:
+                inserted += _insert_logs(conn, chunk)
+                chunk = []
+        inserted += _insert_logs(conn, chunk)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return {"students": len(student_ids), "supervisors": len(supervisor_ids), "logs": inserted,
+            "seed": seed, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def _insert_logs(conn, rows):
+    conn.executemany("INSERT INTO logs (student_id, date, activity, status, feedback) VALUES (?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="database file to create (must be empty or missing)")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--supervisors", type=int, default=10)
+    parser.add_argument("--logs", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--cost", type=int, default=4, help="bcrypt cost of the shared password hash")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+    summary = generate(args.db, args.students, args.supervisors, args.logs, args.seed, args.password, args.cost)
+    print(f"{args.db}: {summary['students']} students, {summary['supervisors']} supervisors, "
+          f"{summary['logs']} logs in {summary['seconds']}s ({summary['logs'] / summary['seconds']:.0f} logs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""In-process LRU/TTL cache for the Flask-Login user loader.
+
+Every authenticated request calls ``load_user``; caching the ``User`` object
+saves a database round trip per request. Entries expire after ``ttl`` seconds
+and must be invalidated whenever a user's row changes (password, role,
+supervisor assignment, deletion).
+
+With several worker processes, set ``USER_CACHE_SHARED`` to a file path: each
+invalidation is appended to a small SQLite table there, and every worker
+replays new entries when the file changes (one ``stat`` per lookup).
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+ALL_USERS = None  # invalidate(ALL_USERS) drops every entry
+
+
+class SharedInvalidations:
+    """Invalidation log shared by all workers through a local SQLite file.
+
+    The page cache (page_cache.py) keeps its own log of bumped scopes in
+    another table of the same kind.
+    """
+
+    def __init__(self, path, table="invalidations", column="user_id", column_type="INTEGER"):
+        self.path = path
+        self.table = table
+        self.column = column
+        self._lock = threading.Lock()
+        self._mtime = self._stat()
+        conn = self._connect()
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (seq INTEGER PRIMARY KEY, {column} {column_type})")
+        conn.commit()
+        self.last_seq = conn.execute(f"SELECT COALESCE(MAX(seq), 0) FROM {table}").fetchone()[0]
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def publish(self, user_id):
+        conn = self._connect()
+        with conn:
+            conn.execute(f"INSERT INTO {self.table} ({self.column}) VALUES (?)", (user_id,))
+            # keep the log short; workers only need recent entries
+            conn.execute(f"DELETE FROM {self.table} WHERE seq < (SELECT MAX(seq) FROM {self.table}) - 10000")
+        conn.close()
+
+    def poll(self):
+        """User ids invalidated by any worker since the last poll (None if the file is unchanged)."""
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return None
+        with self._lock:
+            self._mtime = mtime
+            conn = self._connect()
+            rows = conn.execute(f"SELECT seq, {self.column} FROM {self.table} WHERE seq > ? ORDER BY seq",
+                                (self.last_seq,)).fetchall()
+            conn.close()
+            if rows:
+                self.last_seq = rows[-1][0]
+        return [user_id for _, user_id in rows]
+
+
+class UserCache:
+    """Thread-safe LRU cache with a per-entry time-to-live."""
+
+    def __init__(self, max_size=1024, ttl=300.0, shared_path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = SharedInvalidations(shared_path) if shared_path else None
+
+        self._entries = OrderedDict()  # user_id -> (expires_at, user)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def _drop(self, user_id):
+        if user_id is ALL_USERS:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(user_id), None)
+
+    def _sync(self):
+        if self.shared is None:
+            return
+        user_ids = self.shared.poll()
+        if user_ids:
+            with self._lock:
+                for user_id in user_ids:
+                    self._drop(user_id)
+
+    def get(self, user_id):
+        self._sync()
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return user
+
+    def put(self, user_id, user):
+        with self._lock:
+            self._entries[str(user_id)] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(str(user_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, user_id=ALL_USERS):
+        """Forget one user (or everyone), in this worker and, if shared, in all others."""
+        with self._lock:
+            self._drop(user_id)
+            self._counters["invalidations"] += 1
+        if self.shared is not None:
+            self.shared.publish(user_id)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# --------------------------
+# FLASK INTEGRATION
+# --------------------------
+_cache_lock = threading.Lock()
+
+
+def get_user_cache(app=None):
+    """Return the app's user cache, or None when USER_CACHE_SIZE is 0."""
+    app = app or current_app
+    if not app.config.get("USER_CACHE_SIZE"):
+        return None
+    cache = app.extensions.get("user_cache")
+    if cache is None:
+        with _cache_lock:
+            cache = app.extensions.get("user_cache")
+            if cache is None:
+                cache = UserCache(
+                    max_size=app.config["USER_CACHE_SIZE"],
+                    ttl=app.config.get("USER_CACHE_TTL", 300.0),
+                    shared_path=app.config.get("USER_CACHE_SHARED"),
+                )
+                app.extensions["user_cache"] = cache
+    return cache
+
+
+def invalidate_user(user_id=ALL_USERS):
+    """Call after changing or deleting a user row; no-op when caching is off."""
+    cache = get_user_cache()
+    if cache is not None:
+        cache.invalidate(user_id)
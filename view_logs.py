@@ -1,15 +1,13 @@
 import sqlite3
 
+from bulk import iter_rows
+
 #Connect to the database
 conn = sqlite3.connect('instance/siwes.db')
-cursor = conn.cursor()
-
-#Fetch logs
-cursor.execute('SELECT * FROM logs')
-logs = cursor.fetchall()
 
-#Display logs
-for log in logs:
-    print(f"ID: {log[0]} | Date: {log[1]} | Activity: {log[2]}")
+#Fetch and display logs a batch at a time instead of loading the whole table
+for logs in iter_rows(conn, 'SELECT id, date, activity FROM logs ORDER BY id'):
+    for log in logs:
+        print(f"ID: {log[0]} | Date: {log[1]} | Activity: {log[2]}")
 
-conn.close()
\ No newline at end of file
+conn.close()
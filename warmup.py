@@ -0,0 +1,99 @@
+"""Faster worker startup: persistent compiled templates and a warmup pass.
+
+Jinja compiles a template to Python code the first time it is rendered, so
+the first hit on every page of a fresh worker pays for it. With
+``TEMPLATE_CACHE_DIR`` set, the compiled code is kept on disk in a
+FileSystemBytecodeCache: a new worker (or one after a restart) only loads it,
+and an edited template is simply recompiled. ``precompile`` fills the cache
+for every template, and also writes the ``.pyc`` files of the app's modules;
+run it once per deploy:
+
+    python warmup.py
+
+``warmup(app)`` goes further, for the worker it runs in: it loads every
+template into the environment's cache, opens the pooled connections and runs
+the indexed read queries of check_queries.py once on each (the schema is
+parsed and the index pages they use are cached), and starts the password
+worker processes. With ``WARMUP_ON_START`` the app does this at startup, so
+it is already done when the first request arrives. bench_cold_start.py
+measures the difference.
+"""
+import compileall
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def precompile(app):
+    """Compile every template into the bytecode cache (and the environment's cache); returns their number."""
+    env = app.jinja_env
+    names = [name for name in env.list_templates() if name.endswith(".html")]
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def _run_hot_queries(conn):
+    from check_queries import QUERIES
+
+    for _, sql, params, allowed in QUERIES:
+        # reads that a plain index lookup answers; scans would only fill the cache with cold pages
+        if sql.lstrip().upper().startswith("SELECT") and not allowed:
+            conn.execute(sql, params).fetchall()
+
+
+def warmup(app):
+    """Load templates, connections and password workers now; returns the seconds each took."""
+    from db_utils import get_pool
+    from passwords import get_hasher
+
+    timings = {}
+    start = time.perf_counter()
+    templates = precompile(app)
+    timings["templates"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with app.app_context():
+        connections = get_pool(app).prefill(_run_hot_queries)
+    timings["connections"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_hasher(app).start()
+    timings["password_workers"] = time.perf_counter() - start
+
+    app.logger.info("Warmed up in %.0f ms: %d templates, %d connections, password workers",
+                    1000 * sum(timings.values()), templates, connections)
+    return timings
+
+
+def init_app(app):
+    cache_dir = app.config.get("TEMPLATE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    if app.config.get("WARMUP_ON_START"):
+        import multiprocessing
+
+        # password workers are spawned and re-import the main module: only warm the parent
+        if multiprocessing.parent_process() is None:
+            warmup(app)
+
+
+def main():
+    from app import app
+
+    cache_dir = app.config.get("TEMPLATE_CACHE_DIR")
+    if not cache_dir:
+        raise SystemExit("TEMPLATE_CACHE_DIR is not set; there is nowhere to keep compiled templates")
+    start = time.perf_counter()
+    templates = precompile(app)
+    compileall.compile_dir(APP_DIR, maxlevels=0, quiet=1)
+    print(f"{templates} templates compiled into {cache_dir}, Python modules byte-compiled "
+          f"({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()